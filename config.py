@@ -48,6 +48,20 @@ os.makedirs(EXPORTS_DIR, exist_ok=True)
 LOG_FILE = LOG_DIR / f"app_{datetime.now().strftime('%Y%m%d')}.log"
 LOG_LEVEL = "INFO"
 
+# Query profiling (see tobys_terminal/shared/query_profiler.py); off unless
+# QUERY_PROFILING=1 is set, since every statement gets timed when it's on
+QUERY_PROFILING = os.environ.get("QUERY_PROFILING", "0") == "1"
+SLOW_QUERY_MS = 100
+QUERY_LOG_RING_SIZE = 500
+
+# Online snapshots (see tobys_terminal/shared/backup.py)
+BACKUP_DIR = PROJECT_ROOT / "backups"
+
+# Customer portal reads from a published read-only copy (see
+# tobys_terminal/shared/read_replica.py); set READ_REPLICA=1 to turn it on
+READ_REPLICA = os.environ.get("READ_REPLICA", "0") == "1"
+REPLICA_DIR = PROJECT_ROOT / "replica"
+
 
 # UI settings
 UI_THEME = "sage"  # Your custom theme name
@@ -11,7 +11,7 @@ import tkinter as tk
 from tkinter import ttk
 from datetime import datetime, timedelta
 
-from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.invoice_logic import get_ar_summary
 from tobys_terminal.shared.brand_ui import apply_brand, zebra_tree
 
 def open_ar_view():
@@ -47,77 +47,7 @@ def open_ar_view():
 
     tree.pack(expand=True, fill="both", padx=10, pady=10)
     # Load data
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Get all billable unpaid invoices
-    cursor.execute("""
-        SELECT
-            c.company,
-            c.first_name,
-            c.last_name,
-            i.invoice_number,
-            i.total,
-            i.invoice_date,
-            COALESCE(p.paid, 0) as amount_paid
-        FROM invoices i
-        JOIN customers c ON i.customer_id = c.id
-        LEFT JOIN (
-            SELECT invoice_number, SUM(amount) AS paid
-            FROM payments_clean
-            GROUP BY invoice_number
-        ) p ON p.invoice_number = i.invoice_number
-        WHERE LOWER(TRIM(i.invoice_status)) IN (
-            'complete and ready for pickup', 'shipped', 'picked up',
-            'payment request sent', 'harlestons -- invoiced',
-            'past due invoice - followed up', 'on hold - need payment please',
-            'done done', 'pickup reminder sent', 'harlestons -- picked up'
-        )
-
-          AND COALESCE(i.total, 0) - COALESCE(p.paid, 0) > 0
-    """)
-    rows = cursor.fetchall()
-    
-    conn.close()
-
-    today = datetime.today()
-    ar_summary = {}
-
-    for company, first, last, inv_num, total, inv_date, paid in rows:
-
-        # Determine balance due
-        balance_due = (total or 0.0) - (paid or 0.0)
-        if balance_due <= 0:
-            continue  # skip fully paid or overpaid invoices
-
-
-        if isinstance(inv_date, str):
-            try:
-                inv_date = datetime.strptime(inv_date, "%Y-%m-%d")
-            except Exception:
-                continue
-
-        days_old = (today - inv_date).days
-        company_label = company.strip() if company and company.strip() else f"No Company - {first} {last}"
-
-
-        # Aging buckets
-        if company_label not in ar_summary:
-            ar_summary[company_label] = {"0-30": 0.0, "31-60": 0.0, "61-90": 0.0, "90+": 0.0}
-
-        if days_old <= 30:
-            ar_summary[company_label]["0-30"] += balance_due
-        elif days_old <= 60:
-            ar_summary[company_label]["31-60"] += balance_due
-        elif days_old <= 90:
-            ar_summary[company_label]["61-90"] += balance_due
-        else:
-            ar_summary[company_label]["90+"] += balance_due
-
-        # ✅ After bucket is filled, check if balance_due was actually added
-        # This isn't necessary now that balance_due <= 0 is checked above,
-        # but you can double-guard it with a post-check if you'd like.
-
+    ar_summary = get_ar_summary()
 
     # Populate Treeview
     for company, buckets in sorted(ar_summary.items(), key=lambda x: -sum(x[1].values())):
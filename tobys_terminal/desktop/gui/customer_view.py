@@ -7,6 +7,7 @@ import sqlite3
 
 from tobys_terminal.shared.db import get_connection, get_contract_type, set_contract_type, get_customer_status, set_customer_status
 from tobys_terminal.shared.brand_ui import apply_brand, make_header, zebra_tree
+from tobys_terminal.shared.customer_search import customer_search_sql
 
 def open_contract_tagger():
     """
@@ -283,16 +284,19 @@ def load_customers(tree, contract_filter, status_filter, search_term):
         elif status_filter == "Untagged":
             where_clauses.append("cp.status IS NULL")
         
+        # Search joins the ranked FTS index instead of a LIKE scan
+        search_order = ""
         if search_term:
-            where_clauses.append("(c.company LIKE ? OR c.first_name LIKE ? OR c.last_name LIKE ? OR c.email LIKE ?)")
-            search_param = f"%{search_term}%"
-            params.extend([search_param, search_param, search_param, search_param])
+            search_join, search_where, search_params, search_order = customer_search_sql(search_term, conn)
+            query += search_join
+            where_clauses.append(search_where)
+            params.extend(search_params)
         
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
-        # Order by company
-        query += " ORDER BY c.company"
+        # Best matches first when searching, otherwise by company
+        query += f" ORDER BY {search_order or 'c.company'}"
         
         cursor.execute(query, params)
         customers = cursor.fetchall()
@@ -500,6 +500,20 @@ def open_imm_roster_view(company_name):
     ttk.Button(button_frame, text="📄 Print Inline-EMB", command=lambda: print_pdf("emb")).pack(side="left", padx=6)
     ttk.Button(button_frame, text="📄 Print Inline-DTF", command=lambda: print_pdf("dtf")).pack(side="left", padx=6)
 
+    def print_all_pdfs():
+        try:
+            from tobys_terminal.shared.pdf_bundle import generate_imm_report_bundle
+            result = generate_imm_report_bundle()
+            paths = list(result["production"].values()) + list(result["status"].values())
+            message = f"{len(paths)} PDFs created:\n\n" + "\n".join(os.path.basename(p) for p in paths)
+            if result["errors"]:
+                message += "\n\nFailed:\n" + "\n".join(f"{k}: {v}" for k, v in result["errors"].items())
+            messagebox.showinfo("PDFs Created", message)
+        except Exception as e:
+            messagebox.showerror("Error", f"Something went wrong:\n{e}")
+
+    ttk.Button(button_frame, text="📚 Print Everything", command=print_all_pdfs).pack(side="left", padx=6)
+
     def delete_selected_order():
         selected = tree.selection()
         if not selected:
@@ -3,10 +3,14 @@ import sys
 import os
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from tobys_terminal.shared.db import get_connection
-from tobys_terminal.shared.statement_logic import StatementCalculator
+from tobys_terminal.shared.export_csv import export_integrity_csv
+from tobys_terminal.shared.payment_audit import DISCREPANCY_LABELS, get_last_audit_run, get_open_discrepancies, run_payment_audit
+from tobys_terminal.shared.payment_integrity import (
+    FULLY_PAID, STATUS_LABELS, UNPAID, check_payments, invalidate_integrity_cache, summarize,
+)
 from tobys_terminal.shared.brand_ui import apply_brand, zebra_tree
 
 def open_payment_checker():
@@ -81,63 +85,97 @@ def open_payment_checker():
 
 
 
+    summary_var = tk.StringVar()
+    tk.Label(win, textvariable=summary_var, font=("Arial", 10)).pack()
+
+    last_scan = {"label": None, "results": []}
+
     def load_checker():
         tree.delete(*tree.get_children())
         selected = customer_combo.get()
-        if selected not in customer_dict:
+        if selected == "All Customers":
+            customer_ids = None  # scan every invoice in one pass
+        elif selected in customer_dict:
+            customer_ids = customer_dict[selected]
+        else:
             messagebox.showwarning("Invalid", "Please select a valid customer.")
             return
 
-        customer_ids = customer_dict[selected]
-
-        calc = StatementCalculator(customer_ids=customer_ids, unpaid_only=False)
-        rows, _ = calc.fetch()
-
-        conn = get_connection()
-        cursor = conn.cursor()
+        results = check_payments(customer_ids)
+        last_scan["label"] = selected
+        last_scan["results"] = results
 
-        for row in rows:
-            if row[1] != "Invoice":
-                continue
-
-            inv_num = row[2]
-            invoice_total = row[3]
-            paid_flag = row[4]
-
-            cursor.execute("""
-                SELECT SUM(amount) FROM payments_clean
-                WHERE invoice_number = ?
-            """, (inv_num,))
-            paid_result = cursor.fetchone()
-            actual_paid = paid_result[0] if paid_result and paid_result[0] else 0.0
-
-            difference = invoice_total - actual_paid
-
-            # Status logic
-            if paid_flag.lower() in {"yes", "true", "paid"} and actual_paid == 0:
-                status = "❌ Paid Flag True, No $"
-            elif difference == 0:
-                status = "✅ Fully Paid"
-            elif difference < 0:
-                status = "🔴 Overpaid"
-            elif actual_paid > 0:
-                status = "🟠 Partial"
-            else:
-                status = "🟡 Unpaid"
-            if mismatch_only_var.get() and status == "✅ Fully Paid":
+        for row in results:
+            status = row["status"]
+            if mismatch_only_var.get() and status == FULLY_PAID:
                 continue  # Skip this one unless it's a mismatch
-            if hide_unpaid_var.get() and status == "🟡 Unpaid":
+            if hide_unpaid_var.get() and status == UNPAID:
                 continue
             tree.insert("", "end", values=(
-                inv_num,
-                f"${invoice_total:,.2f}",
-                paid_flag,
-                f"${actual_paid:,.2f}",
-                f"${difference:,.2f}",
-                status
+                row["invoice_number"],
+                f"${row['invoice_total']:,.2f}",
+                row["paid_flag"],
+                f"${row['actual_paid']:,.2f}",
+                f"${row['difference']:,.2f}",
+                STATUS_LABELS[status]
             ))
         zebra_tree(tree)
-        conn.close()
 
-    tk.Button(win, text="🕵️ Check Payments", command=load_checker).pack(pady=10)
+        counts = summarize(results)
+        summary_var.set("   ".join(f"{STATUS_LABELS[s]}: {n}" for s, n in counts.items()))
 
+    def load_exceptions():
+        """Show the open discrepancies from the last global audit."""
+        tree.delete(*tree.get_children())
+        selected = customer_combo.get()
+        customer_ids = customer_dict.get(selected)  # None for "All Customers"
+
+        for d in get_open_discrepancies(customer_ids=customer_ids):
+            tree.insert("", "end", values=(
+                d["invoice_number"] or "",
+                f"${float(d['invoice_total'] or 0):,.2f}",
+                d["paid_flag"] or "",
+                f"${float(d['actual_paid'] or 0):,.2f}",
+                f"${float(d['difference'] or 0):,.2f}",
+                DISCREPANCY_LABELS.get(d["kind"], d["kind"])
+            ))
+        zebra_tree(tree)
+
+        last_run = get_last_audit_run()
+        if last_run:
+            summary_var.set(
+                f"Audit of {last_run['finished_at']}: {last_run['open_count']} open "
+                f"({last_run['new_count']} new, {last_run['resolved_count']} resolved)"
+            )
+        else:
+            summary_var.set("No audit has run yet - use Run Audit.")
+
+    def run_audit():
+        run_payment_audit()
+        load_exceptions()
+
+    def refresh_checker():
+        invalidate_integrity_cache()
+        load_checker()
+
+    def export_checker():
+        if not last_scan["results"]:
+            messagebox.showinfo("Export", "Run a check first.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            initialfile=f"payment_integrity_{last_scan['label'].replace(' ', '_')}.csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not path:
+            return
+        export_integrity_csv(last_scan["label"], last_scan["results"], STATUS_LABELS, user_selected_path=path)
+        messagebox.showinfo("Export", f"Saved {len(last_scan['results'])} invoices to:\n{path}")
+
+    button_frame = tk.Frame(win)
+    button_frame.pack(pady=10)
+    tk.Button(button_frame, text="🕵️ Check Payments", command=load_checker).pack(side="left", padx=5)
+    tk.Button(button_frame, text="🔄 Rescan", command=refresh_checker).pack(side="left", padx=5)
+    tk.Button(button_frame, text="📤 Export CSV", command=export_checker).pack(side="left", padx=5)
+    tk.Button(button_frame, text="📋 Audit Exceptions", command=load_exceptions).pack(side="left", padx=5)
+    tk.Button(button_frame, text="🧾 Run Audit", command=run_audit).pack(side="left", padx=5)
@@ -4,10 +4,10 @@ import os
 from datetime import datetime
 
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import sqlite3
-from tobys_terminal.shared.db import get_connection
-from tobys_terminal.shared.statement_logic import StatementCalculator
+from tobys_terminal.shared.reconciliation import find_payments, is_reconciled, update_payment_tracking
+from tobys_terminal.shared.bank_matching import reconcile_bank_csv
 from tobys_terminal.shared.brand_ui import apply_brand, zebra_tree
 
 def open_reconcile_view():
@@ -29,13 +29,18 @@ def open_reconcile_view():
     search_entry = tk.Entry(input_frame, width=20)
     search_entry.pack(side="left", padx=5)
 
+    # Optional end date for a date range
+    tk.Label(input_frame, text="To:").pack(side="left", padx=5)
+    to_entry = tk.Entry(input_frame, width=12)
+    to_entry.pack(side="left", padx=5)
+
     # ✅ Dropdown to select search mode
     search_type = tk.StringVar(value="Date")
     search_menu = ttk.Combobox(
         input_frame,
         textvariable=search_type,
-        values=["Date", "Reference"],
-        width=10,
+        values=["Date", "Reference", "Reference starts with"],
+        width=18,
         state="readonly"
     )
     search_menu.pack(side="left", padx=5)
@@ -44,7 +49,7 @@ def open_reconcile_view():
     search_btn = tk.Button(
         input_frame,
         text="Search",
-        command=lambda: run_search(search_entry.get(), search_type.get())
+        command=lambda: run_search(search_entry.get(), search_type.get(), to_entry.get())
     )
     search_btn.pack(side="left", padx=5)
 
@@ -70,23 +75,14 @@ def open_reconcile_view():
             messagebox.showwarning("No Selection", "Select one or more payments to reconcile.")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        for item_id in selected:
-            invoice_number = tree.item(item_id)["values"][1]
-            cursor.execute("""
-                INSERT INTO payment_tracking (invoice_number, reconciled)
-                VALUES (?, 1)
-                ON CONFLICT(invoice_number) DO UPDATE SET reconciled = 1
-            """, (invoice_number,))
-        conn.commit()
-        conn.close()
+        # Tree item ids are payments_clean ids (see run_search)
+        updated = update_payment_tracking(selected, reconciled=True)
         for item_id in selected:
             # Mark visually
             tree.set(item_id, "Reconciled", "✔")
             tree.item(item_id, tags=("reconciled",))
 
-        messagebox.showinfo("Reconciled", "Selected payments marked as reconciled.")
+        messagebox.showinfo("Reconciled", f"{updated} payment(s) marked as reconciled.")
 
 
 
@@ -102,29 +98,10 @@ def open_reconcile_view():
         if note is None:
             return  # cancelled
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        updated = 0
-
+        updated = update_payment_tracking(selected, notes=note)
         for item_id in selected:
-            values = tree.item(item_id)["values"]
-            if len(values) < 2:
-                continue
-            invoice_number = values[1]
-
-            cursor.execute("""
-                INSERT INTO payment_tracking (invoice_number, notes)
-                VALUES (?, ?)
-                ON CONFLICT(invoice_number) DO UPDATE SET notes = excluded.notes
-            """, (invoice_number, note))
-
             # Update UI
             tree.set(item_id, column="Notes", value=note)
-            updated += 1
-
-        conn.commit()
-        conn.close()
 
         messagebox.showinfo("Note Saved", f"Note added to {updated} payment(s).")
 
@@ -150,103 +127,123 @@ def open_reconcile_view():
 
 
 
+    def match_bank_csv():
+        path = filedialog.askopenfilename(
+            title="Select bank deposit CSV",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        try:
+            result = reconcile_bank_csv(path)
+        except Exception as e:
+            messagebox.showerror("Bank Match Failed", str(e))
+            return
+
+        messagebox.showinfo(
+            "Bank Match",
+            f"Matched {len(result['matched'])} deposit(s) and marked {result['marked']} payment(s) reconciled.\n"
+            f"{len(result['ambiguous'])} need review, {len(result['unmatched'])} had no match."
+        )
+        if result["ambiguous"] or result["unmatched"]:
+            show_match_exceptions(result)
+
+    def show_match_exceptions(result):
+        """Only the deposits a person has to look at."""
+        ex_win = tk.Toplevel(win)
+        ex_win.title("Bank Deposits Needing Review")
+        ex_win.geometry("900x400")
+        apply_brand(ex_win)
+
+        ex_tree = ttk.Treeview(
+            ex_win,
+            columns=("Line", "Date", "Amount", "Bank Reference", "Result", "Candidates"),
+            show="headings",
+            style="Sage.Treeview"
+        )
+        for col in ex_tree["columns"]:
+            ex_tree.heading(col, text=col)
+            ex_tree.column(col, width=110)
+        ex_tree.column("Bank Reference", width=220)
+        ex_tree.column("Candidates", width=260)
+        ex_tree.pack(expand=True, fill="both", padx=10, pady=10)
+
+        for deposit, groups in result["ambiguous"]:
+            candidates = "; ".join(
+                " + ".join(f"#{p['invoice_number']} ({str(p['transaction_date'])[:10]})" for p in group)
+                for group in groups
+            )
+            ex_tree.insert("", "end", values=(
+                deposit["line"], deposit["date"].isoformat(), f"${deposit['amount']:,.2f}",
+                deposit["reference"], "Ambiguous", candidates
+            ))
+        for deposit in result["unmatched"]:
+            ex_tree.insert("", "end", values=(
+                deposit["line"], deposit["date"].isoformat(), f"${deposit['amount']:,.2f}",
+                deposit["reference"], "No match", ""
+            ))
+        zebra_tree(ex_tree)
+
     button_frame = tk.Frame(win)
     button_frame.pack(pady=5)
 
     tk.Button(button_frame, text="✔ Mark Reconciled", command=mark_selected_reconciled, width=20).grid(row=0, column=0, padx=5)
     tk.Button(button_frame, text="📝 Add/Edit Note", command=add_note_to_selected, width=20).grid(row=0, column=1, padx=5)
     tk.Button(button_frame, text="💰 Show Total", command=show_total, width=20).grid(row=0, column=2, padx=5)
+    tk.Button(button_frame, text="🏦 Match Bank CSV", command=match_bank_csv, width=20).grid(row=0, column=3, padx=5)
 
 
 
-    def run_search(query: str, mode: str):
+    def parse_date(text):
+        for fmt in ("%m-%d-%Y", "%Y-%m-%d", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    def run_search(query: str, mode: str, to_query: str = ""):
 
         tree.delete(*tree.get_children())
         q = query.strip()
         # print(f"🔍 Reconciliation search: {q} (mode: {mode})")
 
-        rows = []
-
         if mode == "Date":
-            parsed_date = None
-            for fmt in ("%m-%d-%Y", "%Y-%m-%d", "%m/%d/%Y"):
-                try:
-                    parsed_date = datetime.strptime(q, fmt).date()
-                    break
-                except ValueError:
-                    continue
-
-            if not parsed_date:
+            start = parse_date(q)
+            end = parse_date(to_query.strip()) if to_query.strip() else start
+
+            if not start or not end:
                 messagebox.showerror("Invalid Date", "Use MM-DD-YYYY or YYYY-MM-DD format.")
                 return
 
-            calc = StatementCalculator(
-                start_date=parsed_date,
-                end_date=parsed_date,
-                unpaid_only=False,
-                unreconciled_only=False
+            rows = find_payments(start_date=start, end_date=end)
+
+        elif mode in ("Reference", "Reference starts with"):
+            if not q:
+                messagebox.showwarning("Missing Reference", "Enter a reference to search for.")
+                return
+            rows = find_payments(
+                reference=q,
+                reference_prefix=(mode == "Reference starts with"),
+                billable_only=False
             )
-            rows, _ = calc.fetch()
-
-            # Get tracking info
-            conn = get_connection()
-            cursor = conn.cursor()
-            tracking = {}
-            for r in rows:
-                inv = r[2]
-                cursor.execute("SELECT reconciled, notes FROM payment_tracking WHERE invoice_number = ?", (inv,))
-                trow = cursor.fetchone()
-                if trow:
-                    tracking[inv] = {"reconciled": trow[0], "notes": trow[1]}
-            conn.close()
-
-            for row in rows:
-                if row[1] != "Payment":
-                    continue
-                tx_date, _, inv_num, amount, method, reference, note = row
-                date_str = tx_date.strftime("%Y-%m-%d") if hasattr(tx_date, "strftime") else str(tx_date)
-                rec = tracking.get(inv_num, {}).get("reconciled")
-                note = tracking.get(inv_num, {}).get("notes") or ""
-                is_rec = str(rec).strip().lower() in {"yes", "true", "1"}
-                check = "✔" if is_rec else ""
-                tags = ("reconciled",) if is_rec else ()
-                tree.insert("", "end", values=(
-                    date_str, inv_num, f"${amount:,.2f}", method, reference or "", check, note
-                ), tags=tags)
-
-        elif mode == "Reference":
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT
-                    p.transaction_date,
-                    p.invoice_number,
-                    p.amount,
-                    p.payment_method,
-                    p.reference,
-                    t.reconciled,
-                    t.notes
-                FROM payments_clean p
-                LEFT JOIN payment_tracking t ON p.invoice_number = t.invoice_number
-                WHERE p.reference = ?
-            """, (q,))
-            raw = cursor.fetchall()
-            conn.close()
-
-            for row in raw:
-                tx_date, inv_num, amount, method, reference, rec, note = row
-                date_str = tx_date.strftime("%Y-%m-%d") if hasattr(tx_date, "strftime") else str(tx_date)
-                is_rec = str(rec).strip().lower() in {"yes", "true", "1"}
-                check = "✔" if is_rec else ""
-                tags = ("reconciled",) if is_rec else ()
-                tree.insert("", "end", values=(
-                    date_str, inv_num, f"${amount:,.2f}", method, reference, check, note
-                ), tags=tags)
+        else:
+            rows = []
+
+        for row in rows:
+            is_rec = is_reconciled(row["reconciled"])
+            check = "✔" if is_rec else ""
+            tags = ("reconciled",) if is_rec else ()
+            tree.insert("", "end", iid=str(row["id"]), values=(
+                str(row["transaction_date"] or "")[:10],
+                row["invoice_number"],
+                f"${float(row['amount'] or 0):,.2f}",
+                row["payment_method"],
+                row["reference"] or "",
+                check,
+                row["notes"] or ""
+            ), tags=tags)
         zebra_tree(tree)
         # print(f"✅ Found {len(tree.get_children())} result(s).")
 
-
-
-
-
-
@@ -7,7 +7,8 @@ import subprocess
 from datetime import datetime
 
 from tobys_terminal.desktop.gui.customer_statement_creator import open_customer_statement_creator
-from tobys_terminal.shared.db import get_connection, generate_statement_number 
+from tobys_terminal.shared.db import generate_statement_number 
+from tobys_terminal.shared.statement_logic import get_statements_by_label
 
 def open_statement_history_view(preselect=None):
     win = tk.Toplevel()
@@ -66,18 +67,7 @@ def open_statement_history_view(preselect=None):
         if not preselect:
             return
 
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT statement_number, start_date, end_date, generated_on
-            FROM statement_tracking
-            WHERE company_label = ?
-            ORDER BY generated_on DESC
-        """, (preselect,))
-        rows = cur.fetchall()
-        conn.close()
-
-        for row in rows:
+        for row in get_statements_by_label(preselect):
             num, start, end, gen = row
             tree.insert("", "end", values=(
                 num,
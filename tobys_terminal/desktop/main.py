@@ -19,8 +19,12 @@ from tobys_terminal.desktop.gui.harlestons_roster_view import open_harlestons_ro
 # Shared imports
 from tobys_terminal.shared.customer_utils import get_company_label
 from tobys_terminal.shared.db import initialize_db, ensure_views
-from tobys_terminal.shared.db import get_connection, ensure_statement_tables, ensure_indexes, ensure_customer_profiles_table
+from tobys_terminal.shared.db import get_connection, ensure_statement_tables, ensure_indexes, ensure_customer_profiles_table, ensure_payment_tracking_table
 from tobys_terminal.shared.settings import ensure_settings_table
+from tobys_terminal.shared.customer_search import ensure_customer_search_index
+from tobys_terminal.shared.reconciliation import ensure_reconciliation_indexes
+from tobys_terminal.shared.maintenance import schedule_idle_maintenance
+from tobys_terminal.shared.change_log import ensure_change_log
 from tobys_terminal.shared.settings import get_setting, set_setting
 
 # Import the new printavo_sync functionality
@@ -164,9 +168,13 @@ def main():
     initialize_db()
     ensure_views()
     ensure_statement_tables()
+    ensure_payment_tracking_table()
     ensure_indexes()
     ensure_customer_profiles_table()
     ensure_settings_table()  # Add this line
+    ensure_customer_search_index()
+    ensure_reconciliation_indexes()
+    ensure_change_log()
 
 
     root = tk.Tk()
@@ -321,7 +329,13 @@ Fast imports, statements, A/R dashboard."
             set_setting(key, value)
         messagebox.showinfo("Settings", "Settings saved successfully!")
 
+    # ANALYZE / VACUUM / checkpoint in the background once nobody is using the app
+    schedule_idle_maintenance(root)
+
     root.mainloop()
 
 if __name__ == "__main__":
+    # The IMM report bundle renders in a process pool; needed for frozen builds
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
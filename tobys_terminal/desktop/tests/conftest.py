@@ -0,0 +1,27 @@
+# tobys_terminal/desktop/tests/conftest.py
+"""Shared fixtures: a throwaway database with the app's schema."""
+
+import sqlite3
+
+import pytest
+
+from tobys_terminal.shared.db import get_connection, use_database
+from tobys_terminal.shared.query_plans import create_schema
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a fresh database built by the app's setup code; get_connection() opens it."""
+    path = tmp_path / "terminal.db"
+    sqlite3.connect(path).close()
+    with use_database(path):
+        create_schema()
+        yield path
+
+
+@pytest.fixture
+def conn(db_path):
+    """Connection to db_path, closed after the test."""
+    connection = get_connection()
+    yield connection
+    connection.close()
@@ -0,0 +1,61 @@
+# tobys_terminal/desktop/tests/test_backup.py
+"""Snapshot, verify and restore round trip of the live database."""
+
+import pytest
+
+from tobys_terminal.shared import backup
+
+
+@pytest.fixture
+def backup_dir(tmp_path, monkeypatch):
+    path = tmp_path / "backups"
+    monkeypatch.setattr(backup, "BACKUP_DIR", path)
+    return path
+
+
+def _customers(conn):
+    return [row[0] for row in conn.execute("SELECT company FROM customers ORDER BY company")]
+
+
+def test_restore_brings_back_the_snapshot(conn, backup_dir):
+    conn.execute("INSERT INTO customers (company) VALUES ('Harlestons')")
+    conn.commit()
+    manifest = backup.create_backup(conn=conn)
+
+    conn.execute("INSERT INTO customers (company) VALUES ('Added Later')")
+    conn.execute("DELETE FROM customers WHERE company = 'Harlestons'")
+    conn.commit()
+    assert backup.verify_backup(manifest["file"]) == (True, "ok")
+
+    safety = backup.restore_backup(manifest["file"], conn=conn)
+
+    assert _customers(conn) == ["Harlestons"]
+    assert safety["label"] == backup.LABEL_PRE_RESTORE
+    assert {m["file"] for m in backup.list_backups()} == {manifest["file"], safety["file"]}
+
+
+def test_pre_restore_snapshot_holds_the_replaced_data(conn, backup_dir):
+    manifest = backup.create_backup(conn=conn)
+    conn.execute("INSERT INTO customers (company) VALUES ('Added Later')")
+    conn.commit()
+
+    safety = backup.restore_backup(manifest["file"], conn=conn)
+    assert _customers(conn) == []
+
+    backup.restore_backup(safety["file"], conn=conn)
+    assert _customers(conn) == ["Added Later"]
+
+
+def test_damaged_snapshot_is_not_restored(conn, backup_dir):
+    conn.execute("INSERT INTO customers (company) VALUES ('Harlestons')")
+    conn.commit()
+    manifest = backup.create_backup(conn=conn)
+    with open(backup_dir / manifest["file"], "ab") as f:
+        f.write(b"garbage")
+
+    ok, message = backup.verify_backup(manifest["file"])
+    assert not ok and "Checksum" in message
+    with pytest.raises(ValueError):
+        backup.restore_backup(manifest["file"], conn=conn)
+    assert _customers(conn) == ["Harlestons"]
+    assert [m["label"] for m in backup.list_backups()] == [backup.LABEL_MANUAL]
@@ -0,0 +1,65 @@
+# tobys_terminal/desktop/tests/test_bank_matching.py
+"""Matching bank deposits to payments (match_deposits)."""
+
+from datetime import date
+
+from tobys_terminal.shared.bank_matching import match_deposits
+
+
+def _deposit(amount, day=date(2025, 9, 5), reference=""):
+    cents = int(round(amount * 100))
+    return {"line": 2, "date": day, "cents": cents, "amount": amount, "reference": reference}
+
+
+def _payment(payment_id, amount, day="2025-09-05", reference=""):
+    return {"id": payment_id, "transaction_date": day, "amount": amount, "reference": reference}
+
+
+def _ids(groups):
+    return [[p["id"] for p in group] for group in groups]
+
+
+def test_single_candidate_is_matched():
+    deposit = _deposit(125.0)
+    result = match_deposits([deposit], [_payment(1, 125.0), _payment(2, 80.0)])
+
+    assert [(d, _ids([group])) for d, group in result["matched"]] == [(deposit, [[1]])]
+    assert result["ambiguous"] == [] and result["unmatched"] == []
+
+
+def test_payment_outside_the_window_is_not_a_candidate():
+    result = match_deposits([_deposit(125.0)], [_payment(1, 125.0, day="2025-09-15")])
+
+    assert result["matched"] == [] and len(result["unmatched"]) == 1
+
+
+def test_two_deposits_for_one_payment_are_both_ambiguous():
+    first, second = _deposit(60.0), _deposit(60.0, day=date(2025, 9, 6))
+    result = match_deposits([first, second], [_payment(1, 60.0)])
+
+    assert result["matched"] == []
+    assert [(d, _ids(found)) for d, found in result["ambiguous"]] == [(first, [[1]]), (second, [[1]])]
+
+
+def test_reference_breaks_a_tie():
+    deposit = _deposit(60.0, reference="CHECK 4417")
+    result = match_deposits([deposit], [_payment(1, 60.0, reference="4410"), _payment(2, 60.0, reference="4417")])
+
+    assert [_ids([group]) for _d, group in result["matched"]] == [[[2]]]
+    assert result["ambiguous"] == []
+
+
+def test_one_check_paying_several_invoices():
+    payments = [_payment(1, 40.0, reference="5001"), _payment(2, 35.5, reference="5001")]
+    result = match_deposits([_deposit(75.5)], payments)
+
+    assert [sorted(_ids([group])[0]) for _d, group in result["matched"]] == [[1, 2]]
+
+
+def test_reference_does_not_override_a_competing_deposit():
+    # Payment 2 could also be the unreferenced deposit, so neither is exact
+    payments = [_payment(1, 60.0), _payment(2, 60.0, reference="4417")]
+    result = match_deposits([_deposit(60.0), _deposit(60.0, reference="4417")], payments)
+
+    assert result["matched"] == []
+    assert len(result["ambiguous"]) == 2
@@ -0,0 +1,32 @@
+# tobys_terminal/desktop/tests/test_benchmark.py
+"""Benchmark harness: the synthetic database and comparing runs."""
+
+import sqlite3
+
+from tobys_terminal.shared.benchmark import compare_results, generate_dataset
+
+
+def test_synthetic_database_has_the_web_tables(tmp_path):
+    db_path = str(tmp_path / "bench.db")
+    counts = generate_dataset(db_path, scale=0.01)
+    assert counts["invoices"] > 0
+
+    conn = sqlite3.connect(db_path)
+    try:
+        admin = conn.execute("""
+            SELECT u.username, r.name FROM portal_users u JOIN user_roles r ON u.role_id = r.id WHERE u.id = 1
+        """).fetchone()
+        note = conn.execute("SELECT value FROM notes WHERE key = 'harlestons_global_notes'").fetchone()
+    finally:
+        conn.close()
+    assert admin == ("benchmark", "admin")
+    assert note is not None
+
+
+def test_benchmark_that_errors_in_new_is_a_regression():
+    old = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "c": {"error": "x"}}}
+    new = {"results": {"a": {"median_ms": 11.0}, "b": {"error": "OperationalError"}, "c": {"error": "x"}}}
+
+    rows = compare_results(old, new, threshold=0.2)
+
+    assert rows == [("a", 10.0, 11.0, 1.1, False), ("b", 10.0, None, None, True)]
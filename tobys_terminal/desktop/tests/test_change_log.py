@@ -0,0 +1,71 @@
+# tobys_terminal/desktop/tests/test_change_log.py
+"""Change-log triggers on the tracked tables."""
+
+from tobys_terminal.shared.change_log import changed_rows, changes_since, latest_seq
+from tobys_terminal.shared.printavo_sync import import_customers_from_csv
+
+CUSTOMERS_CSV = (
+    "Customer ID,First Name,Last Name,Company,Email\n"
+    "7,Ann,Lee,Harlestons,ann@example.com\n"
+    "8,Bo,Ray,IMM,bo@example.com\n"
+)
+
+
+def _changes(conn, seq=0, tables=None):
+    return [
+        (c["table"], c["row_key"], c["op"], c["columns"])
+        for c in changes_since(seq, tables=tables, conn=conn)["changes"]
+    ]
+
+
+def test_insert_update_delete_are_logged(conn):
+    conn.execute("INSERT INTO imm_orders (po_number, nickname, status) VALUES ('PO1', 'Shirts', 'New')")
+    conn.execute("UPDATE imm_orders SET status = 'Inline-EMB', notes = 'rush' WHERE po_number = 'PO1'")
+    conn.execute("DELETE FROM imm_orders WHERE po_number = 'PO1'")
+    conn.commit()
+
+    assert _changes(conn, tables=["imm_orders"]) == [
+        ("imm_orders", "PO1", "I", []),
+        ("imm_orders", "PO1", "U", ["status", "notes"]),
+        ("imm_orders", "PO1", "D", []),
+    ]
+
+
+def test_unchanged_update_is_not_logged(conn):
+    conn.execute("INSERT INTO imm_orders (po_number, nickname, status) VALUES ('PO1', 'Shirts', 'New')")
+    conn.commit()
+    seq = latest_seq(conn)
+
+    conn.execute("UPDATE imm_orders SET status = 'New' WHERE po_number = 'PO1'")
+    conn.execute("UPDATE imm_orders SET version = version + 1 WHERE po_number = 'PO1'")
+    conn.commit()
+
+    assert latest_seq(conn) == seq
+    assert _changes(conn, seq) == []
+
+
+def test_reimporting_customers_logs_only_real_changes(conn, tmp_path):
+    csv_path = tmp_path / "customers.csv"
+    csv_path.write_text(CUSTOMERS_CSV)
+    import_customers_from_csv(csv_path)
+    feed = changes_since(0, tables=["customers"], conn=conn)
+    assert changed_rows(feed["changes"]) == {"customers": {7: "I", 8: "I"}}
+
+    import_customers_from_csv(csv_path)
+    assert _changes(conn, feed["seq"]) == []
+
+    csv_path.write_text(CUSTOMERS_CSV.replace("bo@example.com", "bo@imm.example.com"))
+    import_customers_from_csv(csv_path)
+    assert _changes(conn, feed["seq"]) == [("customers", "8", "U", ["email"])]
+
+
+def test_pruned_entries_ask_for_a_reload(conn):
+    for po in ("PO1", "PO2", "PO3"):
+        conn.execute("INSERT INTO imm_orders (po_number, nickname, status) VALUES (?, 'Shirts', 'New')", (po,))
+    conn.commit()
+    first = changes_since(0, conn=conn)["changes"][0]["seq"]
+    conn.execute("DELETE FROM change_log WHERE seq <= ?", (first + 1,))
+    conn.commit()
+
+    assert changes_since(first, conn=conn)["reset"] is True
+    assert changes_since(first + 1, conn=conn)["reset"] is False
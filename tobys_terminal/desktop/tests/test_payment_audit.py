@@ -0,0 +1,83 @@
+# tobys_terminal/desktop/tests/test_payment_audit.py
+"""The payment audit's run-to-run diff of open discrepancies."""
+
+from tobys_terminal.shared.payment_audit import (
+    ORPHAN_PAYMENT, get_open_discrepancies, run_payment_audit,
+)
+from tobys_terminal.shared.payment_integrity import PAID_NO_MONEY, PARTIAL
+
+
+def _invoice(conn, number, total=100.0, paid="No"):
+    conn.execute("""
+        INSERT INTO invoices (invoice_number, customer_id, invoice_date, total, paid, invoice_status)
+        VALUES (?, 7, '2025-09-01', ?, ?, 'Done Done')
+    """, (number, total, paid))
+
+
+def _payment(conn, number, amount):
+    cur = conn.execute("""
+        INSERT INTO payments_clean (transaction_date, amount, invoice_number, payment_method, customer_id)
+        VALUES ('2025-09-05', ?, ?, 'Check', 7)
+    """, (amount, number))
+    return cur.lastrowid
+
+
+def _open(conn):
+    return {(d["kind"], d["invoice_number"]) for d in get_open_discrepancies(conn=conn)}
+
+
+def _status(conn, key):
+    return conn.execute(
+        "SELECT id, status, resolved_at FROM payment_discrepancies WHERE discrepancy_key = ?", (key,)
+    ).fetchone()
+
+
+def test_first_run_opens_every_finding(conn):
+    _invoice(conn, "A", paid="Yes")     # marked paid, no money
+    _invoice(conn, "B")
+    _payment(conn, "B", 40.0)           # partial
+    _invoice(conn, "C")
+    _payment(conn, "C", 100.0)          # fine
+    _payment(conn, "GONE", 25.0)        # no invoice
+    conn.commit()
+
+    summary = run_payment_audit(conn)
+
+    assert (summary["open"], summary["new"], summary["resolved"]) == (3, 3, 0)
+    assert _open(conn) == {(PAID_NO_MONEY, "A"), (PARTIAL, "B"), (ORPHAN_PAYMENT, "GONE")}
+
+
+def test_next_run_resolves_fixed_findings_and_keeps_the_rest(conn):
+    _invoice(conn, "A", paid="Yes")
+    _invoice(conn, "B")
+    _payment(conn, "B", 40.0)
+    conn.commit()
+    run_payment_audit(conn)
+    first_seen = get_open_discrepancies(kind=PARTIAL, conn=conn)[0]["first_seen"]
+
+    _payment(conn, "A", 100.0)
+    conn.commit()
+    summary = run_payment_audit(conn)
+
+    assert (summary["open"], summary["new"], summary["resolved"]) == (1, 0, 1)
+    assert _open(conn) == {(PARTIAL, "B")}
+    assert _status(conn, f"{PAID_NO_MONEY}:A")[1:2] == ("RESOLVED",)
+    # Still-open findings keep the row (and first_seen) they were opened with
+    assert get_open_discrepancies(kind=PARTIAL, conn=conn)[0]["first_seen"] == first_seen
+
+
+def test_recurring_finding_reopens_its_original_row(conn):
+    _invoice(conn, "A", paid="Yes")
+    conn.commit()
+    run_payment_audit(conn)
+    original_id = _status(conn, f"{PAID_NO_MONEY}:A")[0]
+
+    payment_id = _payment(conn, "A", 100.0)
+    conn.commit()
+    run_payment_audit(conn)
+    conn.execute("DELETE FROM payments_clean WHERE id = ?", (payment_id,))
+    conn.commit()
+    summary = run_payment_audit(conn)
+
+    assert summary["new"] == 1
+    assert _status(conn, f"{PAID_NO_MONEY}:A") == (original_id, "OPEN", None)
@@ -0,0 +1,50 @@
+# tobys_terminal/desktop/tests/test_query_plans.py
+"""Hot query plans, checked against a database built by the app's setup code."""
+
+import sqlite3
+
+import pytest
+
+from tobys_terminal.shared.query_plans import HOT_QUERIES, check_query_plans, plan_problems
+
+
+@pytest.fixture(scope="module")
+def plan_results():
+    return {result["name"]: result for result in check_query_plans()}
+
+
+@pytest.mark.parametrize("entry", HOT_QUERIES, ids=[entry["name"] for entry in HOT_QUERIES])
+def test_hot_query_uses_its_indexes(plan_results, entry):
+    result = plan_results[entry["name"]]
+    assert result["statements"], "the code path ran no queries"
+    assert not result["problems"], "\n".join(result["plan"] + result["problems"])
+
+
+def test_scans_and_automatic_indexes_fail_unless_allowed():
+    details = [
+        "SCAN pay LEFT-JOIN",
+        "SEARCH p USING AUTOMATIC COVERING INDEX (invoice_number=?) LEFT-JOIN",
+        "SEARCH i USING INDEX idx_invoices_customer (customer_id=?)",
+        "SCAN CONSTANT ROW",
+    ]
+    problems = plan_problems(details)
+    assert len(problems) == 2
+    assert "SCAN pay" in problems[0] and "AUTOMATIC" in problems[1]
+    assert plan_problems(details, allow={"pay": "test", "p": "test"}) == []
+
+
+def test_unmigrated_database_is_checked_after_migration(tmp_path):
+    # payment_tracking as it was before it was keyed per payment
+    old = sqlite3.connect(tmp_path / "old.db")
+    old.executescript("""
+        CREATE TABLE payment_tracking (invoice_number TEXT PRIMARY KEY, reconciled INTEGER, notes TEXT);
+        INSERT INTO payment_tracking VALUES ('1001', 1, 'checked');
+    """)
+    try:
+        results = check_query_plans(old)
+        columns = [row[1] for row in old.execute("PRAGMA table_info(payment_tracking)")]
+    finally:
+        old.close()
+
+    assert [r["name"] for r in results if r["problems"]] == []
+    assert "payment_id" not in columns  # the source database is left alone
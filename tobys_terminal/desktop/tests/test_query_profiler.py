@@ -0,0 +1,43 @@
+# tobys_terminal/desktop/tests/test_query_profiler.py
+"""Profiled cursors that are garbage-collected before they are drained."""
+
+import threading
+from collections import deque
+
+import pytest
+
+from tobys_terminal.shared import query_profiler
+
+
+@pytest.fixture
+def profiled(db_path, monkeypatch):
+    monkeypatch.setattr(query_profiler, "_enabled", True)
+    monkeypatch.setattr(query_profiler, "_live_stats", {})
+    monkeypatch.setattr(query_profiler, "_pending_stats", {})
+    monkeypatch.setattr(query_profiler, "_pending_log", {})
+    monkeypatch.setattr(query_profiler, "_finalized", deque())
+    conn = query_profiler.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _calls(sql):
+    fp = query_profiler.fingerprint(sql)
+    return sum(s["calls"] for (key, _site), s in query_profiler._live_stats.items() if key == fp)
+
+
+def test_finalizer_does_not_wait_for_the_lock(profiled):
+    sql = "SELECT name FROM sqlite_master"
+    cur = profiled.execute(sql)
+    cur.fetchone()   # not drained, so still pending
+
+    # As if the garbage collector ran while this thread was inside _record
+    finalizer = threading.Thread(target=cur.__del__, daemon=True)
+    with query_profiler._lock:
+        finalizer.start()
+        finalizer.join(timeout=2)
+        assert not finalizer.is_alive(), "cursor finalizer blocked on the profiler lock"
+    assert _calls(sql) == 0
+
+    profiled.execute("SELECT 1").fetchall()
+    assert _calls(sql) == 1
@@ -0,0 +1,44 @@
+# tobys_terminal/desktop/tests/test_read_replica.py
+"""Portal reads from the published replica, with query profiling on."""
+
+import sqlite3
+
+import pytest
+
+from tobys_terminal.shared import query_profiler, read_replica
+
+
+@pytest.fixture
+def replica(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(read_replica, "READ_REPLICA", True)
+    monkeypatch.setattr(read_replica, "REPLICA_DIR", tmp_path / "replica")
+    monkeypatch.setattr(query_profiler, "_enabled", True)
+    monkeypatch.setattr(query_profiler, "_pending_stats", {})
+    monkeypatch.setattr(query_profiler, "_pending_log", {})
+    monkeypatch.setattr(query_profiler, "SLOW_QUERY_MS", 0)   # log every statement
+    conn.execute("INSERT INTO customers (id, company) VALUES (7, 'Harlestons')")
+    conn.commit()
+    read_replica.publish_replica(conn)
+    read_replica.use_read_replica(True)
+    yield
+    read_replica.use_read_replica(False)
+
+
+def test_replica_query_stats_are_flushed_to_the_source_database(replica, db_path):
+    replica_conn = read_replica.replica_connection()
+    assert replica_conn is not None
+    try:
+        assert replica_conn.execute("SELECT company FROM customers WHERE id = 7").fetchall() == [("Harlestons",)]
+    finally:
+        replica_conn.close()
+
+    assert set(query_profiler._pending_log) == {str(db_path)}
+    assert query_profiler.flush_query_log() > 0
+    assert query_profiler._pending_log == {} and query_profiler._pending_stats == {}
+
+    source = sqlite3.connect(db_path)
+    try:
+        logged = [row[0] for row in source.execute("SELECT sql FROM query_log")]
+    finally:
+        source.close()
+    assert "select company from customers where id = ?" in logged
@@ -0,0 +1,105 @@
+# tobys_terminal/desktop/tests/test_roster_edits.py
+"""Version-checked roster edits (apply_roster_patch)."""
+
+from tobys_terminal.shared import roster_edits
+from tobys_terminal.shared.roster_edits import apply_roster_patch
+
+
+def _add_order(conn, notes="first"):
+    cur = conn.execute(
+        "INSERT INTO imm_orders (po_number, nickname, status, notes) VALUES ('PO1', 'Shirts', 'New', ?)",
+        (notes,),
+    )
+    conn.commit()
+    order_id = cur.lastrowid
+    version = conn.execute("SELECT version FROM imm_orders WHERE id = ?", (order_id,)).fetchone()[0]
+    return order_id, version
+
+
+def _row(conn, order_id):
+    return conn.execute("SELECT notes, status, version FROM imm_orders WHERE id = ?", (order_id,)).fetchone()
+
+
+def test_changed_cell_is_applied_and_version_bumped(conn):
+    order_id, version = _add_order(conn)
+
+    result = apply_roster_patch(conn, "imm_orders", [
+        {"order_id": order_id, "field": "notes", "value": "second", "version": version},
+    ])
+
+    assert result["conflicts"] == [] and result["errors"] == []
+    assert result["applied"] == [{"order_id": order_id, "version": version + 1}]
+    assert _row(conn, order_id) == ("second", "New", version + 1)
+
+
+def test_stale_version_is_rejected(conn):
+    order_id, version = _add_order(conn)
+    # Someone else saves first
+    conn.execute("UPDATE imm_orders SET status = 'Inline-EMB' WHERE id = ?", (order_id,))
+    conn.commit()
+
+    result = apply_roster_patch(conn, "imm_orders", [
+        {"order_id": order_id, "field": "notes", "value": "mine", "version": version},
+    ])
+
+    assert result["applied"] == []
+    assert result["conflicts"] == [
+        {"order_id": order_id, "field": "notes", "value": "first", "version": version + 1},
+    ]
+    assert _row(conn, order_id) == ("first", "Inline-EMB", version + 1)
+
+
+def test_unchanged_cells_are_not_written(conn):
+    order_id, version = _add_order(conn)
+
+    result = apply_roster_patch(conn, "imm_orders", [
+        {"order_id": order_id, "field": "notes", "value": "first", "version": version},
+        {"order_id": order_id, "field": "status", "value": "New", "version": version},
+    ])
+
+    assert result == {"applied": [], "conflicts": [], "errors": []}
+    assert _row(conn, order_id)[2] == version
+
+
+def test_unknown_field_and_order_are_errors(conn):
+    order_id, version = _add_order(conn)
+
+    result = apply_roster_patch(conn, "imm_orders", [
+        {"order_id": order_id, "field": "p_status", "value": "Done", "version": version},
+        {"order_id": order_id + 100, "field": "notes", "value": "x"},
+    ])
+
+    assert result["applied"] == []
+    assert [e["error"] for e in result["errors"]] == ["Invalid field name", "Order not found"]
+
+
+def test_unchanged_update_leaves_version_alone(conn):
+    order_id, version = _add_order(conn)
+    # What a sync does to every existing PO
+    conn.execute("UPDATE imm_orders SET nickname = 'Shirts', status = 'New' WHERE id = ?", (order_id,))
+    conn.commit()
+
+    assert _row(conn, order_id)[2] == version
+    result = apply_roster_patch(conn, "imm_orders", [
+        {"order_id": order_id, "field": "notes", "value": "mine", "version": version},
+    ])
+    assert result["conflicts"] == []
+    assert _row(conn, order_id) == ("mine", "New", version + 1)
+
+
+def test_old_unconditional_trigger_is_replaced(conn, monkeypatch):
+    conn.execute("DROP TRIGGER imm_orders_version_bump")
+    conn.execute("""
+        CREATE TRIGGER imm_orders_version_bump AFTER UPDATE ON imm_orders
+        WHEN new.version IS old.version
+        BEGIN UPDATE imm_orders SET version = old.version + 1 WHERE id = new.id; END
+    """)
+    conn.commit()
+    monkeypatch.setattr(roster_edits, "_versioned_tables", set())
+    roster_edits.ensure_roster_versioning(conn, "imm_orders")
+    order_id, version = _add_order(conn)
+
+    conn.execute("UPDATE imm_orders SET status = 'New' WHERE id = ?", (order_id,))
+    conn.commit()
+
+    assert _row(conn, order_id)[2] == version
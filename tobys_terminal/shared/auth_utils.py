@@ -6,7 +6,8 @@ from flask import session, redirect, url_for, flash, current_app
 def get_db_connection():
     """Create and return a database connection with row factory"""
     from config import get_db_path
-    conn = sqlite3.connect(get_db_path())
+    from tobys_terminal.shared.query_profiler import connect
+    conn = connect(get_db_path())
     conn.row_factory = sqlite3.Row
     return conn
 
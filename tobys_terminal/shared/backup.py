@@ -0,0 +1,337 @@
+# tobys_terminal/shared/backup.py
+"""
+Online backups of terminal.db.
+
+Copying terminal.db while the desktop app or the portal is writing to it can
+capture a half-written file. Snapshots here go through SQLite's backup API
+instead, a batch of pages at a time with a short pause in between, so writers
+are only held up for one batch. Each snapshot is integrity-checked, gzipped
+and written next to a JSON manifest with its SHA-256, and old snapshots are
+pruned per label (manual, pre-sync, pre-restore, ...).
+
+sync_all() takes a "pre-sync" snapshot before it starts rewriting tables.
+Restores check the checksum and integrity first, snapshot the current
+database ("pre-restore"), then copy the snapshot back through the backup API
+so open connections see the restored data.
+
+    python -m tobys_terminal.shared.backup                    # take a snapshot
+    python -m tobys_terminal.shared.backup --list
+    python -m tobys_terminal.shared.backup --verify terminal-20250101-120000-manual
+    python -m tobys_terminal.shared.backup --restore terminal-20250101-120000-manual
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from config import PROJECT_ROOT
+from tobys_terminal.shared.db import get_connection
+
+BACKUP_DIR = PROJECT_ROOT / "backups"
+BACKUP_PAGES_PER_STEP = 512    # pages copied per backup step
+BACKUP_STEP_PAUSE = 0.01       # seconds between steps, so writers get a turn
+BACKUP_MAX_RESTARTS = 3        # restarts (caused by writes) before copying in one step
+
+# Snapshots kept per label; labels not listed keep BACKUP_KEEP_DEFAULT
+BACKUP_RETENTION = {"manual": 30, "daily": 14, "pre-sync": 5, "pre-restore": 5}
+BACKUP_KEEP_DEFAULT = 10
+
+try:
+    from config import BACKUP_DIR  # noqa: F811
+except ImportError:
+    pass
+try:
+    from config import BACKUP_RETENTION  # noqa: F811
+except ImportError:
+    pass
+
+LABEL_MANUAL = "manual"
+LABEL_PRE_SYNC = "pre-sync"
+LABEL_PRE_RESTORE = "pre-restore"
+
+_CHUNK = 1024 * 1024
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _main_db_path(conn):
+    for _seq, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path
+    return ""
+
+
+def _quick_check(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    return result
+
+
+class _BackupKeepsRestarting(Exception):
+    pass
+
+
+def paced_backup(source, dest):
+    """
+    source.backup(dest) in batches, pausing between them.
+
+    SQLite starts a batched backup over whenever another connection writes
+    to the source, so if that keeps happening the copy is finished in one
+    step instead (holding a read lock for the length of the copy).
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def pause(_status, remaining, _total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] >= BACKUP_MAX_RESTARTS:
+                raise _BackupKeepsRestarting()
+        state["remaining"] = remaining
+        time.sleep(BACKUP_STEP_PAUSE)
+
+    try:
+        source.backup(dest, pages=BACKUP_PAGES_PER_STEP, progress=pause)
+    except _BackupKeepsRestarting:
+        source.backup(dest)
+
+
+def _resolve(name_or_path):
+    """Snapshot path from a path or a bare name (with or without .db.gz)."""
+    path = Path(name_or_path)
+    if not path.exists():
+        name = path.name if path.name.endswith(".db.gz") else f"{path.name}.db.gz"
+        path = Path(BACKUP_DIR) / name
+    if not path.exists():
+        raise FileNotFoundError(f"No backup named {name_or_path} in {BACKUP_DIR}")
+    return path
+
+
+def _manifest_path(gz_path):
+    return Path(str(gz_path)[:-len(".db.gz")] + ".json")
+
+
+def create_backup(label=LABEL_MANUAL, conn=None, prune=True):
+    """
+    Snapshot the live database.
+
+    Returns:
+        dict: the manifest (file, label, created_at, sha256, sizes, duration)
+    """
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+
+    created_at = datetime.now()
+    name = f"terminal-{created_at.strftime('%Y%m%d-%H%M%S')}-{label}"
+    # Two snapshots in the same second (a restore of a pre-restore snapshot
+    # takes one) must not overwrite each other
+    suffix = 1
+    while (Path(BACKUP_DIR) / f"{name}.db.gz").exists():
+        suffix += 1
+        name = f"terminal-{created_at.strftime('%Y%m%d-%H%M%S')}-{label}-{suffix}"
+    raw_path = Path(BACKUP_DIR) / f"{name}.db"
+    gz_path = Path(BACKUP_DIR) / f"{name}.db.gz"
+    started = time.perf_counter()
+    try:
+        dest = sqlite3.connect(raw_path)
+        try:
+            paced_backup(conn, dest)
+        finally:
+            dest.close()
+        source_path = _main_db_path(conn)
+    finally:
+        if own_conn:
+            conn.close()
+
+    try:
+        check = _quick_check(raw_path)
+        if check != "ok":
+            raise sqlite3.DatabaseError(f"Snapshot failed its integrity check: {check}")
+        with open(raw_path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(src, out, _CHUNK)
+        db_bytes = os.path.getsize(raw_path)
+    finally:
+        if raw_path.exists():
+            raw_path.unlink()
+
+    manifest = {
+        "file": gz_path.name,
+        "label": label,
+        "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "source": source_path,
+        "db_bytes": db_bytes,
+        "gz_bytes": os.path.getsize(gz_path),
+        "sha256": _sha256(gz_path),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    with open(_manifest_path(gz_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if prune:
+        prune_backups(label)
+    return manifest
+
+
+def list_backups(label=None):
+    """Manifests of the snapshots on disk, newest first."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    manifests = []
+    for path in Path(BACKUP_DIR).glob("terminal-*.json"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping unreadable backup manifest {path.name}: {e}")
+            continue
+        if label is None or manifest.get("label") == label:
+            manifests.append(manifest)
+    manifests.sort(key=lambda m: m["created_at"], reverse=True)
+    return manifests
+
+
+def prune_backups(label=None):
+    """Delete snapshots beyond the retention count of their label. Returns the files removed."""
+    removed = []
+    labels = [label] if label else {m["label"] for m in list_backups()}
+    for lbl in labels:
+        keep = BACKUP_RETENTION.get(lbl, BACKUP_KEEP_DEFAULT)
+        for manifest in list_backups(lbl)[keep:]:
+            gz_path = Path(BACKUP_DIR) / manifest["file"]
+            for path in (gz_path, _manifest_path(gz_path)):
+                if path.exists():
+                    path.unlink()
+            removed.append(manifest["file"])
+    return removed
+
+
+def verify_backup(name_or_path):
+    """
+    Check a snapshot's checksum against its manifest, then its integrity.
+
+    Returns:
+        (ok, message)
+    """
+    gz_path = _resolve(name_or_path)
+    manifest_path = _manifest_path(gz_path)
+    if not manifest_path.exists():
+        return False, f"Manifest {manifest_path.name} is missing"
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if _sha256(gz_path) != manifest["sha256"]:
+        return False, "Checksum mismatch - the snapshot file is damaged"
+
+    raw_path = gz_path.with_suffix(".verify")
+    try:
+        with gzip.open(gz_path, "rb") as src, open(raw_path, "wb") as out:
+            shutil.copyfileobj(src, out, _CHUNK)
+        check = _quick_check(raw_path)
+    finally:
+        if raw_path.exists():
+            raw_path.unlink()
+    if check != "ok":
+        return False, f"Integrity check failed: {check}"
+    return True, "ok"
+
+
+def restore_backup(name_or_path, conn=None):
+    """
+    Replace the live database's contents with a snapshot.
+
+    The snapshot is verified first and the current database is snapshotted
+    (label pre-restore) before anything is overwritten.
+
+    Returns:
+        dict: manifest of the pre-restore snapshot
+    """
+    gz_path = _resolve(name_or_path)
+    ok, message = verify_backup(gz_path)
+    if not ok:
+        raise ValueError(f"Refusing to restore {gz_path.name}: {message}")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    raw_path = gz_path.with_suffix(".restore")
+    try:
+        safety = create_backup(LABEL_PRE_RESTORE, conn=conn)
+        with gzip.open(gz_path, "rb") as src, open(raw_path, "wb") as out:
+            shutil.copyfileobj(src, out, _CHUNK)
+        source = sqlite3.connect(raw_path)
+        try:
+            conn.commit()
+            paced_backup(source, conn)
+        finally:
+            source.close()
+    finally:
+        if raw_path.exists():
+            raw_path.unlink()
+        if own_conn:
+            conn.close()
+    return safety
+
+
+def backup_cli():
+    """Command-line entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Online database snapshots")
+    parser.add_argument("--label", default=LABEL_MANUAL, help="Label for a new snapshot (default: manual)")
+    parser.add_argument("--list", action="store_true", help="List snapshots")
+    parser.add_argument("--verify", metavar="NAME", help="Check a snapshot's checksum and integrity")
+    parser.add_argument("--restore", metavar="NAME", help="Restore a snapshot over the live database")
+    parser.add_argument("--yes", action="store_true", help="Don't ask before restoring")
+    parser.add_argument("--prune", action="store_true", help="Apply retention without taking a snapshot")
+    args = parser.parse_args()
+
+    if args.list:
+        for m in list_backups():
+            print(f"{m['created_at']}  {m['label']:<12} {m['gz_bytes'] / 1024 / 1024:>8,.1f} MB  "
+                  f"{m['file']}")
+        return
+    if args.verify:
+        try:
+            ok, message = verify_backup(args.verify)
+        except FileNotFoundError as e:
+            ok, message = False, str(e)
+        print(f"{'✅' if ok else '❌'} {args.verify}: {message}")
+        raise SystemExit(0 if ok else 1)
+    if args.restore:
+        if not args.yes and input(f"Overwrite the live database with {args.restore}? [y/N] ").lower() != "y":
+            print("Cancelled.")
+            return
+        try:
+            safety = restore_backup(args.restore)
+        except (ValueError, FileNotFoundError) as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ Restored {args.restore} (previous data saved as {safety['file']})")
+        return
+    if args.prune:
+        for name in prune_backups():
+            print(f"Removed {name}")
+        return
+
+    m = create_backup(args.label)
+    print(f"✅ {m['file']}: {m['db_bytes'] / 1024 / 1024:,.1f} MB -> {m['gz_bytes'] / 1024 / 1024:,.1f} MB "
+          f"in {m['duration_ms']:,.0f} ms")
+
+
+if __name__ == "__main__":
+    backup_cli()
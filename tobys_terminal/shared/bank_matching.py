@@ -0,0 +1,216 @@
+# tobys_terminal/shared/bank_matching.py
+"""
+Match a bank deposit export against payments_clean.
+
+Deposits are read from the bank's CSV, then looked up in hash indexes built
+once over the candidate payments (amount in cents -> payments, and amount ->
+same-day payments sharing a reference, for one check paying several
+invoices). A deposit is an exact match when it resolves to exactly one
+candidate within the date window and no other deposit could also be that
+payment; exact matches can be marked reconciled in bulk, everything else is
+returned for a person to look at. Payments already reconciled are not
+candidates.
+"""
+
+import csv
+from datetime import datetime, timedelta
+
+from tobys_terminal.shared.reconciliation import find_payments, mark_payments_reconciled
+
+# Days either side of the bank date a payment may have been recorded
+DATE_WINDOW_DAYS = 3
+
+# Header names (lower case) tried in order for each deposit field
+DATE_COLUMNS = ("date", "posting date", "posted date", "transaction date", "effective date")
+AMOUNT_COLUMNS = ("amount", "credit", "deposit", "deposits", "credit amount")
+REFERENCE_COLUMNS = ("reference", "check number", "check #", "description", "memo", "details")
+
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%Y/%m/%d")
+
+
+def _parse_date(value):
+    value = (value or "").strip()[:10]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _to_cents(value):
+    """'$1,234.50' / '(12.00)' / 1234.5 -> integer cents, or None."""
+    if value is None:
+        return None
+    text = str(value).strip().replace("$", "").replace(",", "")
+    negative = text.startswith("(") and text.endswith(")")
+    text = text.strip("()")
+    if not text:
+        return None
+    try:
+        cents = int(round(float(text) * 100))
+    except ValueError:
+        return None
+    return -cents if negative else cents
+
+
+def _pick_column(fieldnames, candidates):
+    lookup = {(name or "").strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def read_bank_deposits(csv_path):
+    """
+    Read deposits (credits) from a bank CSV export.
+    Returns a list of dicts: line, date, cents, amount, reference.
+    """
+    deposits = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        date_col = _pick_column(fieldnames, DATE_COLUMNS)
+        amount_col = _pick_column(fieldnames, AMOUNT_COLUMNS)
+        ref_col = _pick_column(fieldnames, REFERENCE_COLUMNS)
+        if not date_col or not amount_col:
+            raise ValueError(f"Could not find date/amount columns in {csv_path} (headers: {fieldnames})")
+
+        for line, row in enumerate(reader, start=2):
+            day = _parse_date(row.get(date_col))
+            cents = _to_cents(row.get(amount_col))
+            if day is None or not cents or cents <= 0:
+                continue  # withdrawals, blanks and balance lines
+            deposits.append({
+                "line": line,
+                "date": day,
+                "cents": cents,
+                "amount": cents / 100,
+                "reference": (row.get(ref_col) or "").strip() if ref_col else "",
+            })
+    return deposits
+
+
+def _reference_matches(deposit_ref, payment_ref):
+    deposit_ref = (deposit_ref or "").strip().lower()
+    payment_ref = (payment_ref or "").strip().lower()
+    if not deposit_ref or not payment_ref:
+        return False
+    return payment_ref == deposit_ref or payment_ref in deposit_ref.split() or deposit_ref in payment_ref
+
+
+def _build_indexes(payments):
+    """
+    Hash indexes over the candidate payments:
+        by_amount:  cents -> [payment group]
+    where a group is a tuple of payments. Single payments are groups of one;
+    payments sharing a reference on the same day are also indexed by their
+    combined amount (one check covering several invoices).
+    """
+    by_amount = {}
+    by_reference_day = {}
+    for p in payments:
+        p["_date"] = _parse_date(p["transaction_date"])
+        p["_cents"] = _to_cents(p["amount"]) or 0
+        by_amount.setdefault(p["_cents"], []).append((p,))
+        ref = (p["reference"] or "").strip().lower()
+        if ref and p["_date"]:
+            by_reference_day.setdefault((ref, p["_date"]), []).append(p)
+
+    for group in by_reference_day.values():
+        if len(group) > 1:
+            total = sum(p["_cents"] for p in group)
+            by_amount.setdefault(total, []).append(tuple(group))
+    return by_amount
+
+
+def match_deposits(deposits, payments, window_days=DATE_WINDOW_DAYS):
+    """
+    Match deposits to payment groups.
+
+    Returns dict with
+        matched   - [(deposit, [payments])] one-to-one: the deposit has exactly
+                    one candidate and no other deposit competes for its payments
+        ambiguous - [(deposit, [[payments], ...])] several candidates, or a
+                    candidate another deposit could also be
+        unmatched - [deposit] with no candidate at all
+    """
+    by_amount = _build_indexes(payments)
+    window = timedelta(days=window_days)
+
+    def candidates_for(deposit, claimed):
+        found = []
+        for group in by_amount.get(deposit["cents"], ()):
+            if any(id(p) in claimed for p in group):
+                continue
+            if all(p["_date"] and abs(p["_date"] - deposit["date"]) <= window for p in group):
+                found.append(group)
+        if len(found) > 1 and deposit["reference"]:
+            # Let the reference break ties when it can
+            by_ref = [g for g in found if any(_reference_matches(deposit["reference"], p["reference"]) for p in g)]
+            if by_ref:
+                found = by_ref
+        return found
+
+    claimed = set()
+    matched = []
+    pending = list(deposits)
+
+    # Resolve the unambiguous deposits first; claiming their payments can
+    # leave a single candidate for others, so repeat until nothing changes.
+    progress = True
+    while pending and progress:
+        progress = False
+        found_by_deposit = [candidates_for(deposit, claimed) for deposit in pending]
+
+        # How many pending deposits could each payment be
+        wanted = {}
+        for found in found_by_deposit:
+            for pid in {id(p) for group in found for p in group}:
+                wanted[pid] = wanted.get(pid, 0) + 1
+
+        still_pending = []
+        for deposit, found in zip(pending, found_by_deposit):
+            if len(found) == 1 and all(wanted[id(p)] == 1 for p in found[0]):
+                group = found[0]
+                claimed.update(id(p) for p in group)
+                matched.append((deposit, list(group)))
+                progress = True
+            else:
+                still_pending.append(deposit)
+        pending = still_pending
+
+    ambiguous = []
+    unmatched = []
+    for deposit in pending:
+        found = candidates_for(deposit, claimed)
+        if found:
+            ambiguous.append((deposit, [list(g) for g in found]))
+        else:
+            unmatched.append(deposit)
+
+    return {"matched": matched, "ambiguous": ambiguous, "unmatched": unmatched}
+
+
+def reconcile_bank_csv(csv_path, window_days=DATE_WINDOW_DAYS, auto_mark=True, conn=None):
+    """
+    Read a bank deposit CSV, match it against payments_clean, and (by
+    default) mark every exact match reconciled in one transaction.
+
+    Returns the match_deposits() result plus 'marked' (payments updated).
+    """
+    deposits = read_bank_deposits(csv_path)
+    if not deposits:
+        return {"matched": [], "ambiguous": [], "unmatched": [], "marked": 0}
+
+    start = min(d["date"] for d in deposits) - timedelta(days=window_days)
+    end = max(d["date"] for d in deposits) + timedelta(days=window_days)
+    payments = find_payments(start_date=start, end_date=end, billable_only=False, unreconciled_only=True, conn=conn)
+
+    result = match_deposits(deposits, payments, window_days)
+    result["marked"] = 0
+    if auto_mark and result["matched"]:
+        matched_payments = [p for _deposit, group in result["matched"] for p in group]
+        result["marked"] = mark_payments_reconciled(matched_payments, conn=conn)
+    return result
@@ -0,0 +1,606 @@
+# tobys_terminal/shared/benchmark.py
+"""
+Benchmark harness on synthetic data at a chosen multiple of production size.
+
+optimization_report.py only measures whatever terminal.db is on hand. This
+builds a throwaway database with the app's schema (created by its own setup
+code, see query_plans.create_schema) filled with seeded, repeatable synthetic
+customers, invoices, payments, statements and IMM / Harlestons orders, then
+times the real entry points against it: StatementCalculator.fetch,
+get_statement_summaries, reprint_statement, the A/R aggregation, the Flask
+routes (through the test client) and a Printavo sync_all of a synthetic
+export. Results are written as JSON so runs can be compared across commits.
+
+    python -m tobys_terminal.shared.benchmark --scale 10 --out bench/10x_before.json
+    python -m tobys_terminal.shared.benchmark --scale 10 --out bench/10x_after.json
+    python -m tobys_terminal.shared.benchmark --compare bench/10x_before.json bench/10x_after.json
+
+A run exits 1 if any benchmark raised; --compare exits 1 if one got slower
+than --fail-over or errored in NEW after running in OLD.
+
+The synthetic database never touches terminal.db: the harness points
+TOBYS_TERMINAL_DB at it and refuses to run if config doesn't follow.
+"""
+
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from tobys_terminal.shared.db import use_database
+from tobys_terminal.shared.query_plans import copy_schema, create_schema
+
+IMM_CUSTOMER_IDS = [4246724]
+HARLESTONS_CUSTOMER_IDS = [5005118]
+try:
+    from config import IMM_CUSTOMER_IDS, HARLESTONS_CUSTOMER_IDS  # noqa: F811
+except ImportError:
+    pass
+
+# Rows at --scale 1 (about the size of the live database)
+BASE_ROWS = {
+    "customers": 800,
+    "invoices": 12000,
+    "statements": 600,
+}
+HISTORY_DAYS = 3 * 365
+ORDER_WINDOW_DAYS = 180      # invoices this recent also have a production order
+SYNC_EXPORT_DAYS = 30        # the synthetic Printavo export covers this many days
+DEFAULT_REPEAT = 5
+
+INVOICE_STATUSES = [
+    ("Done Done", 30), ("Picked Up", 18), ("Shipped", 10),
+    ("Complete and Ready for Pickup", 6), ("Payment Request Sent", 6),
+    ("Harlestons -- Invoiced", 4), ("Past Due Invoice - Followed Up", 2),
+    ("EMB - Flats - Inline", 5), ("Print DTF", 4), ("Waiting Product Only", 4),
+    ("Hold - Need More Information", 2), ("Quote", 3), ("Cancelled", 2),
+]
+ORDER_STATUSES = ["New", "Inline-EMB", "Inline-DTF", "Inline-PAT", "Need Sewout",
+                  "Need Product", "Need File", "Need Approval", "Complete", "Done Done"]
+PROCESSES = ["EMB", "DTF", "PAT", "EMB/DTF", "SCREEN"]
+PAYMENT_METHODS = ["Check", "Credit Card", "ACH", "Cash", "Stripe"]
+NAME_WORDS = ["Oak", "River", "Summit", "Harbor", "Maple", "Granite", "Cedar", "Pioneer",
+              "Liberty", "Coastal", "Sterling", "Blue", "Iron", "Golden", "Prairie"]
+NAME_SUFFIXES = ["Athletics", "Landscaping", "Church", "Brewing", "Academy", "Builders",
+                 "Dental", "Realty", "Boosters", "Marine", "Golf Club", "Outfitters"]
+
+# The portal's login/notes tables have no setup code in the app (they were
+# created by hand on the live database), so the harness makes them itself
+# unless --schema-db brought them along
+WEB_TABLES = """
+    CREATE TABLE IF NOT EXISTS notes (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS user_roles (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS permissions (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS role_permissions (
+        role_id INTEGER NOT NULL, permission_id INTEGER NOT NULL, PRIMARY KEY (role_id, permission_id)
+    );
+    CREATE TABLE IF NOT EXISTS user_permissions (
+        user_id INTEGER NOT NULL, permission_id INTEGER NOT NULL, PRIMARY KEY (user_id, permission_id)
+    );
+    CREATE TABLE IF NOT EXISTS portal_users (
+        id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, password TEXT,
+        company TEXT, role_id INTEGER REFERENCES user_roles(id)
+    );
+"""
+WEB_ROLES = {1: "admin", 2: "customer"}
+WEB_PERMISSIONS = {1: "manage_users", 2: "view_harlestons", 3: "edit_harlestons", 4: "view_imm", 5: "edit_imm"}
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+# ---------- synthetic data ----------
+
+def generate_dataset(db_path, scale=1.0, seed=42, schema_conn=None):
+    """
+    Create db_path with the app's schema and seeded synthetic data.
+
+    Args:
+        scale: multiple of BASE_ROWS (10 = ten times production)
+        seed: same seed + scale = same data
+        schema_conn: connection whose schema to copy first (default: the
+            schema comes from the setup code alone)
+
+    Returns:
+        dict of table -> row count
+    """
+    rng = random.Random(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    if schema_conn is not None:
+        conn = sqlite3.connect(db_path)
+        copy_schema(schema_conn, conn)
+        conn.close()
+    with use_database(db_path):
+        create_schema()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous = OFF")  # throwaway database
+
+    today = date.today()
+    n_customers = max(10, int(BASE_ROWS["customers"] * scale))
+    n_invoices = max(50, int(BASE_ROWS["invoices"] * scale))
+    n_statements = max(5, int(BASE_ROWS["statements"] * scale))
+
+    # Customers: IMM and Harlestons plus companies with one to a few contacts
+    companies = [f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_SUFFIXES)} {i}"
+                 for i in range(max(1, n_customers // 3))]
+    customers = [(cid, "IMM", "Buyer", "IMM") for cid in IMM_CUSTOMER_IDS]
+    customers += [(cid, "Harlestons", "Buyer", "Harlestons") for cid in HARLESTONS_CUSTOMER_IDS]
+    for i in range(n_customers - len(customers)):
+        company = rng.choice(companies) if rng.random() > 0.1 else ""
+        customers.append((3000000 + i, f"First{i}", f"Last{i}", company))
+    conn.executemany("""
+        INSERT INTO customers (id, first_name, last_name, company, email, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(cid, first, last, company, f"c{cid}@example.com", str(today - timedelta(days=HISTORY_DAYS)))
+          for cid, first, last, company in customers])
+    other_ids = [c[0] for c in customers[len(IMM_CUSTOMER_IDS) + len(HARLESTONS_CUSTOMER_IDS):]] or [customers[0][0]]
+
+    # Invoices, oldest first, and their payments
+    invoices, payments = [], []
+    for i in range(n_invoices):
+        roll = rng.random()
+        if roll < 0.2:
+            customer_id = rng.choice(IMM_CUSTOMER_IDS)
+        elif roll < 0.35:
+            customer_id = rng.choice(HARLESTONS_CUSTOMER_IDS)
+        else:
+            customer_id = rng.choice(other_ids)
+        inv_date = today - timedelta(days=HISTORY_DAYS - (i * HISTORY_DAYS) // n_invoices)
+        total = round(rng.uniform(40, 4000), 2)
+        status = _weighted(rng, INVOICE_STATUSES)
+        age = (today - inv_date).days
+        paid_share = 0.0
+        if status not in ("Quote", "Cancelled") and rng.random() < min(0.97, 0.3 + age / 120):
+            paid_share = 1.0 if rng.random() > 0.1 else round(rng.uniform(0.2, 0.8), 2)
+        amount_paid = round(total * paid_share, 2)
+        number = str(20000 + i)
+        invoices.append((
+            number, customer_id, str(inv_date), f"PO-{20000 + i}", total, amount_paid,
+            round(total - amount_paid, 2), 1 if paid_share == 1.0 else 0, status,
+            f"{rng.choice(NAME_WORDS)} order {i}", str(inv_date + timedelta(days=14)),
+        ))
+        if amount_paid:
+            splits = [amount_paid] if rng.random() > 0.15 else [round(amount_paid / 2, 2), round(amount_paid - amount_paid / 2, 2)]
+            for amount in splits:
+                tx_date = inv_date + timedelta(days=rng.randint(0, 45))
+                payments.append((
+                    str(min(tx_date, today)), amount, number, rng.choice(PAYMENT_METHODS),
+                    f"REF-{rng.randint(1000, 999999)}", customer_id,
+                ))
+    conn.executemany("""
+        INSERT INTO invoices (invoice_number, customer_id, invoice_date, po_number, total, amount_paid,
+                              amount_outstanding, paid, invoice_status, nickname, customer_due_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, invoices)
+    conn.executemany("""
+        INSERT INTO payments_clean (transaction_date, amount, invoice_number, payment_method, reference, customer_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, payments)
+
+    # Statements: a sample of customer-months older than 60 days
+    months = {}
+    for inv in invoices:
+        if (today - date.fromisoformat(inv[2])).days > 60 and inv[8] not in ("Quote", "Cancelled"):
+            months.setdefault((inv[1], inv[2][:7]), []).append(inv[0])
+    keys = sorted(months)
+    rng.shuffle(keys)
+    company_of = {c[0]: (c[3] or f"{c[1]} {c[2]}") for c in customers}
+    statements, tracked = [], []
+    for n, (customer_id, month) in enumerate(sorted(keys[:n_statements], key=lambda k: k[1]), start=1):
+        start = date.fromisoformat(f"{month}-01")
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        number = f"S{n:05d}"
+        statements.append((number, customer_id, str(end + timedelta(days=3)), str(start), str(end),
+                           company_of[customer_id], str(customer_id), "ACTIVE"))
+        tracked += [(inv_num, number, str(end + timedelta(days=3))) for inv_num in months[(customer_id, month)]]
+    conn.executemany("""
+        INSERT INTO statement_tracking (statement_number, customer_id, generated_on, start_date, end_date,
+                                        company_label, customer_ids_text, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, statements)
+    conn.executemany("INSERT INTO invoice_tracking (invoice_number, statement_number, tagged_on) VALUES (?, ?, ?)",
+                     tracked)
+
+    # Production orders for recent IMM / Harlestons invoices
+    cutoff = str(today - timedelta(days=ORDER_WINDOW_DAYS))
+    imm_orders, harlestons_orders = [], []
+    for inv in invoices:
+        if inv[2] < cutoff:
+            continue
+        in_hand = str(date.fromisoformat(inv[2]) + timedelta(days=rng.randint(7, 30)))
+        if inv[1] in IMM_CUSTOMER_IDS:
+            imm_orders.append((inv[3], inv[9], in_hand, inv[10], rng.choice(["Yes", "No"]), inv[0],
+                               rng.choice(PROCESSES), rng.choice(ORDER_STATUSES), inv[8], ""))
+        elif inv[1] in HARLESTONS_CUSTOMER_IDS:
+            harlestons_orders.append((inv[3], rng.choice(["Shop", "Club"]), inv[9], rng.choice(PROCESSES), inv[0],
+                                      rng.randint(6, 300), rng.choice(["High", "Medium", "Low"]), in_hand,
+                                      inv[10], rng.choice(ORDER_STATUSES), inv[8], ""))
+    conn.executemany("""
+        INSERT INTO imm_orders (po_number, nickname, in_hand_date, customer_due_date, firm_date,
+                                invoice_number, process, status, p_status, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, imm_orders)
+    conn.executemany("""
+        INSERT INTO harlestons_orders (po_number, location, club_nickname, process, invoice_number, pcs,
+                                       priority, in_hand_date, customer_due_date, status, p_status, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, harlestons_orders)
+    _seed_web_tables(conn)
+    conn.commit()
+
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("customers", "invoices", "payments_clean", "statement_tracking",
+                            "invoice_tracking", "imm_orders", "harlestons_orders")}
+    conn.close()
+    return counts
+
+
+def _seed_web_tables(conn):
+    """Roles, permissions, the benchmark's admin login (user 1) and the notes the terminals show."""
+    conn.executescript(WEB_TABLES)
+    conn.executemany("INSERT OR IGNORE INTO user_roles (id, name) VALUES (?, ?)", WEB_ROLES.items())
+    conn.executemany("INSERT OR IGNORE INTO permissions (id, name) VALUES (?, ?)", WEB_PERMISSIONS.items())
+    conn.executemany("INSERT OR IGNORE INTO role_permissions (role_id, permission_id) VALUES (1, ?)",
+                     [(pid,) for pid in WEB_PERMISSIONS])
+    conn.executemany("""
+        INSERT OR IGNORE INTO portal_users (id, username, password, company, role_id) VALUES (?, ?, ?, ?, ?)
+    """, [(1, "benchmark", "", "Harlestons", 1), (2, "harlestons", "", "Harlestons", 2), (3, "imm", "", "IMM", 2)])
+    conn.executemany("INSERT OR IGNORE INTO notes (key, value) VALUES (?, ?)", [
+        ("harlestons_global_notes", "Synthetic notes for the Harlestons terminal"),
+        ("admin_notes", ""),
+        ("lori_notes", ""),
+    ])
+
+
+def write_printavo_export(db_path, csv_dir, seed=42, days=SYNC_EXPORT_DAYS):
+    """
+    Printavo-style customers/orders/payments CSVs for the last `days` of
+    invoices, with some statuses moved on, for sync_all() to import.
+    """
+    rng = random.Random(seed + 1)
+    os.makedirs(csv_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    since = str(date.today() - timedelta(days=days))
+
+    with open(os.path.join(csv_dir, "customers.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Customer ID", "First Name", "Last Name", "Company", "Email", "Created"])
+        w.writerows(conn.execute("SELECT id, first_name, last_name, company, email, created_at FROM customers"))
+
+    with open(os.path.join(csv_dir, "orders.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Invoice #", "Customer Id", "Invoice Date", "PO #", "Total", "Amount Paid",
+                    "Amount Outstanding", "Paid?", "Invoice Status", "Nickname", "Customer Due Date"])
+        for row in conn.execute("""
+            SELECT invoice_number, customer_id, invoice_date, po_number, total, amount_paid,
+                   amount_outstanding, paid, invoice_status, nickname, customer_due_date
+            FROM invoices WHERE invoice_date >= ?
+        """, (since,)):
+            row = list(row)
+            if rng.random() < 0.3:
+                row[8] = _weighted(rng, INVOICE_STATUSES)
+            w.writerow(row)
+
+    with open(os.path.join(csv_dir, "payments.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Invoice #", "Amount", "Category", "Name", "Transaction Date", "Customer ID"])
+        w.writerows(conn.execute("""
+            SELECT invoice_number, amount, payment_method, reference, transaction_date, customer_id
+            FROM payments_clean WHERE transaction_date >= ?
+        """, (since,)))
+    conn.close()
+
+
+# ---------- running ----------
+
+@contextmanager
+def _use_database(db_path):
+    """Point get_connection() / get_db_connection() at db_path for the duration."""
+    previous = os.environ.get("TOBYS_TERMINAL_DB")
+    os.environ["TOBYS_TERMINAL_DB"] = db_path
+    try:
+        from config import get_db_path
+        if os.path.abspath(get_db_path()) != os.path.abspath(db_path):
+            raise RuntimeError("config.get_db_path() ignores TOBYS_TERMINAL_DB; refusing to run against the live database")
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("TOBYS_TERMINAL_DB", None)
+        else:
+            os.environ["TOBYS_TERMINAL_DB"] = previous
+
+
+def _measure(fn, repeat):
+    times, result = [], None
+    for i in range(repeat):
+        started = time.perf_counter()
+        result = fn(i)
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+        "result": result,
+    }
+
+
+def _one_year(today=None):
+    today = today or date.today()
+    return today - timedelta(days=365), today
+
+
+def _bench_statement_fetch(ctx, unpaid_only):
+    from tobys_terminal.shared.statement_logic import StatementCalculator
+    start, end = _one_year()
+
+    def run(_i):
+        rows, _totals = StatementCalculator(
+            customer_ids=list(IMM_CUSTOMER_IDS), start_date=start, end_date=end, unpaid_only=unpaid_only,
+        ).fetch()
+        return {"rows": len(rows)}
+    return run
+
+
+def _bench_statement_summaries(ctx):
+    from tobys_terminal.shared.statement_logic import get_statement_summaries
+
+    def run(_i):
+        return {"rows": len(get_statement_summaries(list(HARLESTONS_CUSTOMER_IDS)))}
+    return run
+
+
+def _bench_reprint(ctx):
+    from tobys_terminal.shared.reprint import reprint_statement
+
+    conn = sqlite3.connect(ctx["db_path"])
+    # A different statement each run: a repeat would be a PDF cache hit
+    numbers = [r[0] for r in conn.execute(
+        "SELECT statement_number FROM statement_tracking ORDER BY statement_number DESC LIMIT ?",
+        (ctx["repeat"],))]
+    conn.close()
+
+    def run(i):
+        path = reprint_statement(numbers[i % len(numbers)])
+        ctx["created_files"].append(path)
+        return {"bytes": os.path.getsize(path)}
+    return run
+
+
+def _bench_ar_summary(ctx):
+    from tobys_terminal.shared.invoice_logic import get_ar_summary
+
+    def run(_i):
+        return {"companies": len(get_ar_summary())}
+    return run
+
+
+def _bench_route(ctx, url):
+    client = _flask_client(ctx)
+
+    def run(_i):
+        resp = client.get(url)
+        body = resp.get_data()
+        if resp.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {resp.status_code}")
+        return {"bytes": len(body)}
+    return run
+
+
+def _flask_client(ctx):
+    if "client" not in ctx:
+        from tobys_terminal.web.app import app
+        app.config["TESTING"] = True
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["username"] = "benchmark"
+            sess["company"] = "Harlestons"
+            sess["role"] = "admin"
+            sess["permissions"] = []
+        ctx["client"] = client
+    return ctx["client"]
+
+
+def _bench_sync_all(ctx):
+    from tobys_terminal.shared import backup, printavo_sync, read_replica
+
+    def run(_i):
+        # Each run imports the same export on top of the previous one
+        csv_dir = os.path.join(ctx["work_dir"], "printavo_export")
+        write_printavo_export(ctx["db_path"], csv_dir, ctx["seed"])
+        previous = printavo_sync.CSV_DIR, backup.BACKUP_DIR, read_replica.REPLICA_DIR
+        printavo_sync.CSV_DIR = type(previous[0])(csv_dir)
+        # Keep snapshots/replicas of synthetic data out of the real folders
+        backup.BACKUP_DIR = os.path.join(ctx["work_dir"], "backups")
+        read_replica.REPLICA_DIR = os.path.join(ctx["work_dir"], "replica")
+        try:
+            return {"ok": bool(printavo_sync.sync_all())}
+        finally:
+            printavo_sync.CSV_DIR, backup.BACKUP_DIR, read_replica.REPLICA_DIR = previous
+    return run
+
+
+# name -> (factory(ctx) returning run(i), runs; None = --repeat)
+BENCHMARKS = {
+    "statement_fetch": (lambda ctx: _bench_statement_fetch(ctx, False), None),
+    "statement_fetch_unpaid": (lambda ctx: _bench_statement_fetch(ctx, True), None),
+    "statement_summaries": (_bench_statement_summaries, None),
+    "reprint_statement": (_bench_reprint, None),
+    "ar_summary": (_bench_ar_summary, None),
+    "route_customer_portal": (lambda ctx: _bench_route(ctx, "/customer/Harlestons"), None),
+    "route_statements_csv": (lambda ctx: _bench_route(ctx, "/customer/Harlestons/export.csv"), None),
+    "route_invoices_csv": (lambda ctx: _bench_route(ctx, "/customer/Harlestons/invoices/export.csv"), None),
+    "route_imm_terminal": (lambda ctx: _bench_route(ctx, "/imm/"), None),
+    "route_harlestons_terminal": (lambda ctx: _bench_route(ctx, "/harlestons/"), None),
+    "route_admin_dashboard": (lambda ctx: _bench_route(ctx, "/admin/"), None),
+    # Last: it changes the data the others read
+    "sync_all": (_bench_sync_all, 1),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _remove_created_files(paths):
+    """Delete the statement PDFs a run wrote (and their cache sidecars / empty folders)."""
+    for path in paths:
+        for p in (path, path + ".json"):
+            if os.path.exists(p):
+                os.remove(p)
+        folder = os.path.dirname(path)
+        for d in (os.path.join(folder, "dnu"), folder):
+            try:
+                os.rmdir(d)
+            except OSError:
+                pass
+
+
+def run_benchmarks(scale=1.0, seed=42, repeat=DEFAULT_REPEAT, only=None, db_path=None,
+                   keep_db=False, schema_conn=None, progress=print):
+    """
+    Generate the synthetic database and time each benchmark against it.
+
+    Returns:
+        dict with "meta" (commit, scale, seed, row counts, versions) and
+        "results" {name: {runs, min_ms, median_ms, max_ms, result} or {error}}
+    """
+    work_dir = tempfile.mkdtemp(prefix="tt_bench_")
+    db_path = os.path.abspath(db_path or os.path.join(work_dir, f"bench_{scale:g}x.db"))
+
+    progress(f"Generating {scale:g}x synthetic data (seed {seed})...")
+    started = time.perf_counter()
+    counts = generate_dataset(db_path, scale, seed, schema_conn)
+    generate_s = time.perf_counter() - started
+    progress("  " + ", ".join(f"{t}: {n:,}" for t, n in counts.items()) + f"  ({generate_s:.1f}s)")
+
+    ctx = {"db_path": db_path, "work_dir": work_dir, "seed": seed, "repeat": repeat, "created_files": []}
+    results = {}
+    try:
+        with _use_database(db_path):
+            for name, (factory, runs) in BENCHMARKS.items():
+                if only and name not in only:
+                    continue
+                try:
+                    results[name] = _measure(factory(ctx), runs or repeat)
+                    progress(f"  {name:28} {results[name]['median_ms']:>10.1f} ms median")
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}"}
+                    progress(f"  {name:28} ⚠️ {results[name]['error']}")
+    finally:
+        _remove_created_files(ctx["created_files"])
+        if not keep_db:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if not db_path.startswith(work_dir) and os.path.exists(db_path):
+                os.remove(db_path)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": scale,
+            "seed": seed,
+            "repeat": repeat,
+            "rows": counts,
+            "generate_s": round(generate_s, 2),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "db_path": db_path if keep_db else None,
+        },
+        "results": results,
+    }
+
+
+def compare_results(old, new, threshold=0.2):
+    """
+    Rows of (name, old median ms, new median ms, ratio, regressed) for the
+    benchmarks both runs have; regressed = slower by more than threshold.
+    A benchmark that ran in OLD but errored in NEW is a regression with
+    new median and ratio None.
+    """
+    rows = []
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if not old_result or "median_ms" not in old_result:
+            continue
+        if "median_ms" not in new_result:
+            rows.append((name, old_result["median_ms"], None, None, True))
+            continue
+        ratio = new_result["median_ms"] / old_result["median_ms"] if old_result["median_ms"] else float("inf")
+        rows.append((name, old_result["median_ms"], new_result["median_ms"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def benchmark_cli():
+    """Command-line entry point."""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the app on synthetic data")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiple of production size (e.g. 10, 100)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per benchmark")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run just these benchmarks")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--db", help="Where to build the synthetic database (default: a temp folder)")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the synthetic database afterwards")
+    parser.add_argument("--schema-db", help="Start from this database's schema (default: the app's setup code)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files")
+    parser.add_argument("--fail-over", type=float, default=20.0,
+                        help="With --compare: exit 1 when a benchmark is this many %% slower")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        print(f"{old['meta'].get('commit')} ({old['meta']['scale']:g}x) -> "
+              f"{new['meta'].get('commit')} ({new['meta']['scale']:g}x)")
+        rows = compare_results(old, new, args.fail_over / 100)
+        for name, old_ms, new_ms, ratio, regressed in rows:
+            if new_ms is None:
+                print(f"❌ {name:28} {old_ms:>10.1f} -> {new['results'][name].get('error', 'no result')}")
+                continue
+            print(f"{'❌' if regressed else '  '} {name:28} {old_ms:>10.1f} -> {new_ms:>10.1f} ms  ({ratio:.2f}x)")
+        sys.exit(1 if any(r[4] for r in rows) else 0)
+
+    schema_conn = sqlite3.connect(f"file:{args.schema_db}?mode=ro", uri=True) if args.schema_db else None
+    report = run_benchmarks(args.scale, args.seed, args.repeat, args.only, args.db, args.keep_db, schema_conn)
+    if schema_conn:
+        schema_conn.close()
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.out}")
+
+    errors = [name for name, result in report["results"].items() if "error" in result]
+    if errors:
+        print(f"❌ {len(errors)} benchmark(s) failed: {', '.join(errors)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark_cli()
@@ -0,0 +1,258 @@
+# tobys_terminal/shared/bulk_export.py
+"""
+Bulk export of invoices, payments and statements, straight from SQL.
+
+The screen exports walk Python lists or tree widgets a row at a time. This
+engine runs one filtered query per dataset and copies the cursor to disk in
+fetchmany() chunks, as CSV, gzip-compressed CSV, or Parquet when pyarrow is
+installed - e.g. a full year of invoices and payments for the accountant:
+
+    python -m tobys_terminal.shared.bulk_export invoices payments \\
+        --start 2025-01-01 --end 2025-12-31 --format parquet --out exports/2025
+"""
+
+import csv
+import gzip
+import os
+from datetime import datetime
+
+from tobys_terminal.shared.db import get_connection
+
+# Rows copied per fetchmany() / Parquet row group
+EXPORT_CHUNK_ROWS = 5000
+
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+# Column name -> type ("str", "float", "int"); used for Parquet schemas and
+# to coerce SQLite's loosely typed values consistently in every format.
+DATASETS = {
+    "invoices": {
+        "columns": [
+            ("invoice_number", "str"), ("invoice_date", "str"), ("customer_id", "int"),
+            ("company", "str"), ("po_number", "str"), ("nickname", "str"),
+            ("invoice_status", "str"), ("paid", "str"), ("total", "float"),
+            ("amount_paid", "float"), ("amount_outstanding", "float"),
+            ("statement_number", "str"),
+        ],
+        "sql": """
+            SELECT i.invoice_number, i.invoice_date, i.customer_id, c.company,
+                   i.po_number, i.nickname, i.invoice_status, i.paid, i.total,
+                   i.amount_paid, i.amount_outstanding, it.statement_number
+            FROM invoices i
+            LEFT JOIN customers c ON c.id = i.customer_id
+            LEFT JOIN invoice_tracking it ON it.invoice_number = i.invoice_number
+        """,
+        "date": "DATE(i.invoice_date)",
+        "customer": "i.customer_id",
+        "order": "DATE(i.invoice_date), i.invoice_number",
+    },
+    "payments": {
+        "columns": [
+            ("id", "int"), ("transaction_date", "str"), ("invoice_number", "str"),
+            ("customer_id", "int"), ("company", "str"), ("amount", "float"),
+            ("payment_method", "str"), ("reference", "str"),
+        ],
+        "sql": """
+            SELECT p.id, p.transaction_date, p.invoice_number, p.customer_id, c.company,
+                   p.amount, p.payment_method, p.reference
+            FROM payments_clean p
+            LEFT JOIN customers c ON c.id = p.customer_id
+        """,
+        "date": "DATE(p.transaction_date)",
+        "customer": "p.customer_id",
+        "order": "DATE(p.transaction_date), p.id",
+    },
+    "statements": {
+        "columns": [
+            ("statement_number", "str"), ("customer_id", "int"), ("company_label", "str"),
+            ("generated_on", "str"), ("start_date", "str"), ("end_date", "str"),
+            ("invoice_count", "int"), ("billed", "float"),
+        ],
+        "sql": """
+            SELECT s.statement_number, s.customer_id, s.company_label, s.generated_on,
+                   s.start_date, s.end_date,
+                   COUNT(i.invoice_number) AS invoice_count,
+                   ROUND(SUM(COALESCE(i.total, 0)), 2) AS billed
+            FROM statement_tracking s
+            LEFT JOIN invoice_tracking it ON it.statement_number = s.statement_number
+            LEFT JOIN invoices i ON i.invoice_number = it.invoice_number
+        """,
+        "date": "DATE(s.generated_on)",
+        "customer": "s.customer_id",
+        "group": "s.statement_number",
+        "order": "DATE(s.generated_on), s.statement_number",
+    },
+}
+
+
+def _coerce(kind):
+    if kind == "float":
+        def to_float(v):
+            try:
+                return None if v is None or v == "" else float(v)
+            except (TypeError, ValueError):
+                return None
+        return to_float
+    if kind == "int":
+        def to_int(v):
+            try:
+                return None if v is None or v == "" else int(v)
+            except (TypeError, ValueError):
+                return None
+        return to_int
+    return lambda v: None if v is None else str(v)
+
+
+def build_export_query(dataset, start_date=None, end_date=None, customer_ids=None):
+    """SQL + params for one dataset with the date-range / customer filters."""
+    spec = DATASETS[dataset]
+    clauses, params = [], []
+    if start_date:
+        clauses.append(f"{spec['date']} >= ?")
+        params.append(str(start_date)[:10])
+    if end_date:
+        clauses.append(f"{spec['date']} <= ?")
+        params.append(str(end_date)[:10])
+    if customer_ids is not None:
+        clauses.append(f"{spec['customer']} IN ({','.join('?' for _ in customer_ids) or 'NULL'})")
+        params.extend(customer_ids)
+
+    sql = spec["sql"]
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if spec.get("group"):
+        sql += f" GROUP BY {spec['group']}"
+    sql += f" ORDER BY {spec['order']}"
+    return sql, params
+
+
+def iter_export_chunks(dataset, start_date=None, end_date=None, customer_ids=None,
+                       conn=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield lists of coerced row tuples, chunk_rows at a time."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    coercers = [_coerce(kind) for _name, kind in DATASETS[dataset]["columns"]]
+    try:
+        sql, params = build_export_query(dataset, start_date, end_date, customer_ids)
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield [tuple(f(v) for f, v in zip(coercers, row)) for row in rows]
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _write_csv(path, columns, chunks, compress):
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        for chunk in chunks:
+            w.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def _write_parquet(path, column_specs, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow); use csv or csv.gz instead")
+
+    types = {"str": pa.string(), "float": pa.float64(), "int": pa.int64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in column_specs])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for chunk in chunks:
+            # Column-major copy of the chunk: one Arrow array per column
+            arrays = [pa.array(list(col), type=field.type) for col, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def export_dataset(dataset, path, fmt="csv", start_date=None, end_date=None,
+                   company=None, customer_ids=None, conn=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Export one dataset to `path`.
+
+    Args:
+        dataset: "invoices", "payments" or "statements"
+        fmt: "csv", "csv.gz" or "parquet" (needs pyarrow)
+        start_date, end_date: inclusive 'YYYY-MM-DD' bounds (either optional)
+        company: limit to one company (customers.company, case-insensitive)
+        customer_ids: limit to these customer IDs (overrides company)
+
+    Returns the number of rows written.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset {dataset!r} (choose from {', '.join(DATASETS)})")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (choose from {', '.join(FORMATS)})")
+
+    if customer_ids is None and company:
+        from tobys_terminal.shared.statement_logic import get_customer_ids_by_company
+        customer_ids = get_customer_ids_by_company(company)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    column_specs = DATASETS[dataset]["columns"]
+    chunks = iter_export_chunks(dataset, start_date, end_date, customer_ids, conn, chunk_rows)
+
+    if fmt == "parquet":
+        return _write_parquet(path, column_specs, chunks)
+    return _write_csv(path, [name for name, _kind in column_specs], chunks, compress=(fmt == "csv.gz"))
+
+
+def export_bundle(datasets, out_dir, fmt="csv", start_date=None, end_date=None, company=None, conn=None):
+    """
+    Export several datasets into out_dir with the same filters, e.g. the
+    year-end invoices + payments pull. Returns {dataset: (path, rows)}.
+    """
+    customer_ids = None
+    if company:
+        from tobys_terminal.shared.statement_logic import get_customer_ids_by_company
+        customer_ids = get_customer_ids_by_company(company)
+
+    label = "_".join(filter(None, [
+        company.replace(" ", "_") if company else None,
+        str(start_date)[:10] if start_date else None,
+        str(end_date)[:10] if end_date else None,
+    ])) or datetime.now().strftime("%Y%m%d")
+
+    results = {}
+    for dataset in datasets:
+        path = os.path.join(out_dir, f"{dataset}_{label}{FORMATS[fmt]}")
+        rows = export_dataset(dataset, path, fmt, start_date, end_date,
+                              customer_ids=customer_ids, conn=conn)
+        results[dataset] = (path, rows)
+    return results
+
+
+def bulk_export_cli():
+    """Command-line entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk export invoices, payments and statements")
+    parser.add_argument("datasets", nargs="+", choices=sorted(DATASETS))
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--company", help="Limit to one company")
+    parser.add_argument("--format", dest="fmt", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--out", default=".", help="Output folder")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = export_bundle(args.datasets, args.out, args.fmt, args.start, args.end, args.company)
+    for dataset, (path, rows) in results.items():
+        print(f"✅ {dataset}: {rows:,} rows -> {path}")
+    print(f"Done in {(datetime.now() - started).total_seconds():.1f}s")
+
+
+if __name__ == "__main__":
+    bulk_export_cli()
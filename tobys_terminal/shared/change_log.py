@@ -0,0 +1,224 @@
+# tobys_terminal/shared/change_log.py
+"""
+Change log (outbox) of every write to the core tables.
+
+Edits reach the database from the desktop roster views, the web terminals,
+statement tagging and voids, reconciliation and Printavo syncs, and nothing
+used to record what changed, so caches could only expire on a timer. Now
+AFTER INSERT/UPDATE/DELETE triggers on the tables in CHANGE_TRACKED_TABLES
+append one row per changed row to `change_log`: table, rowid, the key the
+rest of the app looks the row up by, the operation, which columns changed,
+and a monotonic `seq` (AUTOINCREMENT, so never reused after pruning).
+
+Updates that don't change anything (syncs re-writing the same values, the
+roster `version` bump) are not logged. INSERT OR REPLACE is the exception: it
+deletes the old row without firing the DELETE trigger and then inserts, so
+every replaced row is logged as an insert whether or not it changed. Loaders
+of tracked tables upsert with INSERT ... ON CONFLICT DO UPDATE instead.
+
+Readers remember the last seq they saw and ask for what came after it:
+
+    feed = changes_since(last_seq, tables=["imm_orders"])
+    for change in feed["changes"]: ...
+    last_seq = feed["seq"]          # feed["reset"]: entries were pruned, reload everything
+"""
+
+from tobys_terminal.shared.db import get_connection
+
+# table -> key column recorded as row_key (what caches and views look rows up by)
+CHANGE_TRACKED_TABLES = {
+    "customers": "id",
+    "invoices": "invoice_number",
+    "payments_clean": "invoice_number",
+    "payment_tracking": "payment_id",
+    "invoice_tracking": "invoice_number",
+    "statement_tracking": "statement_number",
+    "imm_orders": "po_number",
+    "harlestons_orders": "po_number",
+}
+
+# Bookkeeping columns whose changes alone aren't worth an entry
+IGNORED_COLUMNS = {"version"}
+
+CHANGES_PAGE_SIZE = 1000
+CHANGE_LOG_KEEP_DAYS = 14
+
+_OPERATIONS = {"INSERT": "I", "UPDATE": "U", "DELETE": "D"}
+
+
+def _trigger_sql(table, key_column, columns, operation):
+    row = "old" if operation == "DELETE" else "new"
+    key = f'{row}."{key_column}"' if key_column in columns else "NULL"
+    op = _OPERATIONS[operation]
+    name = f"{table}_change_log_{op.lower()}"
+
+    when, changed = "", "NULL"
+    if operation == "UPDATE":
+        tracked = [c for c in columns if c not in IGNORED_COLUMNS]
+        when = "WHEN " + " OR ".join(f'old."{c}" IS NOT new."{c}"' for c in tracked)
+        changed = "RTRIM(" + " || ".join(
+            f"""CASE WHEN old."{c}" IS NOT new."{c}" THEN '{c},' ELSE '' END""" for c in tracked
+        ) + ", ',')"
+
+    return name, (
+        f"CREATE TRIGGER {name} AFTER {operation} ON {table} {when} BEGIN "
+        f"INSERT INTO change_log (table_name, row_id, row_key, op, changed_columns) "
+        f"VALUES ('{table}', {row}.rowid, {key}, '{op}', {changed}); END"
+    )
+
+
+def ensure_change_log(conn=None):
+    """
+    Create change_log and (re)create the triggers on every tracked table that
+    exists. Triggers are rebuilt when a table's columns changed since.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER,
+                row_key TEXT,
+                op TEXT NOT NULL,
+                changed_columns TEXT,
+                changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_change_log_table_seq ON change_log(table_name, seq)")
+
+        existing = dict(cur.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+        for table, key_column in CHANGE_TRACKED_TABLES.items():
+            columns = [row[1] for row in cur.execute(f"PRAGMA table_info({table})").fetchall()]
+            if not columns:
+                continue
+            for operation in _OPERATIONS:
+                name, sql = _trigger_sql(table, key_column, columns, operation)
+                if existing.get(name) == sql:
+                    continue
+                cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cur.execute(sql)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Could not set up the change log: {e}")
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _has_change_log(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'"
+    ).fetchone() is not None
+
+
+def latest_seq(conn, tables=None):
+    """
+    Highest seq recorded (for the given tables), 0 if nothing is logged yet,
+    or None if the change log hasn't been set up in this database.
+    """
+    if not _has_change_log(conn):
+        return None
+    if not tables:
+        row = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()
+    else:
+        placeholders = ",".join("?" for _ in tables)
+        row = conn.execute(
+            f"SELECT MAX(seq) FROM change_log WHERE table_name IN ({placeholders})", tuple(tables)
+        ).fetchone()
+    return row[0] or 0
+
+
+def changes_since(seq, tables=None, limit=CHANGES_PAGE_SIZE, conn=None):
+    """
+    Changes after `seq`, oldest first.
+
+    Returns:
+        dict: seq (pass it back next time), changes [{seq, table, row_id,
+        row_key, op, columns, changed_at}], more (another page is waiting),
+        reset (entries after `seq` were pruned, so the caller must reload
+        everything instead of applying deltas)
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if not _has_change_log(conn):
+            return {"seq": seq, "changes": [], "more": False, "reset": False}
+
+        # Anything between `seq` and the oldest entry left was pruned
+        first = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        if first is None:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+            first = row[0] + 1 if row else None
+        reset = bool(seq and first and seq < first - 1)
+
+        sql = """
+            SELECT seq, table_name, row_id, row_key, op, changed_columns, changed_at
+            FROM change_log
+            WHERE seq > ?
+        """
+        params = [seq or 0]
+        if tables:
+            sql += f" AND table_name IN ({','.join('?' for _ in tables)})"
+            params.extend(tables)
+        sql += " ORDER BY seq LIMIT ?"
+        params.append(limit + 1)
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [
+        {
+            "seq": r[0], "table": r[1], "row_id": r[2], "row_key": r[3], "op": r[4],
+            "columns": r[5].split(",") if r[5] else [], "changed_at": r[6],
+        }
+        for r in rows
+    ]
+    return {
+        "seq": changes[-1]["seq"] if changes else (seq or 0),
+        "changes": changes,
+        "more": more,
+        "reset": reset,
+    }
+
+
+def changed_rows(changes):
+    """Collapse a list of changes to {table: {row_id: last op}}."""
+    rows = {}
+    for change in changes:
+        rows.setdefault(change["table"], {})[change["row_id"]] = change["op"]
+    return rows
+
+
+def prune_change_log(keep_days=CHANGE_LOG_KEEP_DAYS, conn=None):
+    """Delete entries older than keep_days. Returns the number removed."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if not _has_change_log(conn):
+            return 0
+        # seq order is time order, so walk from the oldest entry to the first one to keep
+        keep_from = conn.execute("""
+            SELECT seq FROM change_log
+            WHERE changed_at >= strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime', ?)
+            ORDER BY seq
+            LIMIT 1
+        """, (f"-{int(keep_days)} days",)).fetchone()
+        if keep_from:
+            cur = conn.execute("DELETE FROM change_log WHERE seq < ?", (keep_from[0],))
+        else:
+            cur = conn.execute("DELETE FROM change_log")
+        conn.commit()
+        return cur.rowcount or 0
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,226 @@
+# tobys_terminal/shared/customer_search.py
+"""
+Ranked customer search backed by an FTS5 trigram index.
+
+The `customers_fts` table mirrors company, first/last name and email from
+`customers` (rowid = customer id) and is kept in sync by triggers, so the
+Customer Viewer and the web dashboard can search without scanning the whole
+customers table on every keystroke.
+"""
+
+import sqlite3
+
+from tobys_terminal.shared.db import get_connection
+
+# Column weights for bm25() - a hit on the company name matters most
+_RANK = "bm25(customers_fts, 10.0, 2.0, 2.0, 1.0)"
+
+# The trigram tokenizer can only match terms of at least 3 characters
+_MIN_TERM_LENGTH = 3
+
+_index_ready = False
+
+
+def ensure_customer_search_index(conn=None):
+    """
+    Create the customers_fts index and its sync triggers if they don't exist.
+    The index is populated from the customers table the first time it's built.
+    Returns True if the index is usable, False if SQLite has no FTS5/trigram.
+    """
+    global _index_ready
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    try:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'")
+        created = cur.fetchone() is None
+        if created:
+            cur.execute("""
+                CREATE VIRTUAL TABLE customers_fts USING fts5(
+                    company, first_name, last_name, email,
+                    tokenize = 'trigram'
+                )
+            """)
+
+        # An INSERT OR REPLACE into customers doesn't fire DELETE triggers, so
+        # the insert trigger clears any stale entry itself.
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN
+                DELETE FROM customers_fts WHERE rowid = new.id;
+                INSERT INTO customers_fts (rowid, company, first_name, last_name, email)
+                VALUES (new.id, new.company, new.first_name, new.last_name, new.email);
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN
+                DELETE FROM customers_fts WHERE rowid = old.id;
+            END
+        """)
+        cur.execute("""
+            CREATE TRIGGER IF NOT EXISTS customers_fts_au
+            AFTER UPDATE OF id, company, first_name, last_name, email ON customers BEGIN
+                DELETE FROM customers_fts WHERE rowid = old.id;
+                INSERT INTO customers_fts (rowid, company, first_name, last_name, email)
+                VALUES (new.id, new.company, new.first_name, new.last_name, new.email);
+            END
+        """)
+
+        if created:
+            cur.execute("""
+                INSERT INTO customers_fts (rowid, company, first_name, last_name, email)
+                SELECT id, company, first_name, last_name, email FROM customers
+            """)
+        conn.commit()
+        _index_ready = True
+    except sqlite3.OperationalError as e:
+        # Older SQLite builds without FTS5 or the trigram tokenizer
+        print(f"Customer search index unavailable, using LIKE search: {e}")
+        conn.rollback()
+        _index_ready = False
+    finally:
+        if own_conn:
+            conn.close()
+
+    return _index_ready
+
+
+def rebuild_customer_search_index():
+    """Repopulate customers_fts from scratch (e.g. after a bulk repair)."""
+    conn = get_connection()
+    if not ensure_customer_search_index(conn):
+        conn.close()
+        return 0
+    cur = conn.cursor()
+    cur.execute("DELETE FROM customers_fts")
+    cur.execute("""
+        INSERT INTO customers_fts (rowid, company, first_name, last_name, email)
+        SELECT id, company, first_name, last_name, email FROM customers
+    """)
+    count = cur.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+
+def _match_expression(search_term):
+    """
+    Turn free text into an FTS5 query: every word must appear somewhere in
+    the row. Returns None if any word is too short for the trigram index.
+    """
+    words = search_term.split()
+    if not words or any(len(w) < _MIN_TERM_LENGTH for w in words):
+        return None
+    return " AND ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def customer_search_sql(search_term, conn=None, alias="c"):
+    """
+    SQL pieces that limit a query over `customers {alias}` to the rows matching
+    search_term, best match first, so callers can add their own filters
+    without pulling the matching IDs out first.
+
+    Returns (join, where, params, order). join and order are empty when the
+    term is too short for the index and the LIKE fallback is used.
+    """
+    search_term = (search_term or "").strip()
+    match = _match_expression(search_term)
+    if match and (_index_ready or ensure_customer_search_index(conn)):
+        return (
+            f" JOIN customers_fts ON customers_fts.rowid = {alias}.id",
+            "customers_fts MATCH ?",
+            [match],
+            f"{_RANK}, {alias}.company",
+        )
+    like = f"%{search_term}%"
+    cols = ("company", "first_name", "last_name", "email")
+    return "", "(" + " OR ".join(f"{alias}.{c} LIKE ?" for c in cols) + ")", [like] * len(cols), ""
+
+
+def search_customers(search_term, limit=50, conn=None):
+    """
+    Search customers by company, name or email, best matches first.
+
+    Returns a list of (id, company, first_name, last_name, email) tuples.
+    Short terms the trigram index can't handle fall back to a LIKE scan.
+    """
+    search_term = (search_term or "").strip()
+    if not search_term:
+        return []
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    join, where, params, order = customer_search_sql(search_term, conn)
+    sql = f"""
+        SELECT c.id, c.company, c.first_name, c.last_name, c.email
+        FROM customers c{join}
+        WHERE {where}
+        ORDER BY {order or 'c.company'}
+    """
+
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    cur.execute(sql, params)
+    rows = [tuple(r) for r in cur.fetchall()]
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def search_customer_ids(search_term, limit=50, conn=None):
+    """Ranked customer IDs matching the search term."""
+    return [r[0] for r in search_customers(search_term, limit=limit, conn=conn)]
+
+
+def search_companies(search_term, limit=50, conn=None):
+    """
+    Distinct company names matching the search term, best match first.
+    Used by the web dashboard's customer directory.
+    """
+    companies = []
+    seen = set()
+    for _id, company, _first, _last, _email in search_customers(search_term, limit=None, conn=conn):
+        name = (company or "").strip()
+        if not name or name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        companies.append(name)
+        if limit and len(companies) >= limit:
+            break
+    return companies
+
+
+def find_customer_ids_by_company_prefix(company_name, conn=None):
+    """
+    Customer IDs whose company starts with company_name (case-insensitive).
+    The trigram index narrows the candidates before the prefix check.
+    """
+    prefix = (company_name or "").strip()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    if len(prefix) >= _MIN_TERM_LENGTH and (_index_ready or ensure_customer_search_index(conn)):
+        cur.execute("""
+            SELECT c.id FROM customers c
+            WHERE c.id IN (
+                SELECT rowid FROM customers_fts WHERE company LIKE ?
+            )
+            AND LOWER(TRIM(c.company)) LIKE LOWER(?) || '%'
+        """, (f"%{prefix}%", prefix))
+    else:
+        cur.execute("""
+            SELECT id FROM customers
+            WHERE LOWER(TRIM(company)) LIKE LOWER(TRIM(?)) || '%'
+        """, (company_name,))
+    ids = [r[0] for r in cur.fetchall()]
+    if own_conn:
+        conn.close()
+    return ids
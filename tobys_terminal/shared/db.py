@@ -1,18 +1,52 @@
-import sqlite3
 import os
 import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from tobys_terminal.shared.query_profiler import connect as _connect
+
+# Per-thread database set by use_database()
+_database_override = threading.local()
+
+
+@contextmanager
+def use_database(db_path):
+    """
+    Make get_connection() open db_path in this thread until the block ends.
+    Other threads (web requests) keep using the real database; the query
+    plan check runs the app's own code against a throwaway database this way.
+    """
+    previous = getattr(_database_override, "path", None)
+    _database_override.path = str(db_path)
+    try:
+        yield
+    finally:
+        _database_override.path = previous
+
+
 def get_connection():
     """Get a connection to the database that works regardless of drive letter"""
     
+    override = getattr(_database_override, "path", None)
+    if override:
+        return _connect(override)
+    
+    # Requests that opted in (the customer portal) read the published replica
+    try:
+        from tobys_terminal.shared.read_replica import replica_connection
+        replica = replica_connection()
+        if replica is not None:
+            return replica
+    except ImportError:
+        pass
     
     # First try: Use config if available
     try:
         from config import get_db_path
         config_path = get_db_path()
         if os.path.exists(config_path):
-            return sqlite3.connect(config_path)
+            return _connect(config_path)
     except Exception:
         pass
     
@@ -32,7 +66,7 @@ def get_connection():
         for root in possible_roots:
             db_path = root / "terminal.db"
             if db_path.exists():
-                return sqlite3.connect(str(db_path))
+                return _connect(str(db_path))
     except Exception:
         pass
     
@@ -55,7 +89,7 @@ def get_connection():
         for drive in get_available_drives():
             path = Path(f"{drive}/My Drive/Sage Projects/tobys-terminal-3-0/tobys_terminal-3/terminal.db")
             if path.exists():
-                return sqlite3.connect(str(path))
+                return _connect(str(path))
     except Exception:
         pass
     
@@ -72,7 +106,7 @@ def get_connection():
             # Search for terminal.db in this directory and subdirectories
             for path in search_dir.glob('**/terminal.db'):
                 if path.is_file():
-                    return sqlite3.connect(str(path))
+                    return _connect(str(path))
     except Exception:
         pass
     
@@ -83,6 +117,11 @@ def get_connection():
     )
 
 
+def database_file(conn):
+    """Path of conn's main database file ('' for an in-memory database)."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
 def initialize_db():
     conn = get_connection()
     cursor = conn.cursor()
@@ -370,23 +409,114 @@ def get_statement_invoices(statement_number: str):
     return nums
 
 # utils/db.py (or your db module)
-def ensure_indexes():
-    conn = get_connection()
+# Checked by tobys_terminal.shared.query_plans: add an index here when a hot
+# query starts scanning, and the expression indexes must match the query's
+# expression exactly (e.g. TRIM(invoice_number), not TRIM(i.invoice_number)).
+INDEX_STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS idx_invoices_customer   ON invoices(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_number     ON invoices(invoice_number)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_invoice    ON payments(invoice_number)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_customer   ON payments(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_payment_tracking_inv ON payment_tracking(invoice_number)",
+    # Statement summaries join on TRIM(invoice_number)
+    "CREATE INDEX IF NOT EXISTS idx_invoices_number_trim ON invoices(TRIM(invoice_number))",
+    "CREATE INDEX IF NOT EXISTS idx_payments_clean_number_trim ON payments_clean(TRIM(invoice_number))",
+    # A/R aging filters on the normalized status
+    "CREATE INDEX IF NOT EXISTS idx_invoices_status_key ON invoices(LOWER(TRIM(invoice_status)))",
+    "CREATE INDEX IF NOT EXISTS idx_invoice_tracking_statement ON invoice_tracking(statement_number)",
+    "CREATE INDEX IF NOT EXISTS idx_statement_tracking_label ON statement_tracking(company_label)",
+    # get_customer_ids_by_company() matches on TRIM(LOWER(company))
+    "CREATE INDEX IF NOT EXISTS idx_customers_company_key ON customers(TRIM(LOWER(company)))",
+    # Printavo sync hides 'Need Review' orders by normalized p_status
+    "CREATE INDEX IF NOT EXISTS idx_imm_orders_review ON imm_orders(status, LOWER(TRIM(p_status)))",
+    "CREATE INDEX IF NOT EXISTS idx_harlestons_orders_review ON harlestons_orders(status, LOWER(TRIM(p_status)))",
+]
+
+
+def ensure_indexes(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cur = conn.cursor()
-    stmts = [
-        "CREATE INDEX IF NOT EXISTS idx_invoices_customer   ON invoices(customer_id)",
-        "CREATE INDEX IF NOT EXISTS idx_invoices_number     ON invoices(invoice_number)",
-        "CREATE INDEX IF NOT EXISTS idx_payments_invoice    ON payments(invoice_number)",
-        "CREATE INDEX IF NOT EXISTS idx_payments_customer   ON payments(customer_id)",
-        "CREATE INDEX IF NOT EXISTS idx_payment_tracking_inv ON payment_tracking(invoice_number)",
-    ]
-    for sql in stmts:
+    for sql in INDEX_STATEMENTS:
         try:
             cur.execute(sql)
         except Exception:
             pass
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
+
+
+def ensure_payment_tracking_table(conn=None):
+    """
+    Create payment_tracking keyed per payment, migrating the old table that
+    was keyed by invoice_number (its flag/note is copied onto every payment
+    of that invoice; rows for invoices with no payments are kept unlinked).
+
+    This is a write migration: run it at startup (desktop main) or before a
+    sync (printavo_sync.sync_all), not on read paths. A failure rolls back
+    and is raised, since the payment queries need the new layout.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    try:
+        # One transaction, so a failed migration leaves the old table in place
+        if not conn.in_transaction:
+            cur.execute("BEGIN")
+        cur.execute("PRAGMA table_info(payment_tracking)")
+        columns = [row[1] for row in cur.fetchall()]
+
+        if columns and "payment_id" not in columns:
+            print("Migrating payment_tracking to one row per payment...")
+            cur.execute("ALTER TABLE payment_tracking RENAME TO payment_tracking_by_invoice")
+            # The old table's indexes moved with it; drop them so the names are free
+            for (index_name,) in cur.execute("""
+                SELECT name FROM sqlite_master
+                WHERE type = 'index' AND tbl_name = 'payment_tracking_by_invoice' AND sql IS NOT NULL
+            """).fetchall():
+                cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS payment_tracking (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payment_id INTEGER UNIQUE,
+                invoice_number TEXT,
+                reconciled INTEGER,
+                notes TEXT,
+                updated_at TEXT
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_tracking_inv ON payment_tracking(invoice_number)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_tracking_reconciled ON payment_tracking(reconciled)")
+
+        if columns and "payment_id" not in columns:
+            cur.execute("""
+                INSERT INTO payment_tracking (payment_id, invoice_number, reconciled, notes)
+                SELECT p.id, p.invoice_number, old.reconciled, old.notes
+                FROM payment_tracking_by_invoice old
+                JOIN payments_clean p ON p.invoice_number = old.invoice_number
+            """)
+            cur.execute("""
+                INSERT INTO payment_tracking (payment_id, invoice_number, reconciled, notes)
+                SELECT NULL, old.invoice_number, old.reconciled, old.notes
+                FROM payment_tracking_by_invoice old
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM payments_clean p WHERE p.invoice_number = old.invoice_number
+                )
+            """)
+            cur.execute("DROP TABLE payment_tracking_by_invoice")
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
 
 
 def get_contract_type(company: str) -> str | None:
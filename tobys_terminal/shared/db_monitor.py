@@ -0,0 +1,329 @@
+# tobys_terminal/shared/db_monitor.py
+"""
+Database health monitor.
+
+Each check captures the file, WAL, page and freelist sizes, row counts of
+the main tables, which indexes the hot queries use and how long the hot
+queries take, stores them in the db_metrics table, and turns them into
+recommendations (missing indexes, VACUUM, ANALYZE, WAL checkpoints, orphan
+rows). Because every capture is kept, the numbers can be compared week
+over week on /admin/health or from the command line:
+
+    python -m tobys_terminal.shared.db_monitor                 # capture + report
+    python -m tobys_terminal.shared.db_monitor --trend rows invoices --weeks 12
+
+Replaces the one-off optimization_report.py.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+from tobys_terminal.shared.db import get_connection
+
+MONITORED_TABLES = (
+    "customers", "invoices", "payments", "payments_clean", "statement_tracking",
+    "invoice_tracking", "imm_orders", "harlestons_orders", "payment_tracking", "query_log",
+    "change_log",
+)
+
+# Recommendation thresholds
+FREELIST_VACUUM_RATIO = 0.20      # share of pages on the freelist
+FREELIST_VACUUM_MIN_PAGES = 1000
+ANALYZE_GROWTH_RATIO = 0.25       # rows added since the last ANALYZE
+WAL_CHECKPOINT_BYTES = 64 * 1024 * 1024
+SLOW_HOT_QUERY_MS = 250
+
+_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+
+
+def ensure_db_metrics_table(conn):
+    """One row per captured value: (captured_at, metric, subject, value)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS db_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            captured_at TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            subject TEXT NOT NULL DEFAULT '',
+            value REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_db_metrics_metric ON db_metrics(metric, subject, captured_at)")
+    conn.commit()
+
+
+def _db_file(conn):
+    for _seq, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path or None
+    return None
+
+
+def _table_names(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def storage_stats(conn):
+    """File and WAL size in bytes plus the page size, page count and freelist count."""
+    path = _db_file(conn)
+    wal = f"{path}-wal" if path else None
+    return {
+        "file_bytes": os.path.getsize(path) if path and os.path.exists(path) else 0,
+        "wal_bytes": os.path.getsize(wal) if wal and os.path.exists(wal) else 0,
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+    }
+
+
+def analyzed_row_counts(conn):
+    """Row count per table as of the last ANALYZE (empty if it never ran)."""
+    analyzed_rows = {}
+    if "sqlite_stat1" not in _table_names(conn):
+        return analyzed_rows
+    # sqlite_stat1's first number per table is its row count at ANALYZE time
+    for tbl, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+        try:
+            analyzed_rows[tbl] = max(analyzed_rows.get(tbl, 0), int(str(stat).split()[0]))
+        except (ValueError, IndexError):
+            pass
+    return analyzed_rows
+
+
+def stale_statistics(rows, analyzed_rows):
+    """Tables of 1000+ rows whose count drifted past ANALYZE_GROWTH_RATIO since ANALYZE."""
+    return sorted(
+        table for table, count in rows.items()
+        if count >= 1000 and (analyzed_rows.get(table) is None
+                              or abs(count - analyzed_rows[table]) > analyzed_rows[table] * ANALYZE_GROWTH_RATIO)
+    )
+
+
+def needs_vacuum(storage):
+    """True when enough of the file is free pages to be worth a VACUUM."""
+    if not storage["page_count"]:
+        return False
+    return (storage["freelist_count"] >= FREELIST_VACUUM_MIN_PAGES
+            and storage["freelist_count"] / storage["page_count"] >= FREELIST_VACUUM_RATIO)
+
+
+def collect_metrics(conn):
+    """
+    Measure the database. Returns a dict:
+        storage {file_bytes, wal_bytes, page_size, page_count, freelist_count}
+        rows {table: count}
+        analyzed_rows {table: row count when ANALYZE last ran}
+        index_usage {index: hot queries using it}
+        hot_query_ms {name: ms}
+        plan_problems {name: [reasons]}
+        orphans {invoices, payments}
+    """
+    from tobys_terminal.shared.query_plans import check_query_plans
+
+    storage = storage_stats(conn)
+    tables = _table_names(conn)
+    rows = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in MONITORED_TABLES if t in tables}
+    analyzed_rows = analyzed_row_counts(conn)
+
+    # Index usage and plan problems of the hot queries, as the indexes are now
+    plans = check_query_plans(conn, live=True)
+    index_usage = {r[0]: 0 for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    for result in plans:
+        for name in {m.group(1) for line in result["plan"] for m in _INDEX_RE.finditer(line)}:
+            index_usage[name] = index_usage.get(name, 0) + 1
+    plan_problems = {r["name"]: r["problems"] for r in plans if r["problems"]}
+
+    # Timings of the hot paths' read-only statements against the real data
+    hot_query_ms = {}
+    for result in plans:
+        reads = [sql for sql in result["statements"] if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+        if not reads:
+            continue
+        try:
+            started = time.perf_counter()
+            for sql in reads:
+                conn.execute(sql).fetchall()
+            hot_query_ms[result["name"]] = round((time.perf_counter() - started) * 1000, 3)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not time {result['name']}: {e}")
+
+    orphans = {}
+    if {"invoices", "customers"} <= tables:
+        orphans["invoices"] = conn.execute(
+            "SELECT COUNT(*) FROM invoices WHERE customer_id NOT IN (SELECT id FROM customers)").fetchone()[0]
+    if {"payments_clean", "invoices"} <= tables:
+        orphans["payments"] = conn.execute("""
+            SELECT COUNT(*) FROM payments_clean p
+            WHERE NOT EXISTS (SELECT 1 FROM invoices i WHERE i.invoice_number = p.invoice_number)
+        """).fetchone()[0]
+
+    return {
+        "storage": storage,
+        "rows": rows,
+        "analyzed_rows": analyzed_rows,
+        "index_usage": index_usage,
+        "hot_query_ms": hot_query_ms,
+        "plan_problems": plan_problems,
+        "orphans": orphans,
+    }
+
+
+def record_metrics(conn, metrics, captured_at=None):
+    """Store one capture in db_metrics. Returns the capture timestamp."""
+    ensure_db_metrics_table(conn)
+    captured_at = captured_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    values = [("storage", k, v) for k, v in metrics["storage"].items()]
+    values += [("rows", k, v) for k, v in metrics["rows"].items()]
+    values += [("index_hot_queries", k, v) for k, v in metrics["index_usage"].items()]
+    values += [("hot_query_ms", k, v) for k, v in metrics["hot_query_ms"].items()]
+    values += [("orphans", k, v) for k, v in metrics["orphans"].items()]
+    values.append(("plan_problems", "", len(metrics["plan_problems"])))
+    conn.executemany(
+        "INSERT INTO db_metrics (captured_at, metric, subject, value) VALUES (?, ?, ?, ?)",
+        [(captured_at, metric, subject, value) for metric, subject, value in values],
+    )
+    conn.commit()
+    return captured_at
+
+
+def recommendations(metrics):
+    """Concrete actions for a capture, most important first."""
+    recs = []
+    storage = metrics["storage"]
+
+    for name, problems in metrics["plan_problems"].items():
+        for problem in problems:
+            recs.append(f"Missing index: hot query '{name}' - {problem}. Run ensure_indexes() "
+                        f"(desktop start-up) or add the index it needs there (see tobys_terminal.shared.query_plans).")
+
+    stale = stale_statistics(metrics["rows"], metrics["analyzed_rows"])
+    if stale:
+        recs.append(f"Run ANALYZE: planner statistics are missing or stale for {', '.join(stale)}.")
+
+    if needs_vacuum(storage):
+        ratio = storage["freelist_count"] / storage["page_count"]
+        wasted = storage["freelist_count"] * storage["page_size"] / 1024 / 1024
+        recs.append(f"Run VACUUM: {ratio:.0%} of the file is free pages ({wasted:,.1f} MB reclaimable).")
+
+    if storage["wal_bytes"] >= WAL_CHECKPOINT_BYTES:
+        recs.append(f"Checkpoint the WAL (PRAGMA wal_checkpoint(TRUNCATE)): it has grown to "
+                    f"{storage['wal_bytes'] / 1024 / 1024:,.1f} MB.")
+
+    for name, ms in sorted(metrics["hot_query_ms"].items(), key=lambda kv: -kv[1]):
+        if ms >= SLOW_HOT_QUERY_MS:
+            recs.append(f"Hot query '{name}' took {ms:,.0f} ms; check it in the query profiler.")
+
+    if metrics["orphans"].get("invoices"):
+        recs.append(f"Clean up {metrics['orphans']['invoices']} invoices with no matching customer.")
+    if metrics["orphans"].get("payments"):
+        recs.append(f"Clean up {metrics['orphans']['payments']} payments with no matching invoice.")
+    return recs
+
+
+def weekly_trend(conn, metric, subject="", weeks=12):
+    """
+    Last captured value per week for one metric, oldest first, with the
+    change from the week before: [(week 'YYYY-WW', value, change)].
+    """
+    ensure_db_metrics_table(conn)
+    rows = conn.execute("""
+        SELECT strftime('%Y-%W', captured_at) AS week, value
+        FROM db_metrics m
+        WHERE metric = ? AND subject = ?
+          AND captured_at = (
+              SELECT MAX(captured_at) FROM db_metrics
+              WHERE metric = m.metric AND subject = m.subject
+                AND strftime('%Y-%W', captured_at) = strftime('%Y-%W', m.captured_at)
+          )
+        GROUP BY week
+        ORDER BY week DESC
+        LIMIT ?
+    """, (metric, subject, weeks)).fetchall()
+    rows.reverse()
+    trend, previous = [], None
+    for week, value in rows:
+        trend.append((week, value, None if previous is None else value - previous))
+        previous = value
+    return trend
+
+
+def run_health_check(conn=None, record=True):
+    """
+    Capture metrics (and store them unless record=False).
+
+    Returns:
+        dict: captured_at, metrics, recommendations
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        metrics = collect_metrics(conn)
+        captured_at = record_metrics(conn, metrics) if record else None
+    finally:
+        if own_conn:
+            conn.close()
+    return {"captured_at": captured_at, "metrics": metrics, "recommendations": recommendations(metrics)}
+
+
+def print_report(report):
+    """Console version of the admin health page."""
+    metrics = report["metrics"]
+    storage = metrics["storage"]
+    print("=== TOBY'S TERMINAL DATABASE HEALTH ===")
+    print(f"Captured: {report['captured_at'] or datetime.now().strftime('%Y-%m-%d %H:%M:%S') + ' (not recorded)'}")
+    print()
+    print("💾 STORAGE:")
+    print(f"  File: {storage['file_bytes'] / 1024 / 1024:,.1f} MB   WAL: {storage['wal_bytes'] / 1024 / 1024:,.1f} MB")
+    print(f"  Pages: {storage['page_count']:,} x {storage['page_size']} B, {storage['freelist_count']:,} free")
+    print()
+    print("📊 ROWS:")
+    for table, count in metrics["rows"].items():
+        print(f"  {table}: {count:,}")
+    print()
+    print("⚡ HOT QUERIES:")
+    for name, ms in sorted(metrics["hot_query_ms"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name}: {ms:,.1f} ms")
+    print()
+    unused = sorted(name for name, n in metrics["index_usage"].items() if not n)
+    print(f"🔍 INDEXES: {len(metrics['index_usage'])} total, {len(unused)} not used by any hot query")
+    print()
+    print("💡 RECOMMENDATIONS:")
+    for i, rec in enumerate(report["recommendations"], 1):
+        print(f"  {i}. {rec}")
+    if not report["recommendations"]:
+        print("  None - all checks passed.")
+
+
+def db_monitor_cli():
+    """Command-line entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database health monitor")
+    parser.add_argument("--no-record", action="store_true", help="Don't store this capture in db_metrics")
+    parser.add_argument("--trend", nargs="+", metavar=("METRIC", "SUBJECT"),
+                        help="Show the weekly trend of one metric, e.g. --trend rows invoices")
+    parser.add_argument("--weeks", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.trend:
+        metric, subject = args.trend[0], (args.trend[1] if len(args.trend) > 1 else "")
+        conn = get_connection()
+        trend = weekly_trend(conn, metric, subject, args.weeks)
+        conn.close()
+        if not trend:
+            print(f"No captures of {metric} {subject} yet.")
+        for week, value, change in trend:
+            delta = "" if change is None else f"  ({change:+,.0f})"
+            print(f"  {week}  {value:>14,.1f}{delta}")
+        return
+
+    print_report(run_health_check(record=not args.no_record))
+
+
+if __name__ == "__main__":
+    db_monitor_cli()
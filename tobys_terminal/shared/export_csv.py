@@ -1,6 +1,70 @@
 import csv
+import io
 import os
-# test edit for Git
+
+# Rows buffered per chunk when streaming a CSV to an HTTP response
+STREAM_CHUNK_ROWS = 500
+
+INVOICE_CSV_HEADER = ["Invoice #", "Date", "PO #", "Total", "Paid", "Status"]
+
+
+def iter_csv(rows, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Yield CSV text a chunk at a time for a streaming response. `rows` may be
+    any iterable (including a generator reading a cursor); only one chunk is
+    held in memory at once.
+    """
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    pending = 0
+    for row in rows:
+        w.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _invoice_csv_row(r):
+    return [
+        r.get("number", ""),
+        r.get("date", ""),
+        r.get("po", ""),
+        f"{float(r.get('total', 0)):.2f}",
+        f"{float(r.get('paid', 0)):.2f}",
+        r.get("status", "")
+    ]
+
+
+def _invoice_totals_rows(totals):
+    bal = float(totals.get('balance', (totals.get('billed', 0) or 0) - (totals.get('paid', 0) or 0)) or 0)
+    return [
+        [],
+        ["", "", "Total Billed", f"{float(totals.get('billed', 0) or 0):.2f}"],
+        ["", "", "Total Paid",   f"{float(totals.get('paid',   0) or 0):.2f}"],
+        ["", "", "Balance",      f"{abs(bal):.2f}", "Credit" if bal < 0 else "Due"],
+    ]
+
+
+def invoice_csv_rows(invoices, keep=None):
+    """
+    CSV rows for an invoice export, in one pass over `invoices`: header,
+    the invoices passing `keep` (all when None), then totals over every
+    invoice - the same layout export_invoice_csv writes to disk.
+    """
+    yield INVOICE_CSV_HEADER
+    billed = paid = 0.0
+    for r in invoices:
+        billed += float(r.get("total", 0) or 0)
+        paid += float(r.get("paid", 0) or 0)
+        if keep is None or keep(r):
+            yield _invoice_csv_row(r)
+    yield from _invoice_totals_rows({"billed": billed, "paid": paid, "balance": billed - paid})
+
 def get_csv_export_path(default_name, interactive=True):
     export_dir = os.path.join(os.path.dirname(__file__), "exports", "csv")
     os.makedirs(export_dir, exist_ok=True)
@@ -44,20 +108,32 @@ def export_invoice_csv(selected_name, export_rows, totals, interactive=True, use
 
     with open(filepath, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["Invoice #", "Date", "PO #", "Total", "Paid", "Status"])
+        w.writerow(INVOICE_CSV_HEADER)
         for r in export_rows:
+            w.writerow(_invoice_csv_row(r))
+        w.writerows(_invoice_totals_rows(totals))
+
+    return filepath
+
+def export_integrity_csv(selected_name, results, status_labels, interactive=True, user_selected_path=None):
+    safe_name = selected_name.replace(" ", "_")
+    default_name = f"payment_integrity_{safe_name}.csv"
+    filepath = user_selected_path or get_csv_export_path(default_name, interactive)
+
+    with open(filepath, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Customer ID", "Invoice #", "Date", "Invoice Total", "Paid Flag", "Actual Paid", "Difference", "Status"])
+        for r in results:
             w.writerow([
-                r.get("number", ""),
-                r.get("date", ""),
-                r.get("po", ""),
-                f"{float(r.get('total', 0)):.2f}",
-                f"{float(r.get('paid', 0)):.2f}",
-                r.get("status", "")
+                r.get("customer_id", ""),
+                r.get("invoice_number", ""),
+                r.get("invoice_date", ""),
+                f"{float(r.get('invoice_total') or 0):.2f}",
+                r.get("paid_flag", ""),
+                f"{float(r.get('actual_paid') or 0):.2f}",
+                f"{float(r.get('difference') or 0):.2f}",
+                status_labels.get(r.get("status"), r.get("status", ""))
             ])
-        w.writerow([])
-        w.writerow(["", "", "Total Billed", f"{float(totals.get('billed', 0) or 0):.2f}"])
-        w.writerow(["", "", "Total Paid",   f"{float(totals.get('paid',   0) or 0):.2f}"])
-        bal = float(totals.get('balance', (totals.get('billed', 0) or 0) - (totals.get('paid', 0) or 0)) or 0)
-        w.writerow(["", "", "Balance",      f"{abs(bal):.2f}", "Credit" if bal < 0 else "Due"])
 
     return filepath
+
@@ -1,29 +1,34 @@
-from typing import List, Tuple, Dict
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
 from tobys_terminal.shared.db import get_connection
 from sqlite3 import Row
 
-def fetch_invoice_rows(customer_ids: List[str]) -> Tuple[List[Dict], Dict]:
-    """Fetch invoice/payment rows and compute totals."""
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    invoice_rows = []
-    total_billed = 0.0
-    total_paid = 0.0
+def iter_invoice_rows(customer_ids: List[str], conn=None) -> Iterator[Dict]:
+    """
+    Yield invoice rows one at a time straight off the cursor (for streaming
+    exports); same dicts as fetch_invoice_rows.
+    """
+    if not customer_ids:
+        return
 
-    if customer_ids:
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    conn.row_factory = Row
+    try:
         placeholders = ','.join('?' for _ in customer_ids)
-        cursor.execute(f"""
+        cursor = conn.execute(f"""
             SELECT invoice_date, invoice_number, total, paid, invoice_status, po_number
             FROM invoices
             WHERE customer_id IN ({placeholders})
-        """, customer_ids)
+        """, list(customer_ids))
 
-        for row in cursor.fetchall():
+        for row in cursor:
             paid_val = float(row["paid"]) if isinstance(row["paid"], (int, float)) else 0.0
             total_val = float(row["total"]) if isinstance(row["total"], (int, float)) else 0.0
 
-            row_dict = {
+            yield {
                 "date": row["invoice_date"],
                 "number": row["invoice_number"],
                 "total": total_val,
@@ -31,15 +36,109 @@ def fetch_invoice_rows(customer_ids: List[str]) -> Tuple[List[Dict], Dict]:
                 "status": row["invoice_status"],
                 "po": row["po_number"]
             }
-            invoice_rows.append(row_dict)
-            total_billed += total_val
-            total_paid += paid_val
+    finally:
+        if own_conn:
+            conn.close()
 
-    totals = {
+
+def invoice_totals(total_billed: float = 0.0, total_paid: float = 0.0, count: int = 0) -> Dict:
+    return {
         "billed": total_billed,
         "paid": total_paid,
         "balance": total_billed - total_paid,
-        "count": len(invoice_rows)
+        "count": count
     }
 
+
+def fetch_invoice_rows(customer_ids: List[str]) -> Tuple[List[Dict], Dict]:
+    """Fetch invoice/payment rows and compute totals."""
+    invoice_rows = list(iter_invoice_rows(customer_ids))
+
+    totals = invoice_totals(
+        sum(r["total"] for r in invoice_rows),
+        sum(r["paid"] for r in invoice_rows),
+        len(invoice_rows),
+    )
+
     return invoice_rows, totals
+
+
+# Invoice statuses that count toward accounts receivable
+AR_STATUSES = (
+    'complete and ready for pickup', 'shipped', 'picked up',
+    'payment request sent', 'harlestons -- invoiced',
+    'past due invoice - followed up', 'on hold - need payment please',
+    'done done', 'pickup reminder sent', 'harlestons -- picked up'
+)
+
+
+def get_ar_summary(conn=None, today=None) -> Dict[str, Dict[str, float]]:
+    """
+    Open balances of billable invoices per company, in aging buckets.
+
+    Returns:
+        {company_label: {"0-30": ..., "31-60": ..., "61-90": ..., "90+": ...}}
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cursor = conn.cursor()
+
+    # Payments are summed per billable invoice through the payments_clean
+    # index, rather than grouping every payment ever recorded first
+    cursor.execute(f"""
+        SELECT company, first_name, last_name, invoice_number, total, invoice_date, amount_paid
+        FROM (
+            SELECT
+                c.company,
+                c.first_name,
+                c.last_name,
+                i.invoice_number,
+                i.total,
+                i.invoice_date,
+                COALESCE((
+                    SELECT SUM(p.amount) FROM payments_clean p
+                    WHERE p.invoice_number = i.invoice_number
+                ), 0) AS amount_paid
+            FROM invoices i
+            JOIN customers c ON i.customer_id = c.id
+            WHERE LOWER(TRIM(i.invoice_status)) IN ({','.join('?' for _ in AR_STATUSES)})
+        )
+        WHERE COALESCE(total, 0) - amount_paid > 0
+    """, AR_STATUSES)
+    rows = cursor.fetchall()
+
+    if own_conn:
+        conn.close()
+
+    today = today or datetime.today()
+    ar_summary = {}
+
+    for company, first, last, inv_num, total, inv_date, paid in rows:
+        balance_due = (total or 0.0) - (paid or 0.0)
+        if balance_due <= 0:
+            continue  # skip fully paid or overpaid invoices
+
+        if isinstance(inv_date, str):
+            try:
+                inv_date = datetime.strptime(inv_date, "%Y-%m-%d")
+            except Exception:
+                continue
+
+        days_old = (today - inv_date).days
+        company_label = company.strip() if company and company.strip() else f"No Company - {first} {last}"
+
+        # Aging buckets
+        if company_label not in ar_summary:
+            ar_summary[company_label] = {"0-30": 0.0, "31-60": 0.0, "61-90": 0.0, "90+": 0.0}
+
+        if days_old <= 30:
+            ar_summary[company_label]["0-30"] += balance_due
+        elif days_old <= 60:
+            ar_summary[company_label]["31-60"] += balance_due
+        elif days_old <= 90:
+            ar_summary[company_label]["61-90"] += balance_due
+        else:
+            ar_summary[company_label]["90+"] += balance_due
+
+    return ar_summary
@@ -1,8 +1,56 @@
-import sys
-import os
+"""
+Maintenance jobs: statement resets, plus the database upkeep scheduler.
 
+SQLite never refreshes planner statistics or gives back free pages on its
+own, and sync_all() rewrites large parts of the invoice and terminal tables
+every time it runs. run_maintenance() looks at the database and runs what is
+due - ANALYZE for tables whose row counts drifted since the last ANALYZE,
+PRAGMA optimize after syncs, pruning change_log entries older than
+CHANGE_LOG_KEEP_DAYS, VACUUM once the freelist passes the db_monitor
+threshold, and a WAL checkpoint once the log has grown - logging timing and
+the file size before/after of each step in maintenance_log. It runs at the
+end of sync_all(), when the desktop app has been idle for a while, or by hand:
+
+    python -m tobys_terminal.shared.maintenance              # run what is due
+    python -m tobys_terminal.shared.maintenance --plan       # only show it
+    python -m tobys_terminal.shared.maintenance --force vacuum analyze
+    python -m tobys_terminal.shared.maintenance --history 20
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
 
 from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.change_log import CHANGE_LOG_KEEP_DAYS, prune_change_log
+from tobys_terminal.shared.customer_search import find_customer_ids_by_company_prefix
+from tobys_terminal.shared.db_monitor import (
+    MONITORED_TABLES, WAL_CHECKPOINT_BYTES, analyzed_row_counts, needs_vacuum,
+    stale_statistics, storage_stats,
+)
+
+MAINTENANCE_IDLE_SECONDS = 300   # desktop idle time before upkeep runs
+MAINTENANCE_CHECK_SECONDS = 60   # how often the idle timer looks
+VACUUM_MIN_HOURS = 24            # VACUUM at most this often, however fragmented
+
+try:
+    from config import MAINTENANCE_IDLE_SECONDS  # noqa: F811
+except ImportError:
+    pass
+try:
+    from config import VACUUM_MIN_HOURS  # noqa: F811
+except ImportError:
+    pass
+
+TRIGGER_SYNC = "sync"
+TRIGGER_IDLE = "idle"
+TRIGGER_MANUAL = "manual"
+
+OPERATIONS = ("analyze", "optimize", "prune_changes", "vacuum", "checkpoint")
+
+# One run at a time per process (the idle thread and a sync can overlap)
+_maintenance_lock = threading.Lock()
 
 def reset_statements_for_company(company_name: str, fuzzy_match: bool = False, delete_statement_headers: bool = True):
     """
@@ -20,16 +68,13 @@ def reset_statements_for_company(company_name: str, fuzzy_match: bool = False, d
 
     # 2) Find customer IDs for the company
     if fuzzy_match:
-        cur.execute("""
-            SELECT id FROM customers
-            WHERE LOWER(TRIM(company)) LIKE LOWER(TRIM(?)) || '%'
-        """, (company_name,))
+        cust_ids = find_customer_ids_by_company_prefix(company_name, conn=conn)
     else:
         cur.execute("""
             SELECT id FROM customers
             WHERE LOWER(TRIM(company)) = LOWER(TRIM(?))
         """, (company_name,))
-    cust_ids = [r[0] for r in cur.fetchall()]
+        cust_ids = [r[0] for r in cur.fetchall()]
     if not cust_ids:
         conn.close()
         return 0, 0  # no customers found
@@ -66,3 +111,246 @@ def reset_statements_for_company(company_name: str, fuzzy_match: bool = False, d
     conn.commit()
     conn.close()
     return cleared, deleted_headers
+
+
+def ensure_maintenance_log_table(conn):
+    """One row per maintenance step, with timing and file size before/after."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            trigger TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            reason TEXT,
+            status TEXT NOT NULL,
+            duration_ms REAL,
+            bytes_before INTEGER,
+            bytes_after INTEGER,
+            freelist_before INTEGER,
+            freelist_after INTEGER,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_log_op ON maintenance_log(operation, status, started_at)")
+    conn.commit()
+
+
+def _last_run(conn, operation):
+    row = conn.execute("""
+        SELECT MAX(started_at) FROM maintenance_log
+        WHERE operation = ? AND status = 'ok'
+    """, (operation,)).fetchone()
+    return datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S") if row and row[0] else None
+
+
+def plan_maintenance(conn, trigger=TRIGGER_MANUAL, force=()):
+    """
+    Work that is due now, in the order it should run.
+
+    Returns:
+        list of (operation, tables, reason); tables is only used by analyze
+    """
+    ensure_maintenance_log_table(conn)
+    storage = storage_stats(conn)
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    rows = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in MONITORED_TABLES if t in tables}
+    plan = []
+
+    stale = stale_statistics(rows, analyzed_row_counts(conn))
+    if "analyze" in force:
+        plan.append(("analyze", [], "forced"))
+    elif stale:
+        plan.append(("analyze", stale, "row counts drifted since the last ANALYZE"))
+
+    if trigger == TRIGGER_SYNC or "optimize" in force:
+        plan.append(("optimize", [], "forced" if "optimize" in force else "after sync"))
+
+    if "prune_changes" in force:
+        plan.append(("prune_changes", [], "forced"))
+    elif "change_log" in tables:
+        oldest = conn.execute("SELECT changed_at FROM change_log ORDER BY seq LIMIT 1").fetchone()
+        cutoff = (datetime.now() - timedelta(days=CHANGE_LOG_KEEP_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        if oldest and oldest[0] < cutoff:
+            plan.append(("prune_changes", [], f"change_log entries older than {CHANGE_LOG_KEEP_DAYS} days"))
+
+    # After pruning, so VACUUM gives back what it freed
+    if "vacuum" in force:
+        plan.append(("vacuum", [], "forced"))
+    elif needs_vacuum(storage):
+        last = _last_run(conn, "vacuum")
+        if last is None or datetime.now() - last >= timedelta(hours=VACUUM_MIN_HOURS):
+            plan.append(("vacuum", [], f"{storage['freelist_count']:,} of {storage['page_count']:,} pages free"))
+
+    # Last, so it also folds in whatever VACUUM wrote to the WAL
+    if "checkpoint" in force:
+        plan.append(("checkpoint", [], "forced"))
+    elif storage["wal_bytes"] >= WAL_CHECKPOINT_BYTES:
+        plan.append(("checkpoint", [], f"WAL at {storage['wal_bytes'] / 1024 / 1024:,.1f} MB"))
+
+    return plan
+
+
+def _run_operation(conn, operation, tables):
+    if operation == "analyze":
+        if tables:
+            for table in tables:
+                conn.execute(f"ANALYZE {table}")
+        else:
+            conn.execute("ANALYZE")
+    elif operation == "optimize":
+        conn.execute("PRAGMA optimize")
+    elif operation == "prune_changes":
+        prune_change_log(conn=conn)
+    elif operation == "vacuum":
+        conn.execute("VACUUM")
+    elif operation == "checkpoint":
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    conn.commit()
+
+
+def run_maintenance(trigger=TRIGGER_MANUAL, conn=None, force=()):
+    """
+    Run the maintenance that is due (plus anything in force) and log each step.
+
+    Returns:
+        list of dicts (one per step), or [] if another run is in progress
+    """
+    if not _maintenance_lock.acquire(blocking=False):
+        return []
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    results = []
+    try:
+        conn.commit()  # VACUUM can't run inside an open transaction
+        for operation, tables, reason in plan_maintenance(conn, trigger, force):
+            before = storage_stats(conn)
+            started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            started = time.perf_counter()
+            status, error = "ok", None
+            try:
+                _run_operation(conn, operation, tables)
+            except sqlite3.Error as e:
+                # Usually "database is locked" - the next idle run tries again
+                conn.rollback()
+                status, error = "failed", str(e)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            after = storage_stats(conn)
+            if tables:
+                reason = f"{reason}: {', '.join(tables)}"
+
+            try:
+                conn.execute("""
+                    INSERT INTO maintenance_log (started_at, trigger, operation, reason, status, duration_ms,
+                                                 bytes_before, bytes_after, freelist_before, freelist_after, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (started_at, trigger, operation, reason, status, duration_ms,
+                      before["file_bytes"], after["file_bytes"],
+                      before["freelist_count"], after["freelist_count"], error))
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"⚠️ Could not log {operation} in maintenance_log: {e}")
+
+            if status == "ok":
+                print(f"🧹 {operation} ({reason}): {duration_ms:,.0f} ms, "
+                      f"{before['file_bytes'] / 1024 / 1024:,.1f} -> {after['file_bytes'] / 1024 / 1024:,.1f} MB")
+            else:
+                print(f"⚠️ {operation} failed: {error}")
+            results.append({
+                "operation": operation, "reason": reason, "status": status, "error": error,
+                "duration_ms": duration_ms, "bytes_before": before["file_bytes"], "bytes_after": after["file_bytes"],
+            })
+    finally:
+        if own_conn:
+            conn.close()
+        _maintenance_lock.release()
+    return results
+
+
+def recent_maintenance(limit=20, conn=None):
+    """Latest maintenance_log rows, newest first."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        ensure_maintenance_log_table(conn)
+        return conn.execute("""
+            SELECT started_at, trigger, operation, reason, status, duration_ms,
+                   bytes_before, bytes_after, freelist_before, freelist_after, error
+            FROM maintenance_log
+            ORDER BY id DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _run_idle_maintenance():
+    try:
+        run_maintenance(TRIGGER_IDLE)
+    except Exception as e:
+        print(f"⚠️ Idle maintenance failed: {e}")
+
+
+def schedule_idle_maintenance(root, idle_seconds=None, check_seconds=None):
+    """
+    Run maintenance in a background thread once the Tk app has seen no key
+    or mouse input for idle_seconds; at most once per idle stretch.
+    """
+    idle_seconds = MAINTENANCE_IDLE_SECONDS if idle_seconds is None else idle_seconds
+    check_ms = int((MAINTENANCE_CHECK_SECONDS if check_seconds is None else check_seconds) * 1000)
+    state = {"last_activity": time.monotonic(), "ran": False}
+
+    def note_activity(_event=None):
+        state["last_activity"] = time.monotonic()
+        state["ran"] = False
+
+    def check():
+        if not state["ran"] and time.monotonic() - state["last_activity"] >= idle_seconds:
+            state["ran"] = True
+            threading.Thread(target=_run_idle_maintenance, daemon=True).start()
+        root.after(check_ms, check)
+
+    root.bind_all("<Any-KeyPress>", note_activity, add="+")
+    root.bind_all("<Any-ButtonPress>", note_activity, add="+")
+    root.after(check_ms, check)
+
+
+def maintenance_cli():
+    """Command-line entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database maintenance (ANALYZE / optimize / VACUUM / WAL checkpoint)")
+    parser.add_argument("--plan", action="store_true", help="Show what is due without running it")
+    parser.add_argument("--force", nargs="+", choices=OPERATIONS, default=[],
+                        help="Run these even if they aren't due")
+    parser.add_argument("--history", type=int, metavar="N", help="Show the last N logged steps")
+    args = parser.parse_args()
+
+    if args.history:
+        for row in recent_maintenance(args.history):
+            started_at, trigger, operation, reason, status, duration_ms, b_before, b_after, _fb, _fa, error = row
+            size = f"{(b_before or 0) / 1024 / 1024:,.1f} -> {(b_after or 0) / 1024 / 1024:,.1f} MB"
+            print(f"{started_at}  {trigger:<7} {operation:<10} {status:<6} {duration_ms or 0:>9,.0f} ms  "
+                  f"{size}  {error or reason or ''}")
+        return
+
+    if args.plan:
+        conn = get_connection()
+        plan = plan_maintenance(conn, TRIGGER_MANUAL, args.force)
+        conn.close()
+        for operation, tables, reason in plan:
+            print(f"  {operation}: {reason}" + (f" ({', '.join(tables)})" if tables else ""))
+        if not plan:
+            print("Nothing due.")
+        return
+
+    if not run_maintenance(TRIGGER_MANUAL, force=args.force):
+        print("Nothing due.")
+
+
+if __name__ == "__main__":
+    maintenance_cli()
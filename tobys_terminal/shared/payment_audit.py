@@ -0,0 +1,266 @@
+# tobys_terminal/shared/payment_audit.py
+"""
+Global payment-integrity audit.
+
+Sweeps every invoice with the single-pass integrity scan (payment_integrity)
+plus a check for payments whose invoice_number has no matching invoice, and
+keeps the findings in `payment_discrepancies`. Each run is diffed against the
+open discrepancies from the previous run: new ones are inserted, ones that
+are still present get their last_seen bumped, and ones that disappeared are
+marked RESOLVED. The office works from the open list instead of re-checking
+customers one at a time.
+
+Runs at the end of every sync_all(); can also be scheduled on its own:
+
+    python -m tobys_terminal.shared.payment_audit          # run the audit
+    python -m tobys_terminal.shared.payment_audit --list   # print open items
+"""
+
+from datetime import datetime
+
+from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.payment_integrity import (
+    OVERPAID, PAID_NO_MONEY, PARTIAL, STATUS_LABELS, check_payments,
+)
+
+ORPHAN_PAYMENT = "orphan_payment"
+
+# Integrity classes that are reported as discrepancies
+AUDITED_STATUSES = (PAID_NO_MONEY, OVERPAID, PARTIAL)
+
+DISCREPANCY_LABELS = {
+    **{status: STATUS_LABELS[status] for status in AUDITED_STATUSES},
+    ORPHAN_PAYMENT: "👻 Payment, No Invoice",
+}
+
+
+def ensure_payment_audit_tables(conn=None):
+    """Create the discrepancy and audit-run tables and their indexes."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payment_discrepancies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            discrepancy_key TEXT UNIQUE NOT NULL,
+            kind TEXT NOT NULL,
+            invoice_number TEXT,
+            customer_id INTEGER,
+            payment_id INTEGER,
+            invoice_total REAL,
+            actual_paid REAL,
+            difference REAL,
+            paid_flag TEXT,
+            status TEXT NOT NULL DEFAULT 'OPEN',
+            first_seen TEXT,
+            last_seen TEXT,
+            resolved_at TEXT,
+            last_run_id INTEGER
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payment_audit_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT,
+            finished_at TEXT,
+            invoices_checked INTEGER,
+            open_count INTEGER,
+            new_count INTEGER,
+            resolved_count INTEGER
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_discrepancies_status_kind ON payment_discrepancies(status, kind)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_discrepancies_invoice ON payment_discrepancies(invoice_number)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_discrepancies_customer ON payment_discrepancies(customer_id)")
+
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+
+def _find_orphan_payments(conn):
+    """Payments whose invoice_number doesn't match any invoice."""
+    return conn.execute("""
+        SELECT p.id, p.invoice_number, p.customer_id, p.amount
+        FROM payments_clean p
+        LEFT JOIN invoices i ON i.invoice_number = p.invoice_number
+        WHERE i.invoice_number IS NULL
+    """).fetchall()
+
+
+def _current_findings(conn):
+    """discrepancy_key -> row tuple for everything wrong right now."""
+    findings = {}
+    results = check_payments(conn=conn, use_cache=False)
+    for r in results:
+        if r["status"] not in AUDITED_STATUSES:
+            continue
+        key = f"{r['status']}:{r['invoice_number']}"
+        findings[key] = (
+            key, r["status"], r["invoice_number"], r["customer_id"], None,
+            r["invoice_total"], r["actual_paid"], r["difference"], r["paid_flag"],
+        )
+
+    for payment_id, invoice_number, customer_id, amount in _find_orphan_payments(conn):
+        key = f"{ORPHAN_PAYMENT}:{payment_id}"
+        findings[key] = (
+            key, ORPHAN_PAYMENT, invoice_number, customer_id, payment_id,
+            None, float(amount or 0), None, None,
+        )
+    return findings, len(results)
+
+
+def run_payment_audit(conn=None):
+    """
+    Sweep every invoice and payment and update payment_discrepancies.
+
+    Returns a summary dict: run_id, invoices_checked, open, new, resolved.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ensure_payment_audit_tables(conn)
+
+    started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    try:
+        findings, checked = _current_findings(conn)
+
+        cur.execute("INSERT INTO payment_audit_runs (started_at) VALUES (?)", (started,))
+        run_id = cur.lastrowid
+
+        previously_open = {
+            row[0] for row in cur.execute(
+                "SELECT discrepancy_key FROM payment_discrepancies WHERE status = 'OPEN'"
+            ).fetchall()
+        }
+        new_keys = findings.keys() - previously_open
+        resolved_keys = previously_open - findings.keys()
+
+        # Insert new findings and refresh the ones still open (a resolved
+        # discrepancy that comes back is re-opened under its original row).
+        cur.executemany("""
+            INSERT INTO payment_discrepancies (
+                discrepancy_key, kind, invoice_number, customer_id, payment_id,
+                invoice_total, actual_paid, difference, paid_flag,
+                status, first_seen, last_seen, last_run_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'OPEN', ?, ?, ?)
+            ON CONFLICT(discrepancy_key) DO UPDATE SET
+                customer_id = excluded.customer_id,
+                invoice_total = excluded.invoice_total,
+                actual_paid = excluded.actual_paid,
+                difference = excluded.difference,
+                paid_flag = excluded.paid_flag,
+                status = 'OPEN',
+                resolved_at = NULL,
+                last_seen = excluded.last_seen,
+                last_run_id = excluded.last_run_id
+        """, [row + (started, started, run_id) for row in findings.values()])
+
+        cur.executemany("""
+            UPDATE payment_discrepancies
+            SET status = 'RESOLVED', resolved_at = ?, last_run_id = ?
+            WHERE discrepancy_key = ?
+        """, [(started, run_id, key) for key in resolved_keys])
+
+        finished = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cur.execute("""
+            UPDATE payment_audit_runs
+            SET finished_at = ?, invoices_checked = ?, open_count = ?, new_count = ?, resolved_count = ?
+            WHERE id = ?
+        """, (finished, checked, len(findings), len(new_keys), len(resolved_keys), run_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+    return {
+        "run_id": run_id,
+        "invoices_checked": checked,
+        "open": len(findings),
+        "new": len(new_keys),
+        "resolved": len(resolved_keys),
+    }
+
+
+def get_open_discrepancies(kind=None, customer_ids=None, conn=None):
+    """
+    The current exception list, newest first.
+    Returns a list of dicts (one per open discrepancy).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ensure_payment_audit_tables(conn)
+
+    sql = """
+        SELECT id, kind, invoice_number, customer_id, payment_id, invoice_total,
+               actual_paid, difference, paid_flag, first_seen, last_seen
+        FROM payment_discrepancies
+        WHERE status = 'OPEN'
+    """
+    params = []
+    if kind:
+        sql += " AND kind = ?"
+        params.append(kind)
+    if customer_ids:
+        sql += f" AND customer_id IN ({','.join('?' for _ in customer_ids)})"
+        params.extend(customer_ids)
+    sql += " ORDER BY first_seen DESC, invoice_number"
+
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def get_last_audit_run(conn=None):
+    """Summary row of the most recent finished audit, or None."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    ensure_payment_audit_tables(conn)
+    cursor = conn.execute("""
+        SELECT id, started_at, finished_at, invoices_checked, open_count, new_count, resolved_count
+        FROM payment_audit_runs
+        WHERE finished_at IS NOT NULL
+        ORDER BY id DESC LIMIT 1
+    """)
+    row = cursor.fetchone()
+    result = dict(zip([d[0] for d in cursor.description], row)) if row else None
+    if own_conn:
+        conn.close()
+    return result
+
+
+def payment_audit_cli():
+    """Command-line entry point (for cron / Task Scheduler)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Payment integrity audit")
+    parser.add_argument("--list", action="store_true", help="Print the open discrepancies instead of running an audit")
+    parser.add_argument("--kind", choices=sorted(DISCREPANCY_LABELS), help="Only list one kind of discrepancy")
+    args = parser.parse_args()
+
+    if args.list:
+        for d in get_open_discrepancies(kind=args.kind):
+            label = DISCREPANCY_LABELS.get(d["kind"], d["kind"])
+            print(f"{label:28} invoice {d['invoice_number'] or '-':>10}  "
+                  f"customer {d['customer_id'] or '-':>6}  paid ${float(d['actual_paid'] or 0):,.2f}  "
+                  f"since {d['first_seen']}")
+        return
+
+    summary = run_payment_audit()
+    print(f"✅ Checked {summary['invoices_checked']} invoices: {summary['open']} open discrepancies "
+          f"({summary['new']} new, {summary['resolved']} resolved)")
+
+
+if __name__ == "__main__":
+    payment_audit_cli()
@@ -0,0 +1,162 @@
+# tobys_terminal/shared/payment_integrity.py
+"""
+Payment integrity checks: does what was recorded as paid on each invoice
+match the money actually sitting in payments_clean?
+
+The Payment Integrity Checker used to walk StatementCalculator rows and run
+one SUM(amount) query per invoice, classifying in Python. Here the payment
+sums, differences and mismatch classes are computed by a single grouped
+query, for one company's customer IDs or for every invoice at once.
+"""
+
+import time
+
+from tobys_terminal.shared.change_log import latest_seq
+from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.statement_logic import StatementCalculator
+
+# Mismatch classes, in the order they are tested
+PAID_NO_MONEY = "paid_no_money"
+FULLY_PAID = "fully_paid"
+OVERPAID = "overpaid"
+PARTIAL = "partial"
+UNPAID = "unpaid"
+
+STATUS_LABELS = {
+    PAID_NO_MONEY: "❌ Paid Flag True, No $",
+    FULLY_PAID: "✅ Fully Paid",
+    OVERPAID: "🔴 Overpaid",
+    PARTIAL: "🟠 Partial",
+    UNPAID: "🟡 Unpaid",
+}
+
+PAID_FLAGS = ("yes", "true", "paid")
+
+# Seconds a cached scan stays valid without an explicit invalidation; a
+# logged change to either table invalidates it sooner
+INTEGRITY_CACHE_TTL = 600
+INTEGRITY_TABLES = ("invoices", "payments_clean")
+
+_cache = {}
+
+
+def _integrity_query(customer_ids=None):
+    """
+    SQL + params for the integrity scan. Invoices are filtered the same way
+    the statement view does for a full history ($0 invoices, non-billable
+    statuses and undated invoices are skipped).
+    """
+    non_billable = sorted(StatementCalculator.NON_BILLABLE_STATUSES)
+    params = []
+
+    invoice_filter = ""
+    if customer_ids:
+        invoice_filter = f"AND i.customer_id IN ({','.join('?' for _ in customer_ids)})"
+
+    # Only sum payments for the invoices in scope when scanning one company
+    payment_filter = ""
+    if customer_ids:
+        payment_filter = (
+            "AND invoice_number IN (SELECT invoice_number FROM invoices "
+            f"WHERE customer_id IN ({','.join('?' for _ in customer_ids)}))"
+        )
+        params.extend(customer_ids)
+
+    sql = f"""
+        WITH paid AS (
+            SELECT invoice_number, ROUND(SUM(amount), 2) AS actual_paid
+            FROM payments_clean
+            WHERE invoice_number IS NOT NULL {payment_filter}
+            GROUP BY invoice_number
+        ),
+        checked AS (
+            SELECT
+                i.customer_id,
+                i.invoice_number,
+                i.invoice_date,
+                ROUND(CAST(i.total AS REAL), 2) AS invoice_total,
+                LOWER(TRIM(COALESCE(i.paid, ''))) AS paid_flag,
+                COALESCE(p.actual_paid, 0.0) AS actual_paid
+            FROM invoices i
+            LEFT JOIN paid p ON p.invoice_number = i.invoice_number
+            WHERE CAST(COALESCE(i.total, 0) AS REAL) != 0
+              AND TRIM(COALESCE(i.invoice_date, '')) != ''
+              AND LOWER(TRIM(COALESCE(i.invoice_status, ''))) NOT IN ({','.join('?' for _ in non_billable)})
+              {invoice_filter}
+        )
+        SELECT
+            customer_id,
+            invoice_number,
+            invoice_date,
+            invoice_total,
+            paid_flag,
+            actual_paid,
+            ROUND(invoice_total - actual_paid, 2) AS difference,
+            CASE
+                WHEN paid_flag IN ({','.join('?' for _ in PAID_FLAGS)}) AND actual_paid = 0 THEN ?
+                WHEN ROUND(invoice_total - actual_paid, 2) = 0 THEN ?
+                WHEN ROUND(invoice_total - actual_paid, 2) < 0 THEN ?
+                WHEN actual_paid > 0 THEN ?
+                ELSE ?
+            END AS status
+        FROM checked
+        ORDER BY invoice_date, invoice_number
+    """
+    params.extend(non_billable)
+    if customer_ids:
+        params.extend(customer_ids)
+    params.extend(PAID_FLAGS)
+    params.extend([PAID_NO_MONEY, FULLY_PAID, OVERPAID, PARTIAL, UNPAID])
+    return sql, params
+
+
+def check_payments(customer_ids=None, conn=None, use_cache=True):
+    """
+    Run the integrity scan.
+
+    Args:
+        customer_ids: list of customer IDs (one company), or None for every invoice
+        conn: optional open connection
+        use_cache: reuse a recent scan for the same customer set
+
+    Returns:
+        list of dicts with customer_id, invoice_number, invoice_date,
+        invoice_total, paid_flag, actual_paid, difference and status
+        (one of the mismatch classes above)
+    """
+    cache_key = tuple(sorted(customer_ids)) if customer_ids else None
+    now = time.monotonic()
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        seq = latest_seq(conn, INTEGRITY_TABLES)
+        if use_cache:
+            cached = _cache.get(cache_key)
+            if cached and now - cached[0] < INTEGRITY_CACHE_TTL and cached[2] == seq:
+                return cached[1]
+
+        sql, params = _integrity_query(list(customer_ids) if customer_ids else None)
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        if own_conn:
+            conn.close()
+
+    _cache[cache_key] = (now, results, seq)
+    return results
+
+
+def summarize(results):
+    """Count of invoices per mismatch class."""
+    counts = {status: 0 for status in STATUS_LABELS}
+    for row in results:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    return counts
+
+
+def invalidate_integrity_cache():
+    """Forget cached scans (call after imports or payment edits)."""
+    _cache.clear()
@@ -0,0 +1,151 @@
+# tobys_terminal/shared/pdf_bundle.py
+"""
+IMM report bundle: every production and status PDF from one roster query.
+
+Printing the morning reports one button at a time re-queried imm_orders for
+each mode. Here the roster is read once, split into the per-mode production
+views and per-status views in memory, and the PDFs are rendered in parallel
+in a process pool (ReportLab layout is CPU-bound, so threads wouldn't help).
+Everything lands in the imm_reports folder.
+"""
+
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.pdf_export import (
+    IMM_PRODUCTION_COLUMNS, IMM_PRODUCTION_ORDER_BY, imm_mode_matches,
+    imm_production_pdf_path,
+)
+
+PRODUCTION_MODES = ("full", "emb", "dtf")
+
+# Statuses that get their own status report by default (when they have orders)
+STATUS_REPORT_STATUSES = (
+    "Inline-EMB", "Inline-DTF", "Inline-PAT", "Need Sewout",
+    "Need Product", "Need File", "Need Approval", "Complete",
+)
+
+
+def fetch_imm_roster(conn=None):
+    """
+    The one roster query: every visible, open IMM order in production print
+    order, as (production columns..., customer_due_date) tuples.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    rows = conn.execute(f"""
+        SELECT {IMM_PRODUCTION_COLUMNS}, customer_due_date
+        FROM imm_orders
+        WHERE status != 'Hidden'
+          AND LOWER(status) NOT IN ('cancelled', 'archived')
+        ORDER BY {IMM_PRODUCTION_ORDER_BY}
+    """).fetchall()
+    if own_conn:
+        conn.close()
+    return [tuple(r) for r in rows]
+
+
+def production_rows(roster, mode):
+    """Rows for one production PDF, same filter as generate_imm_production_pdf."""
+    return [
+        r[:8] for r in roster
+        if (r[6] or "").lower() != "done done" and imm_mode_matches(r, mode)
+    ]
+
+
+def status_rows(roster, status):
+    """Rows for one status report (Date, PO, Reference, In Hands, Status, Notes)."""
+    matching = [r for r in roster if r[6] == status]
+    # ORDER BY in_hand_date ASC (NULLs first, like SQLite)
+    matching.sort(key=lambda r: (r[2] is not None, r[2] or ""))
+    return [(r[8], r[0], r[1], r[2], r[6], r[7]) for r in matching]
+
+
+def _status_pdf_path(reports_dir, status, today):
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in status)
+    return os.path.join(reports_dir, f"IMM_Status_{safe}_{today}.pdf")
+
+
+def _render_job(job):
+    """Worker entry point (must stay importable at module level for the pool)."""
+    kind, key, rows, filepath = job
+    from tobys_terminal.shared.pdf_export import generate_imm_status_report, render_imm_production_pdf
+
+    if kind == "production":
+        return render_imm_production_pdf(rows, key, filepath)
+    return generate_imm_status_report(key, rows, output_path=filepath)
+
+
+def generate_imm_report_bundle(modes=PRODUCTION_MODES, statuses=None, parallel=True,
+                               max_workers=None, conn=None):
+    """
+    Render every IMM production and status report from one roster query.
+
+    Args:
+        modes: production modes to print ("full", "emb", "dtf")
+        statuses: statuses to print status reports for; None = the default
+            STATUS_REPORT_STATUSES that currently have orders, [] = none
+        parallel: render in a process pool (falls back to in-process)
+        max_workers: pool size (default: one per job, capped at CPU count)
+
+    Returns:
+        dict: production {mode: path}, status {status: path},
+        errors {"kind:key": message}
+    """
+    from datetime import datetime
+
+    roster = fetch_imm_roster(conn)
+
+    if statuses is None:
+        present = {r[6] for r in roster}
+        statuses = [s for s in STATUS_REPORT_STATUSES if s in present]
+
+    jobs = [("production", mode, production_rows(roster, mode), imm_production_pdf_path(mode))
+            for mode in modes]
+    if statuses:
+        reports_dir = os.path.dirname(imm_production_pdf_path("full"))
+        today = datetime.now().strftime("%Y%m%d")
+        jobs += [("status", status, status_rows(roster, status), _status_pdf_path(reports_dir, status, today))
+                 for status in statuses]
+
+    result = {"production": {}, "status": {}, "errors": {}}
+
+    def record(job, outcome, error=None):
+        kind, key = job[0], job[1]
+        if error is not None:
+            result["errors"][f"{kind}:{key}"] = str(error)
+        else:
+            result[kind][key] = outcome
+
+    pending = list(jobs)
+    if parallel and len(jobs) > 1:
+        workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(job, pool.submit(_render_job, job)) for job in jobs]
+                for job, future in futures:
+                    try:
+                        record(job, future.result())
+                    except BrokenExecutor:
+                        raise
+                    except Exception as e:
+                        record(job, None, e)
+            pending = []
+        except (OSError, RuntimeError) as e:
+            # No process pool available (restricted host, broken pool):
+            # render whatever didn't finish in this process instead.
+            print(f"⚠️ Parallel PDF rendering unavailable, rendering serially: {e}")
+            done = {f"{kind}:{key}" for kind in ("production", "status") for key in result[kind]}
+            pending = [job for job in jobs if f"{job[0]}:{job[1]}" not in done]
+            for job in pending:
+                result["errors"].pop(f"{job[0]}:{job[1]}", None)
+
+    for job in pending:
+        try:
+            record(job, _render_job(job))
+        except Exception as e:
+            record(job, None, e)
+
+    return result
@@ -0,0 +1,142 @@
+# tobys_terminal/shared/pdf_cache.py
+"""
+Render cache for statement PDFs.
+
+A statement PDF is only re-rendered when its content changes. Each rendered
+file gets a small sidecar (`<file>.pdf.json`) holding a hash of the rows,
+totals, header fields and the statement template version; if the hash of
+the data being asked for matches, the PDF already on disk is served as is.
+
+When a statement does change, the previous file is still moved into the
+`dnu` ("do not use") folder, but that folder is now pruned by policy instead
+of growing forever.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+# Bump when the statement layout changes so every cached PDF is re-rendered
+STATEMENT_TEMPLATE_VERSION = "1"
+
+# dnu retention: newest copies kept per statement, and max age of the rest
+DNU_KEEP_PER_STATEMENT = 3
+DNU_MAX_AGE_DAYS = 90
+
+try:
+    from config import DNU_KEEP_PER_STATEMENT, DNU_MAX_AGE_DAYS  # noqa: F811
+except ImportError:
+    pass
+
+
+def statement_fingerprint(customer_name, rows, totals, start_date, end_date, statement_number, nickname=None,
+                          statement_date=None):
+    """
+    Stable hash of everything that ends up on a statement PDF.
+    statement_date is the date printed in the header when there is no date range.
+    """
+    payload = {
+        "template": STATEMENT_TEMPLATE_VERSION,
+        "customer": customer_name,
+        "statement": statement_number,
+        "start": start_date,
+        "end": end_date,
+        "nickname": nickname,
+        "rows": [list(r) for r in rows],
+        "totals": {k: round(float(v or 0), 2) for k, v in (totals or {}).items()},
+    }
+    if statement_date:
+        payload["statement_date"] = statement_date
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _sidecar_path(pdf_path):
+    return f"{pdf_path}.json"
+
+
+def get_cached_pdf(pdf_path, fingerprint):
+    """Return pdf_path if it exists and was rendered from the same data, else None."""
+    if not os.path.exists(pdf_path):
+        return None
+    try:
+        with open(_sidecar_path(pdf_path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return pdf_path if meta.get("fingerprint") == fingerprint else None
+
+
+def record_render(pdf_path, fingerprint):
+    """Remember which data pdf_path was rendered from."""
+    meta = {"fingerprint": fingerprint, "rendered_at": datetime.now().isoformat(timespec="seconds")}
+    try:
+        with open(_sidecar_path(pdf_path), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    except OSError as e:
+        print(f"⚠️ Could not write PDF cache entry for {pdf_path}: {e}")
+
+
+def archive_to_dnu(pdf_path):
+    """Move an outdated PDF into the dnu folder next to it and prune that folder."""
+    if not os.path.exists(pdf_path):
+        return None
+    folder, filename = os.path.split(pdf_path)
+    dnu_dir = os.path.join(folder, "dnu")
+    os.makedirs(dnu_dir, exist_ok=True)
+
+    archived_name = f"{filename.replace('.pdf', '')}_{datetime.now():%Y%m%d_%H%M%S}.pdf"
+    archived_path = os.path.join(dnu_dir, archived_name)
+    os.replace(pdf_path, archived_path)
+    try:
+        os.remove(_sidecar_path(pdf_path))
+    except OSError:
+        pass
+
+    prune_dnu(dnu_dir)
+    return archived_path
+
+
+def prune_dnu(dnu_dir, keep=None, max_age_days=None):
+    """
+    Apply the retention policy to a dnu folder: for each statement keep the
+    newest `keep` copies, and drop any other copy older than `max_age_days`.
+    Returns the number of files removed.
+    """
+    keep = DNU_KEEP_PER_STATEMENT if keep is None else keep
+    max_age_days = DNU_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    if not os.path.isdir(dnu_dir):
+        return 0
+
+    # archived names are <original>_<YYYYmmdd>_<HHMMSS>.pdf
+    by_statement = {}
+    for name in os.listdir(dnu_dir):
+        if not name.lower().endswith(".pdf"):
+            continue
+        base = name[:-4].rsplit("_", 2)[0]
+        path = os.path.join(dnu_dir, name)
+        by_statement.setdefault(base, []).append((os.path.getmtime(path), path))
+
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for copies in by_statement.values():
+        copies.sort(reverse=True)  # newest first
+        for i, (mtime, path) in enumerate(copies):
+            if i >= keep or (i > 0 and mtime < cutoff):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    print(f"⚠️ Could not prune {path}: {e}")
+    return removed
+
+
+def prune_all_dnu(root_dir, keep=None, max_age_days=None):
+    """Prune every dnu folder under root_dir (e.g. exports/statements)."""
+    removed = 0
+    for folder, dirs, _files in os.walk(root_dir):
+        if os.path.basename(folder) == "dnu":
+            removed += prune_dnu(folder, keep, max_age_days)
+    return removed
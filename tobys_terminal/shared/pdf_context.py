@@ -0,0 +1,106 @@
+# tobys_terminal/shared/pdf_context.py
+"""
+Per-process PDF rendering context.
+
+Everything a render needs that doesn't depend on the data (stylesheets,
+branded styles, the logo, static table styles) is loaded once here and
+reused by every statement and production report the process generates, so
+a batch run or a busy portal doesn't rebuild it per document.
+
+Nothing in this module touches tkinter; the desktop-only prompts live in
+the interactive branches of pdf_export.
+"""
+
+import io
+import os
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Image
+
+from tobys_terminal.shared.pdf_style import get_branded_styles, get_sample_styles
+
+# Package resource handling
+try:
+    # For Python 3.9+
+    from importlib.resources import files
+    ASSETS_DIR = str(files('tobys_terminal.shared.assets'))
+    EXPORTS_BASE_DIR = str(files('tobys_terminal.shared.exports'))
+except (ImportError, AttributeError):
+    # Fallback for older Python versions
+    import pkg_resources
+    ASSETS_DIR = pkg_resources.resource_filename('tobys_terminal.shared', 'assets')
+    EXPORTS_BASE_DIR = pkg_resources.resource_filename('tobys_terminal.shared', 'exports')
+
+LOGO_FILENAME = "logo.png"
+
+HARLESTONS_TABLE_CMDS = (
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+)
+
+# Free-text Harlestons cells (Club, Notes) wrap inside their column
+HARLESTONS_CELL_STYLE = ParagraphStyle(
+    "HarlestonsCell", fontName="Helvetica", fontSize=10, leading=12,
+)
+
+
+class PdfRenderContext:
+    """Styles and assets shared by every PDF rendered in this process."""
+
+    def __init__(self, assets_dir=ASSETS_DIR):
+        # Shared sample stylesheet (production reports, status reports)
+        self.styles = get_sample_styles()
+        self.branded = get_branded_styles()
+
+        # Statements tweak a couple of sample styles, so they get their own
+        # stylesheet instead of mutating the shared one on every render
+        self.statement_styles = getSampleStyleSheet()
+        self.statement_styles["BodyText"].fontSize = 9
+        self.statement_styles["Normal"].spaceAfter = 1
+
+        self.logo_path = os.path.join(assets_dir, LOGO_FILENAME)
+        self._logo_bytes = None
+        try:
+            with open(self.logo_path, "rb") as f:
+                self._logo_bytes = f.read()
+        except OSError as e:
+            print(f"⚠️ Logo not found at: {self.logo_path} ({e})")
+
+    def logo_image(self, width, height):
+        """A fresh logo flowable from the cached image bytes, or None."""
+        if self._logo_bytes is None:
+            return None
+        return Image(io.BytesIO(self._logo_bytes), width=width, height=height)
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_render_context():
+    """The process-wide render context, created on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = PdfRenderContext()
+    return _context
+
+
+def reset_render_context():
+    """Drop the cached context (e.g. after replacing the logo)."""
+    global _context
+    with _context_lock:
+        _context = None
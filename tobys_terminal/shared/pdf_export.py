@@ -10,66 +10,81 @@ import sqlite3
 from datetime import datetime
 from collections import defaultdict
 from copy import deepcopy
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from itertools import accumulate
 from  tobys_terminal.shared.css_swag_colors import FOREST_GREEN, PALM_GREEN, CORAL_ORANGE, COCONUT_CREAM, TAN_SAND, PALM_BARK
 # ReportLab imports
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import LETTER, letter, landscape
+from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.pdfgen import canvas as _canvas
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, 
-    Image, KeepTogether
+    KeepTogether
 )
 from reportlab.pdfbase.pdfmetrics import stringWidth
 
 from pathlib import Path
     
 from tobys_terminal.shared.db import get_connection
-from config import PROJECT_ROOT  # Import PROJECT_ROOT from config
+from tobys_terminal.shared.pdf_cache import (
+    archive_to_dnu, get_cached_pdf, record_render, statement_fingerprint,
+)
+# Asset/export locations and the shared styles/logo live in the render
+# context. tkinter is only imported inside the interactive (desktop) branch
+# so the web process never loads it.
+from tobys_terminal.shared.pdf_style import truncate_text
+from tobys_terminal.shared.pdf_context import (
+    EXPORTS_BASE_DIR, HARLESTONS_CELL_STYLE, HARLESTONS_TABLE_CMDS, get_render_context,
+)
 
+# Production reports are rendered one page-sized table segment at a time
+IMM_ROWS_PER_PAGE = 18
+HARLESTONS_ROWS_PER_PAGE = 22
 
 
+# Helper functions for text formatting
 
-# Tkinter imports (for interactive mode)
-from tkinter import messagebox
+# Glyph widths per (font, size), filled in as characters are seen. The
+# built-in Type1 fonts have no kerning, so a string's width is the sum of
+# its glyph widths.
+_glyph_widths = {}
 
-# Package resource handling
-try:
-    # For Python 3.9+
-    from importlib.resources import files
-    ASSETS_DIR = str(files('tobys_terminal.shared.assets'))
-    EXPORTS_BASE_DIR = str(files('tobys_terminal.shared.exports'))
-except (ImportError, AttributeError):
-    # Fallback for older Python versions
-    import pkg_resources
-    ASSETS_DIR = pkg_resources.resource_filename('tobys_terminal.shared', 'assets')
-    EXPORTS_BASE_DIR = pkg_resources.resource_filename('tobys_terminal.shared', 'exports')
 
-# Local imports
-from tobys_terminal.shared.db import get_connection
+def _char_widths(text, font, font_size):
+    """Width of each character in text, from the cached glyph table."""
+    table = _glyph_widths.setdefault((font, font_size), {})
+    widths = []
+    for ch in text:
+        w = table.get(ch)
+        if w is None:
+            w = table[ch] = stringWidth(ch, font, font_size)
+        widths.append(w)
+    return widths
 
 
-# Helper functions for text formatting
 def wrap_po_if_needed(po_number, font="Helvetica", font_size=10, max_width=1.2 * inch):
     """Wrap PO numbers that are too long to fit in a cell."""
     if not po_number:
         return ""
+    return _wrap_po(str(po_number).strip(), font, font_size, max_width)
 
-    po_number = str(po_number).strip()
-    width = stringWidth(po_number, font, font_size)
-    if width <= max_width:
+
+@lru_cache(maxsize=4096)
+def _wrap_po(po_number, font, font_size, max_width):
+    # prefix[i] = width of po_number[:i]
+    prefix = [0.0] + list(accumulate(_char_widths(po_number, font, font_size)))
+    total = prefix[-1]
+    if total <= max_width:
         return po_number
 
-    # Try to find a good split point near 2/3 length
+    # Try to find a good split point near 2/3 length, walking backward to
+    # the first one where both halves fit
     preferred_split = int(len(po_number) * 0.66)
-
-    # Start from preferred_split and walk backward to find a natural break
     for i in range(preferred_split, 0, -1):
-        part1 = po_number[:i]
-        part2 = po_number[i:]
-        if stringWidth(part1, font, font_size) <= max_width and stringWidth(part2, font, font_size) <= max_width:
-            return f"{part1}\n{part2}"
+        if prefix[i] <= max_width and total - prefix[i] <= max_width:
+            return f"{po_number[:i]}\n{po_number[i:]}"
 
     # Fallback if nothing found: just split somewhere safe
     mid = len(po_number) // 2
@@ -80,8 +95,12 @@ def wrap_status_if_needed(status_text, font="Helvetica", font_size=10, max_width
     """Wrap status text that is too long to fit in a cell."""
     if not status_text:
         return ""
-    status_text = str(status_text).strip()
-    width = stringWidth(status_text, font, font_size)
+    return _wrap_status(str(status_text).strip(), font, font_size, max_width)
+
+
+@lru_cache(maxsize=4096)
+def _wrap_status(status_text, font, font_size, max_width):
+    width = sum(_char_widths(status_text, font, font_size))
     if width <= max_width:
         return status_text
     else:
@@ -120,9 +139,17 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
     filename = f"{statement_number}_statement_{safe_name}_{date_str}.pdf"
     filepath = os.path.join(EXPORTS_DIR, filename)
 
+    # Without a date range the header shows today's date, so it is part of the content
+    statement_date = None if (start_date and end_date) else f"{datetime.now():%m/%d/%Y}"
+    fingerprint = statement_fingerprint(
+        customer_name, rows, totals, start_date, end_date, statement_number, nickname,
+        statement_date=statement_date,
+    )
+
     if interactive:
         # Prompt before overwriting (Tkinter app)
         if os.path.exists(filepath):
+            from tkinter import messagebox
             overwrite = messagebox.askyesno(
                 "Replace File?",
                 f"The file already exists:\n\n{filename}\n\n"
@@ -131,13 +158,11 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
             if not overwrite:
                 return None
     else:
-        # Web/portal mode → move old version to "dnu" folder before overwriting
-        if os.path.exists(filepath):
-            DNU_DIR = os.path.join(EXPORTS_DIR, "dnu")
-            os.makedirs(DNU_DIR, exist_ok=True)
-            archived_name = f"{filename.replace('.pdf', '')}_{datetime.now():%Y%m%d_%H%M%S}.pdf"
-            archived_path = os.path.join(DNU_DIR, archived_name)
-            os.rename(filepath, archived_path)
+        # Web/portal mode → serve the existing file if nothing on the
+        # statement changed, otherwise move it to "dnu" and re-render
+        if get_cached_pdf(filepath, fingerprint):
+            return filepath
+        archive_to_dnu(filepath)
 
     # ---------- doc / styles ----------
     doc = SimpleDocTemplate(
@@ -149,7 +174,8 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
         bottomMargin=50
     )
 
-    styles = getSampleStyleSheet()
+    ctx = get_render_context()
+    styles = ctx.statement_styles
     unpaid_rows, paid_rows = [], []
     
     # ---------- helper: totals normalize ----------
@@ -214,17 +240,14 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
     # Left cell: logo + address (mini-table)
     left_rows = []
     try:
-        logo_path = os.path.join(ASSETS_DIR, "logo.png")
-        if os.path.exists(logo_path):
-            logo = Image(logo_path, width=110, height=55)
+        logo = ctx.logo_image(width=110, height=55)
+        if logo is not None:
             left_rows.append([logo])
-        else:
-            print(f"⚠️ Logo not found at: {logo_path}")
     except Exception as e:
         print(f"⚠️ Logo load error: {e}")
         pass
     
-    addr_style = styles["BodyText"]; addr_style.fontSize = 9
+    addr_style = styles["BodyText"]  # 9pt in the statement stylesheet
     left_rows += [
         [Paragraph("<b>CSS Embroidery & Print</b>", styles["Heading4"])],
         [Paragraph("1855 Belgrade Avenue", addr_style)],
@@ -241,7 +264,7 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
 
     # Right cell: title + meta as a tidy 2-col table
     title_style = styles["Title"]
-    meta_style  = styles["Normal"]; meta_style.spaceAfter = 1
+    meta_style  = styles["Normal"]  # spaceAfter=1 in the statement stylesheet
 
     kv = [
         # First row: title spanning both columns
@@ -256,7 +279,7 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
         kv.append([Paragraph("<b>Date Range:</b>", meta_style), Paragraph(f"{start_date} to {end_date}", meta_style)])
     else:
         kv.append([Paragraph("<b>Statement Date:</b>", meta_style),
-                Paragraph(f"{datetime.now():%m/%d/%Y}", meta_style)])
+                Paragraph(statement_date, meta_style)])
 
     right_col = Table(kv, colWidths=[1.1*inch, (COL_R - 1.1*inch)])
     right_col.setStyle(TableStyle([
@@ -377,23 +400,29 @@ def generate_pdf(customer_name, rows, totals, start_date, end_date, statement_nu
         onFirstPage=footer,
         onLaterPages=footer
     )
+    record_render(filepath, fingerprint)
     return filepath
 
 
 def generate_imm_status_report(status, rows, output_path=None):
     """Generate a PDF report of IMM orders with a specific status."""
-    filename = f"IMM_Status_{status}_{datetime.now():%Y%m%d}.pdf"
-    EXPORTS_DIR = EXPORTS_BASE_DIR
-    os.makedirs(EXPORTS_DIR, exist_ok=True)
-    filepath = os.path.join(EXPORTS_DIR, filename)
+    if output_path:
+        filepath = output_path
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    else:
+        safe_status = re.sub(r'[^a-zA-Z0-9_-]', '_', str(status))
+        filename = f"IMM_Status_{safe_status}_{datetime.now():%Y%m%d}.pdf"
+        EXPORTS_DIR = EXPORTS_BASE_DIR
+        os.makedirs(EXPORTS_DIR, exist_ok=True)
+        filepath = os.path.join(EXPORTS_DIR, filename)
 
     doc = SimpleDocTemplate(filepath, pagesize=LETTER, leftMargin=50, rightMargin=50, topMargin=40, bottomMargin=50)
 
-    header = Paragraph(f"<b>IMM Status Report: {status}</b>", getSampleStyleSheet()["Title"])
+    header = Paragraph(f"<b>IMM Status Report: {status}</b>", get_render_context().styles["Title"])
     spacer = Spacer(1, 12)
 
     # Headers for IMM table
-    data = [["Date", "PO #", "Reference", "In Hands Date", "Status", "Notes"]] + rows
+    data = [["Date", "PO #", "Reference", "In Hands Date", "Status", "Notes"]] + [list(r) for r in rows]
 
     t = Table(data, colWidths=[1*inch, 1*inch, 2*inch, 1*inch, 1.5*inch, 2*inch], repeatRows=1)
     t.setStyle(TableStyle([
@@ -412,71 +441,133 @@ def generate_imm_status_report(status, rows, output_path=None):
 
 
 def get_imm_orders_by_status(status):
-    """Get all IMM orders with a specific status."""
+    """Get all IMM orders with a specific status (rows for generate_imm_status_report)."""
     conn = get_connection()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
     cursor.execute("""
-        SELECT date, po_number, nickname, in_hands_date, status, notes
+        SELECT customer_due_date AS date, po_number, nickname, in_hand_date, status, notes
         FROM imm_orders
         WHERE status = ?
-        ORDER BY in_hands_date ASC
+        ORDER BY in_hand_date ASC
     """, (status,))
-    return cursor.fetchall()
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
 
 
-def generate_imm_production_pdf(mode="full"):
-    """
-    Generate a PDF of IMM production orders.
+# Production roster: what every IMM production report starts from, in print order
+IMM_PRODUCTION_COLUMNS = "po_number, nickname, in_hand_date, firm_date, invoice_number, process, status, notes"
+IMM_PRODUCTION_WHERE = """
+    status != 'Hidden'
+    AND LOWER(status) NOT IN ('cancelled', 'archived', 'done done')
+"""
+IMM_PRODUCTION_ORDER_BY = """
+    CASE status
+        WHEN 'Inline-EMB' THEN 1
+        WHEN 'Inline-DTF' THEN 2
+        WHEN 'Inline-PAT' THEN 3
+        WHEN 'Need Sewout' THEN 4
+        WHEN 'Need Product' THEN 5
+        WHEN 'Need File' THEN 6
+        WHEN 'Need Approval' THEN 7
+        WHEN 'Complete' THEN 8
+        ELSE 9
+    END,
+    COALESCE(customer_due_date, in_hand_date) ASC
+"""
+
+IMM_PRODUCTION_HEADERS = ["PO #", "Project Name", "In Hands", "Firm", "Invoice #", "Process", "Status", "Notes"]
+
+
+def imm_mode_matches(row, mode):
+    """Python twin of the mode filter in generate_imm_production_pdf (row = production columns)."""
+    mode = (mode or "full").lower()
+    if mode not in ("emb", "dtf"):
+        return True
+    process, status = row[5], row[6]
+    return process == mode.upper() or mode in (status or "").lower()
+
+
+def _format_imm_production_row(row):
+    formatted_row = list(row)
     
-    Args:
-        mode (str): "full", "emb", or "dtf" to filter by process type
+    # Truncate project name (index 1) to prevent overflow
+    if formatted_row[1]:
+        formatted_row[1] = truncate_text(formatted_row[1], max_length=25)
     
-    Returns:
-        str: Path to the generated PDF file
-    """
-    from reportlab.lib.pagesizes import letter, landscape
-    from reportlab.platypus import SimpleDocTemplate
-    from reportlab.lib.units import inch
-    from datetime import datetime
-    import os
-    from pathlib import Path
+    # Format date (index 2) from YYYY-MM-DD to MM/DD/YYYY
+    if formatted_row[2]:
+        try:
+            formatted_row[2] = datetime.strptime(formatted_row[2], "%Y-%m-%d").strftime("%m/%d/%Y")
+        except ValueError:
+            pass  # Leave as is if invalid
+    
+    # Fix the issue with notes containing the status text
+    if formatted_row[7] and formatted_row[6]:
+        if formatted_row[7].startswith(formatted_row[6]):
+            formatted_row[7] = formatted_row[7][len(formatted_row[6]):].strip()
+        
+        # Also truncate notes if they're too long
+        formatted_row[7] = truncate_text(formatted_row[7], max_length=40)
     
-    from tobys_terminal.shared.db import get_connection
-    from tobys_terminal.shared.pdf_style import create_branded_pdf_elements, truncate_text
+    return formatted_row
+
+
+def imm_production_pdf_path(mode="full"):
+    """Where the production PDF for a mode is written today."""
     from config import PROJECT_ROOT
     
-    # Create reports directory if it doesn't exist
     REPORTS_DIR = PROJECT_ROOT / "imm_reports"
     os.makedirs(REPORTS_DIR, exist_ok=True)
-    
-    # Set up the PDF document
     today = datetime.now().strftime("%Y%m%d")
-    filename = f"IMM_Production_{mode}_{today}.pdf"
-    filepath = os.path.join(REPORTS_DIR, filename)
+    return os.path.join(REPORTS_DIR, f"IMM_Production_{mode}_{today}.pdf")
+
+
+def render_imm_production_pdf(rows, mode="full", filepath=None):
+    """
+    Render already-fetched production rows (IMM_PRODUCTION_COLUMNS order,
+    already filtered and sorted) to a production PDF. Returns the path.
+    """
+    from tobys_terminal.shared.pdf_stream import alternating_style, render_table_pdf
+    from tobys_terminal.shared.pdf_style import RL_COCONUT_CREAM, branded_table_style_cmds
     
-    doc = SimpleDocTemplate(
-        filepath,
-        pagesize=landscape(letter),
-        rightMargin=0.5*inch,
-        leftMargin=0.5*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch
+    filepath = filepath or imm_production_pdf_path(mode)
+    
+    # Set column widths (adjust as needed)
+    col_widths = [0.8*inch, 2.5*inch, 0.8*inch, 0.5*inch, 0.8*inch, 0.8*inch, 1.2*inch, 2.3*inch]
+    
+    # Branded styling, one page-sized table segment at a time
+    title = f"IMM Production – {mode.upper()} – {datetime.now().strftime('%B %d, %Y')}"
+    render_table_pdf(
+        filepath, IMM_PRODUCTION_HEADERS, (_format_imm_production_row(r) for r in rows),
+        col_widths, IMM_ROWS_PER_PAGE,
+        alternating_style(branded_table_style_cmds(True, True), RL_COCONUT_CREAM),
+        title=title, title_style=get_render_context().branded["Title"],
+        margin=0.5*inch,
     )
+    return filepath
+
+
+def generate_imm_production_pdf(mode="full"):
+    """
+    Generate a PDF of IMM production orders.
+    
+    Args:
+        mode (str): "full", "emb", or "dtf" to filter by process type
+    
+    Returns:
+        str: Path to the generated PDF file
+    """
+    from tobys_terminal.shared.pdf_stream import iter_cursor
     
     # Get the data
     conn = get_connection()
     cur = conn.cursor()
     
     # Build the query based on mode
-    query = """
-        SELECT po_number, nickname, in_hand_date, firm_date, 
-               invoice_number, process, status, notes
-        FROM imm_orders
-        WHERE status != 'Hidden'
-          AND LOWER(status) NOT IN ('cancelled', 'archived', 'done done')
-    """
+    query = f"SELECT {IMM_PRODUCTION_COLUMNS} FROM imm_orders WHERE {IMM_PRODUCTION_WHERE}"
     
     # Add filter based on mode
     if mode.lower() == "emb":
@@ -485,74 +576,20 @@ def generate_imm_production_pdf(mode="full"):
         query += " AND (process = 'DTF' OR status LIKE '%DTF%')"
     
     # Add sorting
-    query += """
-        ORDER BY
-            CASE status
-                WHEN 'Inline-EMB' THEN 1
-                WHEN 'Inline-DTF' THEN 2
-                WHEN 'Inline-PAT' THEN 3
-                WHEN 'Need Sewout' THEN 4
-                WHEN 'Need Product' THEN 5
-                WHEN 'Need File' THEN 6
-                WHEN 'Need Approval' THEN 7
-                WHEN 'Complete' THEN 8
-                ELSE 9
-            END,
-            COALESCE(customer_due_date, in_hand_date) ASC
-    """
+    query += f" ORDER BY {IMM_PRODUCTION_ORDER_BY}"
     
     cur.execute(query)
-    rows = cur.fetchall()
-    conn.close()
     
-    # Format the data
-    data = [["PO #", "Project Name", "In Hands", "Firm", "Invoice #", "Process", "Status", "Notes"]]
-    
-    for row in rows:
-        formatted_row = list(row)
-        
-        # Truncate project name (index 1) to prevent overflow
-        if formatted_row[1]:
-            formatted_row[1] = truncate_text(formatted_row[1], max_length=25)
-        
-        # Format date (index 2) from YYYY-MM-DD to MM/DD/YYYY
-        if formatted_row[2]:
-            try:
-                formatted_row[2] = datetime.strptime(formatted_row[2], "%Y-%m-%d").strftime("%m/%d/%Y")
-            except ValueError:
-                pass  # Leave as is if invalid
-        
-        # Fix the issue with notes containing the status text
-        if formatted_row[7] and formatted_row[6]:
-            if formatted_row[7].startswith(formatted_row[6]):
-                formatted_row[7] = formatted_row[7][len(formatted_row[6]):].strip()
-            
-            # Also truncate notes if they're too long
-            formatted_row[7] = truncate_text(formatted_row[7], max_length=40)
-        
-        data.append(formatted_row)
-    
-    # Set column widths (adjust as needed)
-    col_widths = [0.8*inch, 2.5*inch, 0.8*inch, 0.5*inch, 0.8*inch, 0.8*inch, 1.2*inch, 2.3*inch]
-    
-    # Create PDF elements with branded styling
-    title = f"IMM Production – {mode.upper()} – {datetime.now().strftime('%B %d, %Y')}"
-    elements, _ = create_branded_pdf_elements(title, data, col_widths)
-    
-    # Build the PDF
-    doc.build(elements)
-    
-    return filepath
-
-
-
-
-
+    # Rows are formatted as they stream off the cursor
+    try:
+        return render_imm_production_pdf(iter_cursor(cur), mode)
+    finally:
+        conn.close()
 
 
 def generate_harlestons_production_pdf():
     """Generate a PDF of the Harlestons production roster."""
-    from tobys_terminal.shared.db import get_connection
+    from tobys_terminal.shared.pdf_stream import alternating_style, iter_cursor, render_table_pdf
     
     conn = get_connection()
     cur = conn.cursor()
@@ -569,28 +606,29 @@ def generate_harlestons_production_pdf():
     """
     
     cur.execute(query)
-    rows = cur.fetchall()
-    conn.close()
     
-    # Format the data for the PDF
-    data = []
+    # Format the data for the PDF as it streams off the cursor
+    def formatted_rows():
+        for row in iter_cursor(cur):
+            formatted_row = list(row)
+            
+            # Format date if it exists
+            if row[7]:  # in_hand_date
+                try:
+                    formatted_row[7] = datetime.strptime(row[7], "%Y-%m-%d").strftime("%m/%d/%Y")
+                except ValueError:
+                    pass  # Keep as is if invalid
+            
+            # Columns are fixed-width now that pages are rendered separately,
+            # so long club names and notes wrap instead of widening the table
+            for i in (2, 9):
+                if formatted_row[i]:
+                    formatted_row[i] = Paragraph(escape(str(formatted_row[i])), HARLESTONS_CELL_STYLE)
+            
+            yield formatted_row
     
-    # Add headers
     headers = ["PO #", "Loc", "Club", "Process", "Invoice #", "PCS", "Priority", "Due Date", "Status", "Notes"]
-    data.append(headers)
-    
-    # Add rows
-    for row in rows:
-        formatted_row = list(row)
-        
-        # Format date if it exists
-        if row[7]:  # in_hand_date
-            try:
-                formatted_row[7] = datetime.strptime(row[7], "%Y-%m-%d").strftime("%m/%d/%Y")
-            except ValueError:
-                pass  # Keep as is if invalid
-        
-        data.append(formatted_row)
+    col_widths = [0.8*inch, 0.5*inch, 1.5*inch, 0.7*inch, 0.8*inch, 0.4*inch, 0.7*inch, 0.8*inch, 1.0*inch, 1.8*inch]
     
     # Create the PDF
     today = datetime.now().strftime("%Y%m%d")
@@ -599,43 +637,16 @@ def generate_harlestons_production_pdf():
     os.makedirs(export_dir, exist_ok=True)
     filepath = os.path.join(export_dir, filename)
     
-    doc = SimpleDocTemplate(filepath, pagesize=landscape(letter))
-    elements = []
-    
-    # Add title
-    styles = getSampleStyleSheet()
-    title = Paragraph(f"Harlestons Production – {datetime.now().strftime('%B %d, %Y')}", styles["Title"])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Create table
-    table = Table(data)
-    
-    # Style the table
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-    ])
-    
-    # Add alternating row colors
-    for i in range(1, len(data)):
-        if i % 2 == 0:
-            style.add('BACKGROUND', (0, i), (-1, i), colors.lightgrey)
-    
-    table.setStyle(style)
-    elements.append(table)
-    
-    # Build the PDF
-    doc.build(elements)
+    ctx = get_render_context()
+    title = f"Harlestons Production – {datetime.now().strftime('%B %d, %Y')}"
+    try:
+        render_table_pdf(
+            filepath, headers, formatted_rows(), col_widths, HARLESTONS_ROWS_PER_PAGE,
+            alternating_style(HARLESTONS_TABLE_CMDS, colors.lightgrey),
+            title=title, title_style=ctx.styles["Title"],
+            margin=inch,
+        )
+    finally:
+        conn.close()
     
     return filepath
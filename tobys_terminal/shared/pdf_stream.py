@@ -0,0 +1,258 @@
+# tobys_terminal/shared/pdf_stream.py
+"""
+Chunked table rendering for large production reports.
+
+Handing platypus one Table with every order makes ReportLab lay out the
+whole thing and then re-split the remainder page after page. Here rows are
+pulled from an iterator (usually a live cursor) a page at a time; each page
+gets its own small Table with the header repeated, is drawn straight onto
+the canvas and then dropped, so the layout working set stays the same no
+matter how many orders are on the report.
+
+Total memory is not flat: ReportLab keeps every finished page's content
+stream until save(), about 0.5 MB per 1,000 rows on the IMM roster. That is
+small next to the single-Table layout this replaced, but a report far
+larger than today's rosters would need to be written in batches and merged.
+
+Benchmark on a synthetic roster:
+
+    python -m tobys_terminal.shared.pdf_stream --orders 10000
+"""
+
+from itertools import islice
+
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas as _canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+# Rows fetched from the cursor per database round trip
+FETCH_SIZE = 500
+
+
+def iter_cursor(cursor, size=FETCH_SIZE):
+    """Yield rows from an executed cursor without fetchall()."""
+    while True:
+        batch = cursor.fetchmany(size)
+        if not batch:
+            return
+        yield from batch
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_table_pdf(filepath, header, rows, col_widths, rows_per_page, style_for_chunk,
+                     title=None, title_style=None, pagesize=landscape(letter), margin=0.5 * inch,
+                     progress=None):
+    """
+    Render a (possibly huge) table as fixed-size segments, one per page.
+
+    Args:
+        filepath: output PDF path
+        header: header row, repeated at the top of every page
+        rows: iterable of row lists; consumed lazily
+        col_widths: fixed column widths (every page must line up)
+        rows_per_page: data rows per segment
+        style_for_chunk: callable(first_row_index, row_count) -> TableStyle,
+            where first_row_index is the 0-based index of the chunk's first
+            data row in the whole report (for alternating colors)
+        title / title_style: optional title drawn on the first page
+        progress: optional callable(rows_done, pages_done) after each page
+
+    Returns:
+        (rows_rendered, pages)
+    """
+    c = _canvas.Canvas(filepath, pagesize=pagesize)
+    page_w, page_h = pagesize
+    avail_w = page_w - 2 * margin
+    top, bottom = page_h - margin, margin
+
+    done = pages = 0
+    y = top
+    if title:
+        para = Paragraph(title, title_style)
+        _w, h = para.wrapOn(c, avail_w, top - bottom)
+        para.drawOn(c, margin, y - h)
+        y -= h + title_style.spaceAfter
+
+    def new_page():
+        nonlocal pages, y
+        c.showPage()
+        pages += 1
+        y = top
+
+    for chunk in _chunks(rows, rows_per_page):
+        if done:
+            new_page()
+        table = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style_for_chunk(done, len(chunk)))
+
+        # Segments are sized to fit a page; if one still runs long (wrapped
+        # text, or the title on page one) split it and carry the rest over.
+        pending = [table]
+        while pending:
+            flow = pending.pop(0)
+            _w, h = flow.wrapOn(c, avail_w, y - bottom)
+            if h <= y - bottom:
+                flow.drawOn(c, margin, y - h)
+                y -= h
+                continue
+            parts = flow.split(avail_w, y - bottom)
+            if len(parts) > 1:
+                pending[0:0] = parts
+            elif y < top:
+                new_page()
+                pending.insert(0, flow)
+            else:
+                # Taller than a whole page and can't be split: draw it anyway
+                flow.drawOn(c, margin, bottom)
+                y = bottom
+
+        done += len(chunk)
+        if progress:
+            progress(done, pages + 1)
+
+    new_page()
+    c.save()
+    return done, pages
+
+
+def alternating_style(base_cmds, stripe_color):
+    """
+    style_for_chunk factory: base commands plus a stripe on every second
+    data row, counted across the whole report so pages line up.
+    """
+    def style_for_chunk(first_index, count):
+        style = TableStyle(list(base_cmds))
+        for i in range(count):
+            if (first_index + i) % 2 == 1:
+                style.add('BACKGROUND', (0, i + 1), (-1, i + 1), stripe_color)
+        return style
+    return style_for_chunk
+
+
+def benchmark_production_pdf(orders=10000, rows_per_page=18, filepath=None, sample_every=1000, compare=False):
+    """
+    Render a synthetic IMM-style roster with the chunked renderer and report
+    traced Python memory as it goes. Returns a dict with timings and samples.
+
+    `samples` holds (rows, pages, traced bytes, peak bytes since the previous
+    sample). The gap between the two is the layout working set, which stays
+    flat; traced bytes climb linearly (about 0.5 MB per 1,000 rows) because
+    ReportLab holds each finished page's content stream until save().
+
+    compare=True first renders the same rows the old way (one Table through
+    doc.build()) for reference; that takes minutes at 10k orders.
+    """
+    import os
+    import random
+    import tempfile
+    import time
+    import tracemalloc
+
+    from tobys_terminal.shared.pdf_style import (
+        RL_COCONUT_CREAM, branded_table_style_cmds, get_branded_styles,
+    )
+
+    rng = random.Random(42)
+    statuses = ["Inline-EMB", "Inline-DTF", "Need Sewout", "Need Product", "Need File", "Complete"]
+
+    def synthetic_rows():
+        for i in range(orders):
+            yield [
+                f"PO{100000 + i}", f"Synthetic project {rng.randint(1, 9999)}"[:25],
+                "01/15/2026", "Y" if i % 7 == 0 else "", str(50000 + i),
+                rng.choice(["EMB", "DTF", "PAT"]), rng.choice(statuses),
+                f"note {rng.randint(1, 99999)}",
+            ]
+
+    header = ["PO #", "Project Name", "In Hands", "Firm", "Invoice #", "Process", "Status", "Notes"]
+    col_widths = [0.8*inch, 2.5*inch, 0.8*inch, 0.5*inch, 0.8*inch, 0.8*inch, 1.2*inch, 2.3*inch]
+    style = alternating_style(branded_table_style_cmds(True, True), RL_COCONUT_CREAM)
+
+    if filepath is None:
+        fd, filepath = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+
+    result = {}
+    if compare:
+        # The old way: one Table with every row through doc.build()
+        from reportlab.platypus import SimpleDocTemplate
+        from tobys_terminal.shared.pdf_style import create_branded_pdf_elements
+
+        rng.seed(42)
+        data = [header] + list(synthetic_rows())
+        doc = SimpleDocTemplate(filepath, pagesize=landscape(letter), rightMargin=0.5*inch,
+                                leftMargin=0.5*inch, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        tracemalloc.start()
+        started = time.perf_counter()
+        elements, _ = create_branded_pdf_elements("IMM Production – BENCHMARK", data, col_widths)
+        doc.build(elements)
+        result["single_table_seconds"] = time.perf_counter() - started
+        result["single_table_peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del data, elements, doc
+        rng.seed(42)
+
+    samples = []
+    next_sample = [sample_every]
+
+    def progress(rows_done, pages_done):
+        if rows_done >= next_sample[0]:
+            current, peak = tracemalloc.get_traced_memory()
+            samples.append((rows_done, pages_done, current, peak))
+            tracemalloc.reset_peak()
+            next_sample[0] += sample_every
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    rendered, pages = render_table_pdf(
+        filepath, header, synthetic_rows(), col_widths, rows_per_page, style,
+        title="IMM Production – BENCHMARK", title_style=get_branded_styles()["Title"],
+        progress=progress,
+    )
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    result.update({
+        "filepath": filepath,
+        "rows": rendered,
+        "pages": pages,
+        "seconds": elapsed,
+        "bytes": os.path.getsize(filepath),
+        "samples": samples,
+    })
+    return result
+
+
+def benchmark_cli():
+    """Command-line entry point for the chunked-render benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chunked production PDF benchmark")
+    parser.add_argument("--orders", type=int, default=10000, help="Synthetic orders to render")
+    parser.add_argument("--rows-per-page", type=int, default=18)
+    parser.add_argument("--output", help="Where to write the PDF (default: a temp file)")
+    parser.add_argument("--compare", action="store_true", help="Also time the single-Table build")
+    args = parser.parse_args()
+
+    result = benchmark_production_pdf(args.orders, args.rows_per_page, args.output, compare=args.compare)
+    if args.compare:
+        print(f"single Table: {result['single_table_seconds']:.2f}s, "
+              f"peak {result['single_table_peak'] / 1e6:.2f} MB")
+    print(f"{result['rows']} orders, {result['pages']} pages in {result['seconds']:.2f}s "
+          f"({result['bytes'] / 1024:,.0f} KB) -> {result['filepath']}")
+    print(f"{'rows':>8} {'pages':>6} {'traced MB':>10} {'window peak MB':>15}")
+    for rows_done, pages_done, current, peak in result["samples"]:
+        print(f"{rows_done:>8} {pages_done:>6} {current / 1e6:>10.2f} {peak / 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    benchmark_cli()
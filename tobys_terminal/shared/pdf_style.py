@@ -1,5 +1,7 @@
 # tobys_terminal/shared/pdf_style.py
 
+import threading
+
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -28,14 +30,42 @@ RL_COCONUT_CREAM = hex_to_reportlab_color(COCONUT_CREAM)
 RL_TAN_SAND = hex_to_reportlab_color(TAN_SAND)
 RL_PALM_BARK = hex_to_reportlab_color(PALM_BARK)
 
+# Style objects are built once per process and shared by every render;
+# callers must treat them as read-only (derive a new ParagraphStyle instead).
+_style_lock = threading.RLock()  # get_branded_styles builds on get_sample_styles
+_sample_styles = None
+_branded_styles = None
+_table_style_cmds = {}
+
+
+def get_sample_styles():
+    """ReportLab's sample stylesheet, built once per process (read-only)."""
+    global _sample_styles
+    if _sample_styles is None:
+        with _style_lock:
+            if _sample_styles is None:
+                _sample_styles = getSampleStyleSheet()
+    return _sample_styles
+
+
 def get_branded_styles():
     """
     Returns a dictionary of branded paragraph styles for PDF generation.
+    The styles are built on first use and shared afterwards.
     
     Returns:
         dict: Dictionary of ParagraphStyle objects
     """
-    styles = getSampleStyleSheet()
+    global _branded_styles
+    if _branded_styles is None:
+        with _style_lock:
+            if _branded_styles is None:
+                _branded_styles = _build_branded_styles()
+    return dict(_branded_styles)
+
+
+def _build_branded_styles():
+    styles = get_sample_styles()
     
     # Create branded title style
     title_style = ParagraphStyle(
@@ -85,6 +115,19 @@ def get_branded_table_style(has_header=True, alternating_rows=True):
     Returns:
         TableStyle: A ReportLab TableStyle object with brand colors
     """
+    # The command list is built once per variant; each caller gets its own
+    # TableStyle since apply_alternating_row_colors() adds to it.
+    key = (has_header, alternating_rows)
+    if key not in _table_style_cmds:
+        _table_style_cmds[key] = branded_table_style_cmds(has_header, alternating_rows)
+    return TableStyle(list(_table_style_cmds[key]))
+
+
+def branded_table_style_cmds(has_header, alternating_rows):
+    """
+    The command list behind get_branded_table_style(), for renderers that
+    build their own TableStyle per segment (see pdf_stream.alternating_style).
+    """
     style = [
         # Grid lines
         ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
@@ -117,7 +160,7 @@ def get_branded_table_style(has_header=True, alternating_rows=True):
     if alternating_rows:
         style.append(('BACKGROUND', (0, 1), (-1, -1), colors.white))
     
-    return TableStyle(style)
+    return tuple(style)
 
 def apply_alternating_row_colors(table_style, data_rows_count):
     """
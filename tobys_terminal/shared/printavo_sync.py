@@ -20,7 +20,14 @@ from pathlib import Path
 import pandas as pd
 # Import from your project
 import config
-from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.backup import LABEL_PRE_SYNC, create_backup
+from tobys_terminal.shared.change_log import ensure_change_log
+from tobys_terminal.shared.db import ensure_payment_tracking_table, get_connection
+from tobys_terminal.shared.maintenance import TRIGGER_SYNC, run_maintenance
+from tobys_terminal.shared.payment_audit import run_payment_audit
+from tobys_terminal.shared.payment_integrity import invalidate_integrity_cache
+from tobys_terminal.shared import read_replica
+from tobys_terminal.shared.roster_search import ensure_roster_search_indexes
 from config import PROJECT_ROOT
 # Import status filters from config
 try:
@@ -175,11 +182,12 @@ def create_tables():
     conn = get_connection()
     cur = conn.cursor()
     
-    # Check if customer_due_date column exists in imm_orders
+    # Check if customer_due_date column exists in imm_orders (the CREATE
+    # TABLEs below already include it on a fresh database)
     cur.execute("PRAGMA table_info(imm_orders)")
     columns = [row[1] for row in cur.fetchall()]
     
-    if "customer_due_date" not in columns:
+    if columns and "customer_due_date" not in columns:
         log("Adding customer_due_date column to imm_orders table")
         cur.execute("ALTER TABLE imm_orders ADD COLUMN customer_due_date TEXT")
     
@@ -187,7 +195,7 @@ def create_tables():
     cur.execute("PRAGMA table_info(harlestons_orders)")
     columns = [row[1] for row in cur.fetchall()]
     
-    if "customer_due_date" not in columns:
+    if columns and "customer_due_date" not in columns:
         log("Adding customer_due_date column to harlestons_orders table")
         cur.execute("ALTER TABLE harlestons_orders ADD COLUMN customer_due_date TEXT")
     
@@ -221,6 +229,10 @@ def create_tables():
         print("Adding customer_due_date column to invoices table")
         cur.execute("ALTER TABLE invoices ADD COLUMN customer_due_date TEXT")
         conn.commit()
+    if "nickname" not in columns:
+        print("Adding nickname column to invoices table")
+        cur.execute("ALTER TABLE invoices ADD COLUMN nickname TEXT")
+        conn.commit()
 
 
     cur.execute("""
@@ -239,10 +251,28 @@ def create_tables():
     )
     """)
     
+    create_payments_clean_table(cur)
+    
     conn.commit()
     conn.close()
     log("Tables created/checked successfully.")
 
+
+def create_payments_clean_table(cur):
+    """payments_clean (the imported Printavo payments) and its invoice index."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS payments_clean (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_date TEXT,
+        amount REAL,
+        invoice_number TEXT,
+        payment_method TEXT,
+        reference TEXT,
+        customer_id INTEGER
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payments_invoice_number ON payments_clean (invoice_number);")
+
 def import_master_orders_from_csv(csv_path):
     """
     Imports the master orders.csv file into the 'invoices' table.
@@ -351,23 +381,10 @@ def import_payments_from_csv(csv_path):
     duplicates = 0
 
     # Create payments_clean table if it doesn't exist
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS payments_clean (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        transaction_date TEXT,
-        amount REAL,
-        invoice_number TEXT,
-        payment_method TEXT,
-        reference TEXT,
-        customer_id INTEGER
-    )
-    """)
-    
-    # Create index for faster lookups
     try:
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_payments_invoice_number ON payments_clean (invoice_number);")
+        create_payments_clean_table(cur)
     except sqlite3.OperationalError as e:
-        log(f"Could not create index, it might already exist: {e}")
+        log(f"Could not create payments_clean or its index: {e}")
 
     for index, row in df.iterrows():
         try:
@@ -455,9 +472,12 @@ def import_customers_from_csv(csv_path):
             if customer_id == 0:
                 skipped += 1
                 continue
-                
+
+            # Upsert rather than INSERT OR REPLACE: a REPLACE deletes and
+            # re-inserts the row, so every unchanged customer would land in
+            # the change log as a new insert on every sync.
             cur.execute("""
-                INSERT OR REPLACE INTO customers (
+                INSERT INTO customers (
                     id, first_name, last_name, company, email, phone,
                     billing_address1, billing_address2, billing_city, billing_state,
                     billing_zip, billing_country,
@@ -466,6 +486,19 @@ def import_customers_from_csv(csv_path):
                     tax_exempt, tax_resale_no, created_at,
                     default_payment_term, default_payment_term_days
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    first_name = excluded.first_name, last_name = excluded.last_name,
+                    company = excluded.company, email = excluded.email, phone = excluded.phone,
+                    billing_address1 = excluded.billing_address1, billing_address2 = excluded.billing_address2,
+                    billing_city = excluded.billing_city, billing_state = excluded.billing_state,
+                    billing_zip = excluded.billing_zip, billing_country = excluded.billing_country,
+                    shipping_address1 = excluded.shipping_address1, shipping_address2 = excluded.shipping_address2,
+                    shipping_city = excluded.shipping_city, shipping_state = excluded.shipping_state,
+                    shipping_zip = excluded.shipping_zip, shipping_country = excluded.shipping_country,
+                    tax_exempt = excluded.tax_exempt, tax_resale_no = excluded.tax_resale_no,
+                    created_at = excluded.created_at,
+                    default_payment_term = excluded.default_payment_term,
+                    default_payment_term_days = excluded.default_payment_term_days
             """, (
                 customer_id,
                 str(row.get("First Name", "")).strip(),
@@ -848,6 +881,20 @@ def clean_duplicates():
 def sync_all():
     """Run all synchronization processes in the correct order."""
     log("=== Starting full Printavo synchronization ===")
+
+    # STEP 0: Snapshot the database; the steps below overwrite and delete rows
+    try:
+        snapshot = create_backup(LABEL_PRE_SYNC)
+        log(f"Pre-sync snapshot saved: {snapshot['file']}")
+    except Exception as e:
+        log(f"⚠️ Pre-sync snapshot failed, continuing without one: {e}")
+
+    # Bring payment_tracking to its current layout before the change log
+    # puts its triggers on it
+    ensure_payment_tracking_table()
+
+    # Make sure the imports below are recorded in the change log
+    ensure_change_log()
     
     # STEP 1A: Import customers
     customers_csv_path = CSV_DIR / "customers.csv"
@@ -876,6 +923,7 @@ def sync_all():
         
     # Check and create tables if needed
     create_tables()
+    ensure_roster_search_indexes()
     
     # Check database structure (optional, good for diagnostics)
     check_database()
@@ -901,6 +949,33 @@ def sync_all():
     
     # STEP 7: Backfill any missing customer due dates
     backfill_customer_due_dates()
+
+    # Invoices/payments changed underneath any cached integrity scans
+    invalidate_integrity_cache()
+
+    # STEP 8: Re-run the payment integrity audit against the fresh data
+    try:
+        audit = run_payment_audit()
+        log(f"Payment audit: {audit['open']} open discrepancies "
+            f"({audit['new']} new, {audit['resolved']} resolved)")
+    except Exception as e:
+        log(f"⚠️ Payment audit failed: {e}")
+
+    # STEP 9: Refresh planner statistics and reclaim the space the rewrites left behind
+    try:
+        for step in run_maintenance(TRIGGER_SYNC):
+            log(f"Maintenance {step['operation']}: {step['status']} in {step['duration_ms']:,.0f} ms"
+                + (f" ({step['error']})" if step["error"] else ""))
+    except Exception as e:
+        log(f"⚠️ Post-sync maintenance failed: {e}")
+
+    # STEP 10: Give the portal a fresh read-only copy of the synced data
+    if read_replica.READ_REPLICA:
+        try:
+            pointer = read_replica.publish_replica()
+            log(f"Published read replica {pointer['file']} in {pointer['duration_ms']:,.0f} ms")
+        except Exception as e:
+            log(f"⚠️ Read replica publish failed: {e}")
     
     log("=== Printavo synchronization complete ===")
     return imm_success and harlestons_success
@@ -0,0 +1,479 @@
+# tobys_terminal/shared/query_plans.py
+"""
+EXPLAIN QUERY PLAN regression check for the hot queries.
+
+Indexes are added by hand (ensure_indexes(), the reconciliation and roster
+indexes) and an innocent-looking TRIM() or LOWER() in a query is enough to
+stop SQLite from using them. Each entry in HOT_QUERIES calls the real code
+path (StatementCalculator.fetch, get_ar_summary, the roster pages, ...)
+against a throwaway database; every statement it runs is captured and
+explained. A table, subquery or CTE the plan scans, or an automatic index
+SQLite builds for the query, fails the check unless the entry allows it and
+says why.
+
+The throwaway database is built by the app's own setup code
+(create_schema()). Given an existing database, its schema and planner
+statistics are copied first and the same setup code migrates the copy, so
+an old terminal.db is checked the way it will look after start-up.
+
+    python -m tobys_terminal.shared.query_plans                  # schema from code
+    python -m tobys_terminal.shared.query_plans --db terminal.db --verbose
+
+The same check runs under pytest (desktop/tests/test_query_plans.py).
+Exit status: 0 all plans OK, 1 a hot query scans, 2 no database to check.
+When a hot query is added or changed, add or update its entry here.
+"""
+
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import date
+
+from tobys_terminal.shared.db import get_connection, use_database
+from tobys_terminal.shared.query_profiler import capture_statements
+
+# Sample rows seed_plan_db() adds, and the arguments the entries pass
+_CUSTOMER_ID = 101
+_COMPANY = "Harlestons"
+_STATEMENT = "S00042"
+_INVOICES = ["1001", "1002", "1003"]
+_DAY = date(2025, 9, 8)
+
+
+def _statement_fetch():
+    from tobys_terminal.shared.statement_logic import StatementCalculator
+    StatementCalculator(customer_ids=[_CUSTOMER_ID]).fetch()
+
+
+def _reconcile_fetch():
+    from tobys_terminal.shared.statement_logic import StatementCalculator
+    StatementCalculator(start_date=_DAY, end_date=_DAY).fetch()
+
+
+def _find_payments():
+    from tobys_terminal.shared.reconciliation import find_payments
+    find_payments(start_date=_DAY, end_date=_DAY, unreconciled_only=True)
+
+
+def _statement_summaries():
+    from tobys_terminal.shared.statement_logic import get_statement_summaries
+    get_statement_summaries([_CUSTOMER_ID])
+
+
+def _customer_ids_by_company():
+    from tobys_terminal.shared.statement_logic import get_customer_ids_by_company
+    get_customer_ids_by_company(_COMPANY)
+
+
+def _statement_meta():
+    from tobys_terminal.shared.db import get_statement_meta
+    get_statement_meta(_STATEMENT)
+
+
+def _statement_invoices():
+    from tobys_terminal.shared.db import get_statement_invoices
+    get_statement_invoices(_STATEMENT)
+
+
+def _invoices_on_statements():
+    from tobys_terminal.shared.statement_logic import check_invoices_on_statements
+    check_invoices_on_statements(_INVOICES)
+
+
+def _statements_by_label():
+    from tobys_terminal.shared.statement_logic import get_statements_by_label
+    get_statements_by_label(_COMPANY)
+
+
+def _ar_summary():
+    from tobys_terminal.shared.invoice_logic import get_ar_summary
+    get_ar_summary()
+
+
+def _terminal_filters():
+    from tobys_terminal.shared.printavo_sync import update_terminal_filters
+    update_terminal_filters()
+
+
+def _roster_page(table):
+    from tobys_terminal.shared.roster_pages import encode_cursor, fetch_roster_page
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        # A follow-on page, so the keyset seek is part of the plan
+        fetch_roster_page(conn, table, after=encode_cursor((2, "2025-01-01", 10)))
+    finally:
+        conn.close()
+
+
+def _bulk_export(dataset, start_date=None, end_date=None, customer_ids=None):
+    from tobys_terminal.shared.bulk_export import iter_export_chunks
+    for _chunk in iter_export_chunks(dataset, start_date, end_date, customer_ids):
+        pass
+
+
+# Each entry:
+#   name, source: what the code path is and where it runs
+#   run: callable that runs the real code (against the plan database)
+#   allow: {table/alias: reason} the plan may scan or auto-index (plans can
+#       depend on the copied statistics, so an allowance need not be used)
+#   ordered: the ORDER BY must come from an index, not a temp B-tree
+HOT_QUERIES = [
+    {
+        "name": "statement_fetch",
+        "source": "statement_logic.StatementCalculator.fetch (statement mode), invoice_logic, reprint",
+        "run": _statement_fetch,
+    },
+    {
+        "name": "reconcile_day_payments",
+        "source": "statement_logic.StatementCalculator.fetch (reconcile mode)",
+        "run": _reconcile_fetch,
+    },
+    {
+        "name": "find_payments",
+        "source": "reconciliation.find_payments (reconcile view, bank CSV matching)",
+        "run": _find_payments,
+    },
+    {
+        "name": "statement_summaries",
+        "source": "statement_logic.get_statement_summaries, statement_register_view",
+        "run": _statement_summaries,
+        "allow": {
+            "s": "combined statements are found by LIKE on customer_ids_text; one row per statement",
+        },
+    },
+    {
+        "name": "customer_ids_by_company",
+        "source": "statement_logic.get_customer_ids_by_company (every portal page)",
+        "run": _customer_ids_by_company,
+    },
+    {
+        "name": "statement_header",
+        "source": "db.get_statement_meta",
+        "run": _statement_meta,
+    },
+    {
+        "name": "statement_invoices",
+        "source": "db.get_statement_invoices",
+        "run": _statement_invoices,
+    },
+    {
+        "name": "invoices_on_statements",
+        "source": "statement_logic.check_invoices_on_statements",
+        "run": _invoices_on_statements,
+    },
+    {
+        "name": "statement_history_by_label",
+        "source": "statement_logic.get_statements_by_label (statement_history_view)",
+        "run": _statements_by_label,
+    },
+    {
+        "name": "ar_billable_invoices",
+        "source": "invoice_logic.get_ar_summary (ar_view)",
+        "run": _ar_summary,
+        "allow": {
+            "c": "with real statistics SQLite may walk customers and look up each one's "
+                 "invoices by customer_id; A/R reads most billable invoices either way",
+        },
+    },
+    {
+        "name": "terminal_filters",
+        "source": "printavo_sync.update_terminal_filters",
+        "run": _terminal_filters,
+    },
+    {
+        "name": "imm_terminal_page",
+        "source": "roster_pages.fetch_roster_page (web IMM terminal)",
+        "run": lambda: _roster_page("imm_orders"),
+        "ordered": True,
+    },
+    {
+        "name": "harlestons_terminal_page",
+        "source": "roster_pages.fetch_roster_page (web Harlestons terminal)",
+        "run": lambda: _roster_page("harlestons_orders"),
+        "ordered": True,
+    },
+    {
+        "name": "bulk_export_invoices_for_company",
+        "source": "bulk_export.iter_export_chunks('invoices')",
+        "run": lambda: _bulk_export("invoices", customer_ids=[_CUSTOMER_ID]),
+    },
+    {
+        "name": "bulk_export_payments_for_year",
+        "source": "bulk_export.iter_export_chunks('payments')",
+        "run": lambda: _bulk_export("payments", "2025-01-01", "2025-12-31"),
+    },
+]
+
+
+# ---------- plan database ----------
+
+def create_schema():
+    """
+    Create, or bring up to date, every table, index and trigger the hot
+    paths use, in the database get_connection() opens. This is the setup
+    desktop start-up and sync_all run, in the same order.
+    """
+    from tobys_terminal.shared.change_log import ensure_change_log
+    from tobys_terminal.shared.customer_search import ensure_customer_search_index
+    from tobys_terminal.shared.db import (
+        ensure_indexes, ensure_payment_tracking_table, ensure_statement_tables,
+        ensure_views, initialize_db,
+    )
+    from tobys_terminal.shared.printavo_sync import create_tables
+    from tobys_terminal.shared.reconciliation import ensure_reconciliation_indexes
+    from tobys_terminal.shared.roster_edits import ensure_roster_versioning
+    from tobys_terminal.shared.roster_pages import ROSTERS, ensure_roster_sort_index
+    from tobys_terminal.shared.roster_search import ensure_roster_search_indexes
+
+    initialize_db()
+    ensure_views()
+    ensure_statement_tables()
+    create_tables()
+    ensure_payment_tracking_table()
+    ensure_indexes()
+    ensure_customer_search_index()
+    ensure_reconciliation_indexes()
+    ensure_roster_search_indexes()
+    conn = get_connection()
+    try:
+        for table in ROSTERS:
+            ensure_roster_sort_index(conn, table)
+            ensure_roster_versioning(conn, table)
+    finally:
+        conn.close()
+    ensure_change_log()
+
+
+def copy_schema(source_conn, dest_conn):
+    """Create source_conn's tables, indexes, views and triggers (no rows) in dest_conn."""
+    objects = source_conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 WHEN 'view' THEN 2 ELSE 3 END, rowid
+    """).fetchall()
+    for obj_type, name, sql in objects:
+        try:
+            dest_conn.execute(sql)
+        except sqlite3.Error as e:
+            # FTS shadow tables already exist once their virtual table does
+            if "already exists" not in str(e):
+                print(f"⚠️ Skipped {obj_type} {name}: {e}")
+    dest_conn.commit()
+
+
+def _copy_statistics(source_conn, dest_conn):
+    """Planner statistics from source_conn, when it has been ANALYZEd."""
+    has_stats = source_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    ).fetchone()
+    if not has_stats:
+        return False
+    dest_conn.execute("ANALYZE")
+    dest_conn.execute("DELETE FROM sqlite_stat1")
+    dest_conn.executemany(
+        "INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)",
+        source_conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1").fetchall(),
+    )
+    dest_conn.commit()
+    return True
+
+
+def seed_plan_db(conn):
+    """
+    A few rows so every hot path runs all of its statements (fetch only
+    looks up payments for the invoices it found). Too few to matter to the
+    planner, which goes by copied statistics when there are any.
+    """
+    conn.execute(
+        "INSERT INTO customers (id, first_name, last_name, company) VALUES (?, 'Pat', 'Buyer', ?)",
+        (_CUSTOMER_ID, _COMPANY),
+    )
+    conn.executemany("""
+        INSERT INTO invoices (invoice_number, customer_id, invoice_date, total, paid, invoice_status)
+        VALUES (?, ?, ?, 100.0, 'No', 'Done Done')
+    """, [(number, _CUSTOMER_ID, str(_DAY)) for number in _INVOICES])
+    conn.execute("""
+        INSERT INTO payments_clean (transaction_date, amount, invoice_number, payment_method, reference, customer_id)
+        VALUES (?, 100.0, ?, 'Check', 'CHK-1', ?)
+    """, (str(_DAY), _INVOICES[0], _CUSTOMER_ID))
+    conn.execute("""
+        INSERT INTO statement_tracking (statement_number, customer_id, generated_on, start_date, end_date,
+                                        company_label, customer_ids_text)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (_STATEMENT, _CUSTOMER_ID, str(_DAY), "2025-08-01", "2025-08-31", _COMPANY, str(_CUSTOMER_ID)))
+    conn.executemany(
+        "INSERT INTO invoice_tracking (invoice_number, statement_number, tagged_on) VALUES (?, ?, ?)",
+        [(number, _STATEMENT, str(_DAY)) for number in _INVOICES],
+    )
+    conn.commit()
+
+
+def build_plan_db(db_path, source_conn=None):
+    """
+    Create db_path for the plan check: source_conn's schema and statistics
+    (no rows) when given, brought up to date by create_schema(), plus the
+    sample rows.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        has_stats = False
+        if source_conn is not None:
+            copy_schema(source_conn, conn)
+            has_stats = _copy_statistics(source_conn, conn)
+        conn.close()
+
+        with use_database(db_path):
+            create_schema()
+
+        conn = sqlite3.connect(db_path)
+        seed_plan_db(conn)
+        if has_stats:
+            conn.execute("ANALYZE sqlite_master")  # reload the copied statistics
+    finally:
+        conn.close()
+
+
+# ---------- checking ----------
+
+_TARGET_RE = re.compile(r"^(SCAN|SEARCH) (\S+)")
+_CHECKED_STATEMENTS = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE")
+# The schema catalog is read by the ensure_* helpers; it is always small
+_CATALOG = {"sqlite_master", "sqlite_schema", "sqlite_temp_master"}
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN detail lines for one statement."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, tuple(params))]
+
+
+def plan_problems(details, allow=None, ordered=False):
+    """
+    Reasons a plan fails (empty list = OK): every scan and every automatic
+    index, unless `allow` names its table/alias.
+    """
+    allow = allow or {}
+    problems = []
+    for line in details:
+        m = _TARGET_RE.match(line)
+        if not m:
+            continue
+        kind, target = m.groups()
+        if target in allow or target in _CATALOG or line == "SCAN CONSTANT ROW":
+            continue
+        if "AUTOMATIC" in line:
+            problems.append(f"{line} (throwaway index built per query)")
+        elif kind == "SCAN":
+            problems.append(f"{line} (full scan, expected an index search)")
+    if ordered and any("TEMP B-TREE FOR ORDER BY" in d for d in details):
+        problems.append("ORDER BY sorts in a temp B-tree instead of walking an index")
+    return problems
+
+
+def capture_hot_statements(entry, db_path):
+    """Run one entry's code against db_path; the statements it ran, as executed."""
+    with use_database(db_path), capture_statements() as statements:
+        entry["run"]()
+    return [sql for sql in statements if sql.lstrip().upper().startswith(_CHECKED_STATEMENTS)]
+
+
+def check_query_plans(conn=None, queries=None, live=False):
+    """
+    Run every hot query against a plan database and explain what it ran.
+
+    Args:
+        conn: database whose schema (and statistics) to start from; None
+            builds the schema from code alone
+        live: explain against conn itself, as its indexes are right now,
+            instead of against the plan database
+
+    Returns:
+        list of dicts: name, source, statements (SQL as run, parameters
+        bound), plan (detail lines), problems
+    """
+    work_dir = tempfile.mkdtemp(prefix="query_plans_")
+    plan_path = os.path.join(work_dir, "plans.db")
+    results = []
+    try:
+        build_plan_db(plan_path, conn)
+        target = conn if live else sqlite3.connect(plan_path)
+        try:
+            for entry in queries or HOT_QUERIES:
+                results.append(_check_entry(entry, plan_path, target))
+        finally:
+            if not live:
+                target.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _check_entry(entry, plan_path, target):
+    allow = entry.get("allow", {})
+    result = {"name": entry["name"], "source": entry["source"],
+              "statements": [], "plan": [], "problems": []}
+    try:
+        result["statements"] = capture_hot_statements(entry, plan_path)
+    except Exception as e:
+        result["problems"].append(f"could not run: {e}")
+        return result
+    if not result["statements"]:
+        result["problems"].append("ran no queries")
+
+    for sql in result["statements"]:
+        try:
+            details = explain(target, sql)
+        except sqlite3.Error as e:
+            result["problems"].append(f"could not explain: {e}")
+            continue
+        result["plan"].extend(details)
+        result["problems"].extend(plan_problems(details, allow, entry.get("ordered", False)))
+    return result
+
+
+def query_plans_cli():
+    """Command-line entry point; exit status 1 when any hot query regresses."""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check the hot queries' plans for full table scans")
+    parser.add_argument("--db", help="Start from this database's schema and statistics "
+                                     "(default: the schema the app's setup code creates)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print every plan, not just failures")
+    args = parser.parse_args()
+
+    conn = None
+    if args.db:
+        try:
+            conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+            conn.execute("SELECT 1 FROM sqlite_master").fetchone()
+        except sqlite3.Error as e:
+            print(f"❌ No database to check: {e}")
+            sys.exit(2)
+
+    try:
+        results = check_query_plans(conn)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    failed = [r for r in results if r["problems"]]
+    for r in results:
+        if not r["problems"] and not args.verbose:
+            continue
+        print(f"{'❌' if r['problems'] else '✅'} {r['name']}  ({r['source']})")
+        for line in r["plan"]:
+            print(f"      {line}")
+        for problem in r["problems"]:
+            print(f"    → {problem}")
+    print(f"{len(results) - len(failed)}/{len(results)} hot queries use their indexes")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    query_plans_cli()
@@ -0,0 +1,550 @@
+# tobys_terminal/shared/query_profiler.py
+"""
+Query profiler and slow-query log.
+
+When QUERY_PROFILING is on (config.py or the QUERY_PROFILING=1 environment
+variable), get_connection() and the web's get_db_connection() hand out
+connections whose cursors time every statement: SQL fingerprint (literals
+and IN-lists folded), duration including fetches, rows returned and the
+call site that ran it.
+
+- Per (fingerprint, call site) totals are kept in memory and flushed to the
+  `query_stats` table every few seconds by a background thread.
+- Statements slower than SLOW_QUERY_MS go to an in-memory ring buffer and to
+  `query_log`.
+- The same statement run from the same line many times in a burst (the N+1
+  pattern: a query inside a loop) is counted and logged as kind 'n+1'.
+
+Off by default; when off, connect() is plain sqlite3.connect().
+
+    python -m tobys_terminal.shared.query_profiler --top 20 --by total
+    python -m tobys_terminal.shared.query_profiler --top 20 --by n1
+    python -m tobys_terminal.shared.query_profiler --slow 50
+"""
+
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Profiling settings (overridable from config.py)
+QUERY_PROFILING = os.environ.get("QUERY_PROFILING", "0") == "1"
+SLOW_QUERY_MS = 100
+QUERY_LOG_RING_SIZE = 500
+QUERY_LOG_KEEP = 10000          # rows kept in query_log
+QUERY_FLUSH_SECONDS = 10
+N_PLUS_ONE_CALLS = 20           # same query + call site this many times...
+N_PLUS_ONE_WINDOW = 2.0         # ...within this many seconds is an N+1 burst
+
+try:
+    from config import QUERY_PROFILING  # noqa: F811
+except ImportError:
+    pass
+try:
+    from config import SLOW_QUERY_MS, QUERY_LOG_RING_SIZE  # noqa: F811
+except ImportError:
+    pass
+
+_enabled = QUERY_PROFILING
+_lock = threading.Lock()
+_slow_ring = deque(maxlen=QUERY_LOG_RING_SIZE)
+_live_stats = {}        # (fingerprint, site) -> dict, since process start
+_pending_stats = {}     # db_path -> {(fingerprint, site): dict} not yet flushed
+_pending_log = {}       # db_path -> [log rows] not yet flushed
+_recent_calls = {}      # (fingerprint, site) -> deque of timestamps
+_finalized = deque()    # stats of cursors garbage-collected before they were drained
+_capture = threading.local()    # .statements: list filled by capture_statements()
+_flusher = None
+
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+
+
+# ---------- fingerprints / call sites ----------
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """SQL with comments dropped, literals as ?, IN-lists folded, whitespace collapsed."""
+    sql = _COMMENT_RE.sub(" ", sql or "")
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?+)", sql)
+    return _SPACE_RE.sub(" ", sql).strip().lower()
+
+
+def fingerprint(sql):
+    """Short stable id for a normalized statement."""
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()[:12]
+
+
+def _call_site():
+    """file:line function of the first frame outside this module."""
+    frame = sys._getframe(2)
+    while frame and os.path.normcase(os.path.abspath(frame.f_code.co_filename)) == _THIS_FILE:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    path = frame.f_code.co_filename.replace("\\", "/")
+    marker = path.rfind("tobys_terminal/")
+    short = path[marker + len("tobys_terminal/"):] if marker >= 0 else os.path.basename(path)
+    return f"{short}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+# ---------- recording ----------
+
+def _record(db_path, sql, site, elapsed, rows):
+    _record_one(db_path, sql, site, elapsed, rows)
+    _record_finalized()
+    _start_flusher()
+
+
+def _record_finalized():
+    """Record the stats cursor finalizers left behind (they can't take _lock themselves)."""
+    while _finalized:
+        try:
+            stat = _finalized.popleft()
+        except IndexError:
+            break
+        _record_one(*stat)
+
+
+def _record_one(db_path, sql, site, elapsed, rows):
+    fp = fingerprint(sql)
+    ms = elapsed * 1000.0
+    now = time.time()
+    key = (fp, site)
+    logged_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with _lock:
+        for bucket in (_live_stats, _pending_stats.setdefault(db_path, {})):
+            s = bucket.get(key)
+            if s is None:
+                s = bucket[key] = {"sql": normalize_sql(sql), "calls": 0, "total_ms": 0.0,
+                                   "max_ms": 0.0, "rows": 0, "n_plus_one": 0}
+            s["calls"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+            s["rows"] += rows
+
+        log = _pending_log.setdefault(db_path, [])
+        if ms >= SLOW_QUERY_MS:
+            entry = (logged_at, fp, normalize_sql(sql), round(ms, 3), rows, site, "slow")
+            _slow_ring.append(entry)
+            log.append(entry)
+
+        calls = _recent_calls.get(key)
+        if calls is None:
+            calls = _recent_calls[key] = deque(maxlen=N_PLUS_ONE_CALLS)
+        calls.append(now)
+        if len(calls) == N_PLUS_ONE_CALLS and calls[-1] - calls[0] <= N_PLUS_ONE_WINDOW:
+            calls.clear()
+            _live_stats[key]["n_plus_one"] += 1
+            _pending_stats[db_path][key]["n_plus_one"] += 1
+            log.append((logged_at, fp, normalize_sql(sql), round(ms, 3), rows, site, "n+1"))
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute() until it is drained."""
+
+    _stat = None
+
+    def _finish(self):
+        stat, self._stat = self._stat, None
+        if stat is not None:
+            _record(stat[0], stat[1], stat[2], stat[3], stat[4])
+
+    def _run(self, method, sql, args):
+        self._finish()
+        site = _call_site()
+        started = time.perf_counter()
+        try:
+            result = method(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+        db_path = getattr(self.connection, "db_path", "")
+        if self.description is None:
+            # DML / DDL: nothing to fetch, done now
+            _record(db_path, sql, site, elapsed, max(self.rowcount, 0))
+        else:
+            self._stat = [db_path, sql, site, elapsed, 0]
+        return result
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, (parameters,))
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, (seq_of_parameters,))
+
+    def executescript(self, sql_script):
+        return self._run(super().executescript, sql_script, ())
+
+    def _fetched(self, started, count, exhausted):
+        if self._stat is not None:
+            self._stat[3] += time.perf_counter() - started
+            self._stat[4] += count
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # The garbage collector can run this while this thread holds _lock
+        # inside _record, so only queue the stat; the next record or flush
+        # writes it down
+        stat, self._stat = self._stat, None
+        if stat is not None:
+            _finalized.append(stat)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are profiled."""
+
+    db_path = ""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfilingCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(db_path, stats_path=None, **kwargs):
+    """
+    sqlite3.connect(), profiled when profiling is enabled.
+
+    stats_path is the database its statements are flushed to (default
+    db_path); read-only connections pass the writable database they mirror.
+    """
+    if not _enabled:
+        conn = sqlite3.connect(db_path, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, factory=ProfilingConnection, **kwargs)
+        conn.db_path = str(stats_path or db_path)
+    statements = getattr(_capture, "statements", None)
+    if statements is not None:
+        conn.set_trace_callback(statements.append)
+    return conn
+
+
+@contextmanager
+def capture_statements():
+    """
+    Collect the SQL of every statement run on connections connect() opens
+    in this thread while this is active, parameters already bound.
+    query_plans uses it to EXPLAIN what the real code runs rather than a
+    copy of its SQL.
+    """
+    previous = getattr(_capture, "statements", None)
+    statements = []
+    _capture.statements = statements
+    try:
+        yield statements
+    finally:
+        _capture.statements = previous
+
+
+def profiling_enabled():
+    return _enabled
+
+
+def enable_profiling(enabled=True):
+    """Turn profiling on/off for connections opened from now on."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+# ---------- persistence ----------
+
+def ensure_query_log_tables(conn):
+    """Create query_log and query_stats."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            logged_at TEXT,
+            fingerprint TEXT,
+            sql TEXT,
+            duration_ms REAL,
+            rows INTEGER,
+            call_site TEXT,
+            kind TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_stats (
+            fingerprint TEXT NOT NULL,
+            call_site TEXT NOT NULL,
+            sql TEXT,
+            calls INTEGER NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0,
+            max_ms REAL NOT NULL DEFAULT 0,
+            rows INTEGER NOT NULL DEFAULT 0,
+            n_plus_one INTEGER NOT NULL DEFAULT 0,
+            last_seen TEXT,
+            PRIMARY KEY (fingerprint, call_site)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_query_log_fingerprint ON query_log(fingerprint)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_query_log_kind_time ON query_log(kind, logged_at)")
+    conn.commit()
+
+
+def flush_query_log():
+    """Write pending stats and log entries to each database. Returns rows written."""
+    _record_finalized()
+    with _lock:
+        stats = dict(_pending_stats)
+        logs = dict(_pending_log)
+        _pending_stats.clear()
+        _pending_log.clear()
+
+    written = 0
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for db_path in set(stats) | set(logs):
+        if not db_path:
+            continue
+        db_stats = stats.get(db_path, {})
+        db_log = logs.get(db_path, [])
+        try:
+            # A plain connection, so the flush itself isn't profiled
+            conn = sqlite3.connect(db_path, timeout=5)
+            try:
+                ensure_query_log_tables(conn)
+                conn.executemany("""
+                    INSERT INTO query_stats (fingerprint, call_site, sql, calls, total_ms, max_ms, rows, n_plus_one, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(fingerprint, call_site) DO UPDATE SET
+                        calls = calls + excluded.calls,
+                        total_ms = total_ms + excluded.total_ms,
+                        max_ms = MAX(max_ms, excluded.max_ms),
+                        rows = rows + excluded.rows,
+                        n_plus_one = n_plus_one + excluded.n_plus_one,
+                        last_seen = excluded.last_seen
+                """, [(fp, site, s["sql"], s["calls"], s["total_ms"], s["max_ms"], s["rows"], s["n_plus_one"], now)
+                      for (fp, site), s in db_stats.items()])
+                conn.executemany("""
+                    INSERT INTO query_log (logged_at, fingerprint, sql, duration_ms, rows, call_site, kind)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, db_log)
+                conn.execute("DELETE FROM query_log WHERE id <= (SELECT MAX(id) FROM query_log) - ?", (QUERY_LOG_KEEP,))
+                conn.commit()
+                written += len(db_stats) + len(db_log)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Busy database: put everything back and try again next time
+            print(f"⚠️ Could not flush query log to {db_path}: {e}")
+            with _lock:
+                _merge_back(db_path, db_stats, db_log)
+    return written
+
+
+def _merge_back(db_path, db_stats, db_log):
+    pending = _pending_stats.setdefault(db_path, {})
+    for key, s in db_stats.items():
+        cur = pending.get(key)
+        if cur is None:
+            pending[key] = s
+        else:
+            cur["calls"] += s["calls"]
+            cur["total_ms"] += s["total_ms"]
+            cur["max_ms"] = max(cur["max_ms"], s["max_ms"])
+            cur["rows"] += s["rows"]
+            cur["n_plus_one"] += s["n_plus_one"]
+    _pending_log.setdefault(db_path, [])[:0] = db_log
+
+
+def _flush_loop():
+    while True:
+        time.sleep(QUERY_FLUSH_SECONDS)
+        try:
+            flush_query_log()
+        except Exception as e:
+            print(f"⚠️ Query log flush failed: {e}")
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name="query-log-flush", daemon=True)
+                _flusher.start()
+                atexit.register(flush_query_log)
+
+
+# ---------- reports ----------
+
+def get_slow_queries(limit=50):
+    """Most recent slow queries from this process's ring buffer, newest first."""
+    with _lock:
+        entries = list(_slow_ring)[-limit:]
+    keys = ("logged_at", "fingerprint", "sql", "duration_ms", "rows", "call_site", "kind")
+    return [dict(zip(keys, e)) for e in reversed(entries)]
+
+
+def get_live_stats(by="total", limit=20):
+    """Top (fingerprint, call site) pairs for this process since it started."""
+    with _lock:
+        items = [dict(fingerprint=fp, call_site=site, **s) for (fp, site), s in _live_stats.items()]
+    return _rank(items, by)[:limit]
+
+
+def _rank(items, by):
+    if by in ("n1", "n_plus_one"):
+        items = [i for i in items if i["n_plus_one"]]
+        return sorted(items, key=lambda i: (i["n_plus_one"], i["calls"]), reverse=True)
+    return sorted(items, key=lambda i: i["total_ms"], reverse=True)
+
+
+def top_queries(by="total", limit=20, conn=None):
+    """
+    Top statements from query_stats (all processes that flushed to this DB).
+
+    Args:
+        by: "total" (total time) or "n1" (N+1 bursts)
+    """
+    own_conn = conn is None
+    if own_conn:
+        from tobys_terminal.shared.db import get_connection
+        conn = get_connection()
+    ensure_query_log_tables(conn)
+    order = "n_plus_one DESC, calls DESC" if by in ("n1", "n_plus_one") else "total_ms DESC"
+    where = "WHERE n_plus_one > 0" if by in ("n1", "n_plus_one") else ""
+    cursor = conn.execute(f"""
+        SELECT fingerprint, call_site, sql, calls, total_ms, max_ms, rows, n_plus_one, last_seen
+        FROM query_stats {where}
+        ORDER BY {order}
+        LIMIT ?
+    """, (limit,))
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, r)) for r in cursor.fetchall()]
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def recent_query_log(kind=None, limit=50, conn=None):
+    """Newest query_log entries ('slow' and/or 'n+1')."""
+    own_conn = conn is None
+    if own_conn:
+        from tobys_terminal.shared.db import get_connection
+        conn = get_connection()
+    ensure_query_log_tables(conn)
+    sql = "SELECT logged_at, fingerprint, sql, duration_ms, rows, call_site, kind FROM query_log"
+    params = []
+    if kind:
+        sql += " WHERE kind = ?"
+        params.append(kind)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, r)) for r in cursor.fetchall()]
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def reset_query_stats(conn=None):
+    """Clear query_stats, query_log and this process's in-memory numbers."""
+    with _lock:
+        _live_stats.clear()
+        _pending_stats.clear()
+        _pending_log.clear()
+        _slow_ring.clear()
+        _recent_calls.clear()
+    own_conn = conn is None
+    if own_conn:
+        from tobys_terminal.shared.db import get_connection
+        conn = get_connection()
+    ensure_query_log_tables(conn)
+    conn.execute("DELETE FROM query_stats")
+    conn.execute("DELETE FROM query_log")
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+
+def query_profiler_cli():
+    """Command-line report of the profiler tables."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query profiler report")
+    parser.add_argument("--top", type=int, default=20, help="How many statements to show")
+    parser.add_argument("--by", choices=["total", "n1"], default="total", help="Rank by total time or N+1 bursts")
+    parser.add_argument("--slow", type=int, metavar="N", help="Show the N newest slow-query log entries instead")
+    parser.add_argument("--reset", action="store_true", help="Clear the collected statistics")
+    args = parser.parse_args()
+
+    if args.reset:
+        reset_query_stats()
+        print("✅ Query statistics cleared")
+        return
+
+    if args.slow:
+        for e in recent_query_log(limit=args.slow):
+            print(f"{e['logged_at']}  {e['kind']:4} {e['duration_ms']:>9.1f} ms {e['rows']:>7} rows  "
+                  f"{e['call_site']}\n    {e['sql'][:160]}")
+        return
+
+    rows = top_queries(by=args.by, limit=args.top)
+    if not rows:
+        print("No statistics yet - enable QUERY_PROFILING and use the app for a while.")
+        return
+    for r in rows:
+        avg = r["total_ms"] / r["calls"] if r["calls"] else 0
+        print(f"{r['total_ms']:>10.1f} ms total  {r['calls']:>7} calls  {avg:>8.2f} ms avg  "
+              f"{r['max_ms']:>8.1f} ms max  {r['n_plus_one']:>4} n+1  {r['call_site']}\n    {r['sql'][:160]}")
+
+
+if __name__ == "__main__":
+    query_profiler_cli()
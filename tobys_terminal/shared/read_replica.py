@@ -0,0 +1,233 @@
+# tobys_terminal/shared/read_replica.py
+"""
+Read-only snapshot of terminal.db for the customer portal.
+
+While sync_all() is rewriting tables, portal pages that read terminal.db wait
+on its write transactions. With READ_REPLICA on, sync_all() (or
+`--watch`) publishes a consistent copy of the database through the backup API
+into REPLICA_DIR, and requests that opt in (the customer portal blueprint)
+get connections to that copy opened with mode=ro&immutable=1 - no locks, so
+they never contend with the importer.
+
+Every publish writes a new file and then swaps current.json to point at it;
+a published file is never modified again, which is what immutable=1 relies
+on. If the replica is missing or older than REPLICA_MAX_AGE_MINUTES, reads
+fall back to terminal.db.
+
+    python -m tobys_terminal.shared.read_replica              # publish now
+    python -m tobys_terminal.shared.read_replica --watch 60   # republish when terminal.db changes
+    python -m tobys_terminal.shared.read_replica --status
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from config import PROJECT_ROOT
+from tobys_terminal.shared.query_profiler import connect as _connect
+
+READ_REPLICA = os.environ.get("READ_REPLICA", "0") == "1"
+REPLICA_DIR = PROJECT_ROOT / "replica"
+REPLICA_MAX_AGE_MINUTES = 30   # older than this and reads go back to terminal.db
+REPLICA_KEEP = 3               # generations left on disk for readers still using them
+
+try:
+    from config import READ_REPLICA, REPLICA_DIR  # noqa: F811
+except ImportError:
+    pass
+try:
+    from config import REPLICA_MAX_AGE_MINUTES  # noqa: F811
+except ImportError:
+    pass
+
+_POINTER = "current.json"
+
+# Set for the duration of a request that may read from the replica
+_replica_scope = ContextVar("read_replica_scope", default=False)
+
+
+def _pointer_path():
+    return Path(REPLICA_DIR) / _POINTER
+
+
+def _source_signature(db_path):
+    """(mtime, size) of the database and its WAL; changes whenever a write lands."""
+    signature = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            st = os.stat(path)
+            signature += [st.st_mtime_ns, st.st_size]
+        except OSError:
+            signature += [0, 0]
+    return signature
+
+
+def _main_db_path(conn):
+    for _seq, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path
+    return ""
+
+
+def _prune_generations(keep_file):
+    generations = sorted(Path(REPLICA_DIR).glob("replica-*.db"), reverse=True)
+    for path in generations[REPLICA_KEEP:]:
+        if path.name == keep_file:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass  # still open somewhere (Windows); next publish tries again
+
+
+def publish_replica(conn=None):
+    """
+    Copy the live database to a new replica file and make it current.
+
+    Returns:
+        dict: the pointer (file, published_at, source, signature, duration_ms)
+    """
+    from tobys_terminal.shared.backup import paced_backup
+    from tobys_terminal.shared.db import get_connection
+
+    os.makedirs(REPLICA_DIR, exist_ok=True)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+
+    published_at = datetime.now()
+    name = f"replica-{published_at.strftime('%Y%m%d-%H%M%S-%f')}.db"
+    path = Path(REPLICA_DIR) / name
+    started = time.perf_counter()
+    try:
+        source_path = _main_db_path(conn)
+        signature = _source_signature(source_path)
+        dest = sqlite3.connect(path)
+        try:
+            paced_backup(conn, dest)
+            # Readers open it immutable, so it must not need a journal or WAL
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dest.close()
+    except Exception:
+        if path.exists():
+            path.unlink()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+    pointer = {
+        "file": name,
+        "published_at": published_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "source": source_path,
+        "signature": signature,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    tmp = _pointer_path().with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(tmp, _pointer_path())
+
+    _prune_generations(name)
+    return pointer
+
+
+def replica_status():
+    """The current pointer plus its age in minutes, or None if nothing is published."""
+    try:
+        with open(_pointer_path(), encoding="utf-8") as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    published = datetime.strptime(pointer["published_at"], "%Y-%m-%d %H:%M:%S")
+    pointer["age_minutes"] = (datetime.now() - published).total_seconds() / 60
+    pointer["path"] = str(Path(REPLICA_DIR) / pointer["file"])
+    pointer["usable"] = os.path.exists(pointer["path"]) and pointer["age_minutes"] <= REPLICA_MAX_AGE_MINUTES
+    return pointer
+
+
+def connect_replica(path, source=None):
+    """
+    Read-only, lock-free connection to a published replica file. Its query
+    stats are flushed to `source`, the database it was published from
+    (default config.get_db_path()), since the replica can't be written.
+    """
+    if not source:
+        from config import get_db_path
+        source = get_db_path()
+    return _connect(f"{Path(path).resolve().as_uri()}?mode=ro&immutable=1", stats_path=source, uri=True)
+
+
+def use_read_replica(enabled=True):
+    """Let get_connection() hand out replica connections in this context (one request)."""
+    _replica_scope.set(enabled)
+
+
+def replica_connection():
+    """
+    Connection to the replica if this context opted in and a fresh one is
+    published; None means use terminal.db.
+    """
+    if not (READ_REPLICA and _replica_scope.get()):
+        return None
+    status = replica_status()
+    if not status or not status["usable"]:
+        return None
+    try:
+        return connect_replica(status["path"], status.get("source"))
+    except sqlite3.Error as e:
+        print(f"⚠️ Read replica unavailable, using terminal.db: {e}")
+        return None
+
+
+def publish_if_changed():
+    """Publish only if terminal.db changed since the current replica. Returns the pointer or None."""
+    from config import get_db_path
+
+    status = replica_status()
+    if status and status.get("signature") == _source_signature(get_db_path()) and status["usable"]:
+        return None
+    return publish_replica()
+
+
+def read_replica_cli():
+    """Command-line entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish the portal's read-only database snapshot")
+    parser.add_argument("--watch", type=int, metavar="SECONDS",
+                        help="Keep running, republishing whenever terminal.db has changed")
+    parser.add_argument("--status", action="store_true", help="Show the current replica")
+    args = parser.parse_args()
+
+    if args.status:
+        status = replica_status()
+        if not status:
+            print("No replica published.")
+            return
+        print(f"{status['file']}  published {status['published_at']} ({status['age_minutes']:,.1f} min ago)  "
+              f"{'in use' if status['usable'] and READ_REPLICA else 'not in use'}")
+        return
+
+    if args.watch:
+        print(f"Watching terminal.db every {args.watch}s (Ctrl+C to stop)")
+        while True:
+            try:
+                pointer = publish_if_changed()
+                if pointer:
+                    print(f"[{pointer['published_at']}] Published {pointer['file']} in {pointer['duration_ms']:,.0f} ms")
+            except Exception as e:
+                print(f"⚠️ Replica publish failed: {e}")
+            time.sleep(args.watch)
+
+    pointer = publish_replica()
+    print(f"✅ Published {pointer['file']} in {pointer['duration_ms']:,.0f} ms")
+
+
+if __name__ == "__main__":
+    read_replica_cli()
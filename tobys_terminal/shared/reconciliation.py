@@ -0,0 +1,203 @@
+# tobys_terminal/shared/reconciliation.py
+"""
+Payment lookups for daily bank reconciliation.
+
+The Reconcile Payments window used to go through StatementCalculator with
+no customer filter, which filtered on DATE(p.transaction_date) and the
+invoice status with no usable index, then looked up payment_tracking once
+per row. These queries seek straight into payments_clean by normalized
+transaction date, reference (prefix) or invoice number, and pick up the
+tracking flags with the same query.
+
+payment_tracking holds one row per payment (payment_id -> payments_clean.id),
+so two payments on the same invoice are reconciled independently.
+"""
+
+from datetime import datetime
+
+from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.statement_logic import StatementCalculator
+
+RECONCILE_INDEXES = [
+    # DATE() normalizes '2025-09-08' and '2025-09-08 13:30:02' to the same key
+    "CREATE INDEX IF NOT EXISTS idx_payments_clean_tx_date ON payments_clean(DATE(transaction_date))",
+    "CREATE INDEX IF NOT EXISTS idx_payments_clean_reference ON payments_clean(reference COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_invoice_number ON payments_clean(invoice_number)",
+]
+
+_indexes_ready = False
+
+
+def ensure_reconciliation_indexes(conn=None):
+    """Create the payments_clean indexes the reconciliation queries rely on."""
+    global _indexes_ready
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    for sql in RECONCILE_INDEXES:
+        try:
+            cur.execute(sql)
+        except Exception as e:
+            print(f"Could not create reconciliation index: {e}")
+    conn.commit()
+    _indexes_ready = True
+    if own_conn:
+        conn.close()
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def find_payments(start_date=None, end_date=None, reference=None, reference_prefix=False,
+                  invoice_number=None, billable_only=True, unreconciled_only=False, conn=None):
+    """
+    Payments for reconciliation, oldest first.
+
+    Args:
+        start_date, end_date: date or 'YYYY-MM-DD' bounds on the transaction date
+            (inclusive; either may be omitted)
+        reference: payment reference / check number (case-insensitive)
+        reference_prefix: match references starting with `reference`
+        invoice_number: limit to one invoice
+        billable_only: skip payments on non-billable invoices (cancelled, void,
+            quotes...) - the same rule the statement-based search used
+        unreconciled_only: skip payments already marked reconciled
+
+    Returns:
+        list of dicts: id, transaction_date, invoice_number, amount,
+        payment_method, reference, customer_id, reconciled, notes
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    if not _indexes_ready:
+        ensure_reconciliation_indexes(conn)
+
+    clauses = []
+    params = []
+
+    if start_date:
+        clauses.append("DATE(p.transaction_date) >= ?")
+        params.append(str(start_date)[:10])
+    if end_date:
+        clauses.append("DATE(p.transaction_date) <= ?")
+        params.append(str(end_date)[:10])
+
+    if reference:
+        if reference_prefix:
+            clauses.append("p.reference LIKE ? ESCAPE '\\'")
+            params.append(_escape_like(reference) + "%")
+        else:
+            clauses.append("p.reference = ? COLLATE NOCASE")
+            params.append(reference)
+
+    if invoice_number:
+        clauses.append("p.invoice_number = ?")
+        params.append(invoice_number)
+
+    join = ""
+    if billable_only:
+        non_billable = sorted(StatementCalculator.NON_BILLABLE_STATUSES)
+        join = "JOIN invoices i ON i.invoice_number = p.invoice_number"
+        clauses.append(
+            f"LOWER(TRIM(COALESCE(i.invoice_status, ''))) NOT IN ({','.join('?' for _ in non_billable)})"
+        )
+        params.extend(non_billable)
+
+    if unreconciled_only:
+        clauses.append("LOWER(TRIM(COALESCE(t.reconciled, ''))) NOT IN ('yes', 'true', '1')")
+
+    sql = f"""
+        SELECT
+            p.id,
+            p.transaction_date,
+            p.invoice_number,
+            p.amount,
+            p.payment_method,
+            p.reference,
+            p.customer_id,
+            t.reconciled,
+            t.notes
+        FROM payments_clean p
+        {join}
+        LEFT JOIN payment_tracking t ON t.payment_id = p.id
+        {"WHERE " + " AND ".join(clauses) if clauses else ""}
+        ORDER BY DATE(p.transaction_date), p.id
+    """
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    if own_conn:
+        conn.close()
+    return rows
+
+
+def is_reconciled(flag):
+    """payment_tracking.reconciled has been stored as 1, 'yes' and 'true'."""
+    return str(flag).strip().lower() in {"yes", "true", "1"}
+
+
+def summarize_by_day(rows):
+    """Deposit totals per transaction date: [(date, count, total)]."""
+    days = {}
+    for r in rows:
+        day = str(r["transaction_date"] or "")[:10]
+        count, total = days.get(day, (0, 0.0))
+        days[day] = (count + 1, total + float(r["amount"] or 0))
+    return [(day, count, round(total, 2)) for day, (count, total) in sorted(days.items())]
+
+
+def update_payment_tracking(payment_ids, reconciled=None, notes=None, conn=None):
+    """
+    Set the reconciled flag and/or note on many payments in one transaction.
+
+    Args:
+        payment_ids: payments_clean ids
+        reconciled: True/False to set the flag, None to leave it alone
+        notes: note text to set, None to leave notes alone
+
+    Returns the number of payments updated.
+    """
+    ids = sorted({int(pid) for pid in payment_ids if pid is not None})
+    if not ids or (reconciled is None and notes is None):
+        return 0
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+
+    sets = ["updated_at = excluded.updated_at"]
+    if reconciled is not None:
+        sets.append("reconciled = excluded.reconciled")
+    if notes is not None:
+        sets.append("notes = excluded.notes")
+
+    flag = None if reconciled is None else (1 if reconciled else 0)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        # The WHERE on the SELECT is required for SQLite to parse the upsert
+        conn.executemany(f"""
+            INSERT INTO payment_tracking (payment_id, invoice_number, reconciled, notes, updated_at)
+            SELECT id, invoice_number, ?, ?, ? FROM payments_clean WHERE id = ?
+            ON CONFLICT(payment_id) DO UPDATE SET {", ".join(sets)}
+        """, [(flag, notes, now, pid) for pid in ids])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+    return len(ids)
+
+
+def mark_payments_reconciled(payments, conn=None):
+    """
+    Flag payments (dicts from find_payments) reconciled in one transaction.
+    Returns the number of payments updated.
+    """
+    return update_payment_tracking([p["id"] for p in payments], reconciled=True, conn=conn)
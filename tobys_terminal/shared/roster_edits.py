@@ -0,0 +1,251 @@
+# tobys_terminal/shared/roster_edits.py
+"""
+Batched, version-checked edits for the IMM and Harlestons production rosters.
+
+The web terminals send a list of cell diffs ({order_id, field, value,
+version}) instead of re-posting every field of every row. `apply_roster_patch`
+drops no-op changes, rejects orders whose version moved since the page was
+loaded (someone else saved first), and writes the rest with executemany in a
+single transaction.
+
+Every roster row carries a `version` counter that an AFTER UPDATE trigger
+bumps whenever a value actually changes, so edits made by the desktop app or a Printavo sync are
+detected as conflicts too.
+"""
+
+from tobys_terminal.shared.db import database_file
+
+# roster table -> {field name used by the terminal forms: column}
+EDITABLE_FIELDS = {
+    "imm_orders": {
+        "po_number": "po_number",
+        "project_name": "nickname",
+        "in_hands": "in_hand_date",
+        "firm_date": "firm_date",
+        "invoice_number": "invoice_number",
+        "process": "process",
+        "status": "status",
+        "notes": "notes",
+    },
+    "harlestons_orders": {
+        "po_number": "po_number",
+        "invoice_number": "invoice_number",
+        "club_nickname": "club_nickname",
+        "location": "location",
+        "process": "process",
+        "pcs": "pcs",
+        "status": "status",
+        "notes": "notes",
+        "in_hands": "in_hand_date",
+        "priority": "priority",
+        "uploaded": "uploaded",
+        "inside": "inside_location",
+    },
+}
+
+# Fields only admins may change
+ADMIN_FIELDS = {"p_status": "p_status"}
+
+_versioned_tables = set()    # (database file, table)
+
+
+def ensure_roster_versioning(conn, table):
+    """
+    Add the `version` column and its bump trigger to a roster table.
+    Safe to call on every request; the work is only done once per process
+    and database.
+    """
+    key = (database_file(conn), table)
+    if key in _versioned_tables:
+        return
+    if table not in EDITABLE_FIELDS:
+        raise ValueError(f"Unknown roster table: {table}")
+
+    try:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        if "version" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+        # Only real changes move the version: syncs re-write every PO with
+        # the values it already has, and an open terminal would otherwise
+        # see all of its rows as changed by someone else. Rebuilt when the
+        # table's columns changed since. recursive_triggers is off, so the
+        # trigger's own UPDATE doesn't re-fire it.
+        name = f"{table}_version_bump"
+        changed = " OR ".join(f'old."{c}" IS NOT new."{c}"' for c in columns if c != "version")
+        sql = (
+            f"CREATE TRIGGER {name} AFTER UPDATE ON {table} "
+            f"WHEN new.version IS old.version AND ({changed}) BEGIN "
+            f"UPDATE {table} SET version = old.version + 1 WHERE id = new.id; END"
+        )
+        existing = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone()
+        if not existing or existing[0] != sql:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(sql)
+        conn.commit()
+        _versioned_tables.add(key)
+    except Exception as e:
+        print(f"Could not add version tracking to {table}: {e}")
+
+
+def editable_fields(table, is_admin=False):
+    """Field -> column map of what the current user may edit."""
+    fields = dict(EDITABLE_FIELDS[table])
+    if is_admin:
+        fields.update(ADMIN_FIELDS)
+    return fields
+
+
+def _same(current, value):
+    """Form values arrive as strings; treat NULL and '' as equal."""
+    current = "" if current is None else str(current)
+    value = "" if value is None else str(value)
+    return current == value
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def changes_from_form(form, table, is_admin=False):
+    """
+    Turn a posted terminal form (po_number_12, notes_12, version_12, ...)
+    into the change list apply_roster_patch() expects.
+    """
+    fields = editable_fields(table, is_admin)
+    versions = {}
+    changes = []
+    for key in form:
+        field, _, id_str = key.rpartition("_")
+        if not id_str.isdigit():
+            continue
+        if field == "version":
+            versions[id_str] = form.get(key)
+        elif field in fields:
+            changes.append({"order_id": id_str, "field": field, "value": form.get(key)})
+
+    for change in changes:
+        change["version"] = versions.get(change["order_id"])
+    return changes
+
+
+def apply_roster_patch(conn, table, changes, is_admin=False):
+    """
+    Apply a batch of cell edits to a roster table in one transaction.
+
+    Args:
+        conn: open connection
+        table: 'imm_orders' or 'harlestons_orders'
+        changes: iterable of dicts with order_id, field, value and (optionally)
+                 version - the row version the client last saw. Changes
+                 without a version are applied unconditionally.
+        is_admin: allow admin-only fields (p_status)
+
+    Returns:
+        dict with
+            applied   - [{order_id, version}] for every order written
+            conflicts - [{order_id, field, value, version}] with the current
+                        stored value for each rejected change
+            errors    - [{order_id, field, error}] for malformed changes
+    """
+    ensure_roster_versioning(conn, table)
+    fields = editable_fields(table, is_admin)
+    result = {"applied": [], "conflicts": [], "errors": []}
+
+    # order_id -> {"version": expected or None, "columns": {column: (field, value)}}
+    pending = {}
+    for change in changes:
+        order_id = _int_or_none(change.get("order_id"))
+        field = change.get("field")
+        if order_id is None:
+            result["errors"].append({"order_id": change.get("order_id"), "field": field, "error": "Invalid order id"})
+            continue
+        if field not in fields:
+            result["errors"].append({"order_id": order_id, "field": field, "error": "Invalid field name"})
+            continue
+
+        entry = pending.setdefault(order_id, {"version": None, "columns": {}})
+        version = _int_or_none(change.get("version"))
+        if version is not None:
+            entry["version"] = version
+        entry["columns"][fields[field]] = (field, change.get("value"))
+
+    if not pending:
+        return result
+
+    columns = sorted({col for entry in pending.values() for col in entry["columns"]})
+    ids = list(pending)
+
+    # Take the write lock before reading so the version check and the
+    # writes see the same rows.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, version, {', '.join(columns)} FROM {table} "
+                f"WHERE id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                current[row[0]] = (row[1], dict(zip(columns, row[2:])))
+
+        # Group the surviving orders by the set of columns they change so each
+        # group is a single executemany() call.
+        batches = {}
+        for order_id, entry in pending.items():
+            if order_id not in current:
+                for field, _value in entry["columns"].values():
+                    result["errors"].append({"order_id": order_id, "field": field, "error": "Order not found"})
+                continue
+
+            stored_version, stored = current[order_id]
+            if entry["version"] is not None and entry["version"] != stored_version:
+                for column, (field, _value) in entry["columns"].items():
+                    result["conflicts"].append({
+                        "order_id": order_id,
+                        "field": field,
+                        "value": stored[column],
+                        "version": stored_version,
+                    })
+                continue
+
+            changed = {
+                column: value
+                for column, (_field, value) in entry["columns"].items()
+                if not _same(stored[column], value)
+            }
+            if not changed:
+                continue
+
+            key = tuple(sorted(changed))
+            batches.setdefault(key, []).append(tuple(changed[c] for c in key) + (order_id,))
+
+        written = []
+        for key, params in batches.items():
+            set_clause = ", ".join(f"{column} = ?" for column in key)
+            conn.executemany(f"UPDATE {table} SET {set_clause} WHERE id = ?", params)
+            written.extend(p[-1] for p in params)
+
+        if written:
+            for start in range(0, len(written), 500):
+                chunk = written[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT id, version FROM {table} WHERE id IN ({','.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+                result["applied"].extend({"order_id": r[0], "version": r[1]} for r in rows)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return result
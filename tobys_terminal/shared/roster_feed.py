@@ -0,0 +1,145 @@
+# tobys_terminal/shared/roster_feed.py
+"""
+Live row updates for the production terminals.
+
+The IMM and Harlestons web terminals only showed edits made elsewhere (other
+users, the desktop roster, a Printavo sync) after a full reload, which re-ran
+the roster query and the dropdown queries. Now each terminal remembers the
+change-log seq it was rendered at and listens on a server-sent-events stream
+(or long-polls a JSON endpoint). Every ROSTER_POLL_SECONDS the stream checks
+the change log for its roster (one index lookup) and, when something changed,
+sends only those rows, re-read with the terminal's filters and search:
+
+    rows     changed orders the terminal should show (patched in place)
+    removed  order ids it should drop (deleted, or no longer match)
+    reset    too much changed or the log was pruned - reload the page
+
+A stream ends after ROSTER_STREAM_SECONDS so it doesn't hold a web worker
+forever; EventSource reconnects on its own and resumes from the last event
+id it saw (the change-log seq).
+"""
+
+import json
+import time
+
+from tobys_terminal.shared.change_log import changed_rows, changes_since, latest_seq
+from tobys_terminal.shared.roster_pages import fetch_roster_rows
+
+ROSTER_POLL_SECONDS = 1.0        # how often an open stream checks the change log
+ROSTER_HEARTBEAT_SECONDS = 15    # comment line so proxies don't drop an idle stream
+ROSTER_STREAM_SECONDS = 55       # then the stream ends and the browser reconnects
+ROSTER_LONG_POLL_SECONDS = 25    # longest a /changes.json request waits
+ROSTER_RETRY_MS = 3000           # reconnect delay suggested to EventSource
+ROSTER_MAX_CHANGES = 500         # more changes than this at once: reload instead
+
+
+def parse_seq(value):
+    """A seq from a query arg or Last-Event-ID header; None if missing or bad."""
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
+
+
+def roster_changes(conn, table, since, filters=None, search=None):
+    """
+    What changed on a terminal's roster after `since`.
+
+    Returns:
+        dict: seq (pass it back next time), rows (visible changed orders),
+        removed (order ids to drop), reset (reload everything instead)
+    """
+    feed = changes_since(since, tables=[table], limit=ROSTER_MAX_CHANGES, conn=conn)
+    if feed["reset"] or feed["more"]:
+        return {"seq": latest_seq(conn, [table]) or 0, "rows": [], "removed": [], "reset": True}
+
+    ops = changed_rows(feed["changes"]).get(table, {})
+    rows = fetch_roster_rows(conn, table, [i for i, op in ops.items() if op != "D"], filters, search)
+    visible = {row["id"] for row in rows}
+    return {
+        "seq": feed["seq"],
+        "rows": rows,
+        "removed": sorted(i for i in ops if i not in visible),
+        "reset": False,
+    }
+
+
+def wait_for_roster_changes(conn, table, since, filters=None, search=None, timeout=ROSTER_LONG_POLL_SECONDS):
+    """
+    Block until the roster changes after `since` or `timeout` seconds pass.
+    Returns roster_changes() (empty rows/removed on timeout), or None if the
+    change log isn't set up in this database.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        current = latest_seq(conn, [table])
+        if current is None:
+            return None
+        if current > since or time.monotonic() >= deadline:
+            return roster_changes(conn, table, since, filters, search)
+        time.sleep(ROSTER_POLL_SECONDS)
+
+
+def feed_payload(feed, render_row):
+    """JSON-ready feed; render_row(order) -> the terminal's <tr> HTML for that order."""
+    return {
+        "seq": feed["seq"],
+        "reset": feed["reset"],
+        "removed": feed["removed"],
+        "rows": [
+            {
+                "id": row["id"],
+                "version": row["version"] or 0,
+                "rank": row["sort_rank"],
+                "due": row["sort_due"],
+                "html": render_row(row),
+            }
+            for row in feed["rows"]
+        ],
+    }
+
+
+def _event(event, data, seq=None):
+    lines = []
+    if seq is not None:
+        lines.append(f"id: {seq}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_roster_changes(connect, table, since, filters, search, render_row):
+    """
+    Server-sent events for one terminal; wrap in stream_with_context().
+
+    Events: ready (the seq the stream starts from), changes (feed_payload()),
+    unavailable (no change log - stop listening). `connect` opens the
+    connection the stream polls with; it is closed when the stream ends.
+    """
+    conn = connect()
+    try:
+        current = latest_seq(conn, [table])
+        if current is None:
+            yield _event("unavailable", {})
+            return
+        if since is None or since > current:
+            since = current
+
+        yield f"retry: {ROSTER_RETRY_MS}\n\n"
+        yield _event("ready", {"seq": since}, since)
+
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < ROSTER_STREAM_SECONDS:
+            time.sleep(ROSTER_POLL_SECONDS)
+            current = latest_seq(conn, [table])
+            if current is not None and current > since:
+                feed = roster_changes(conn, table, since, filters, search)
+                since = feed["seq"]
+                yield _event("changes", feed_payload(feed, render_row), since)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= ROSTER_HEARTBEAT_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+    finally:
+        conn.close()
@@ -0,0 +1,245 @@
+# tobys_terminal/shared/roster_pages.py
+"""
+Keyset pagination and cached filter dropdowns for the production terminals.
+
+The web terminals used to SELECT * every visible order and render the whole
+roster, plus run a SELECT DISTINCT per dropdown on every request. Pages are
+now fetched with a keyset cursor over the terminal's sort order
+(status/priority rank, due date, id), and the dropdown values are cached
+in-process until a write invalidates them (or the change log shows one made
+by another process). fetch_roster_rows() re-reads individual orders under the
+same filters for the terminals' live updates (see roster_feed).
+"""
+
+import base64
+import json
+import time
+
+from tobys_terminal.shared.change_log import latest_seq
+from tobys_terminal.shared.db import database_file
+from tobys_terminal.shared.roster_edits import ensure_roster_versioning
+from tobys_terminal.shared.roster_search import order_search_clause
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Seconds a cached dropdown list may live without an explicit invalidation.
+# Writes from the desktop app or a Printavo sync are picked up sooner through
+# the change log; the TTL only matters where it hasn't been set up.
+FILTER_OPTIONS_TTL = 300
+
+_IMM_RANK = """CASE status
+            WHEN 'Complete and Ready for Pickup' THEN 1
+            WHEN 'Inline-EMB' THEN 2
+            WHEN 'Inline-DTF' THEN 3
+            WHEN 'Inline-PAT' THEN 4
+            WHEN 'Waiting Product' THEN 5
+            WHEN 'Need Sewout' THEN 6
+            WHEN 'Need File' THEN 7
+            WHEN 'Need Order' THEN 8
+            ELSE 9
+        END"""
+
+_HARLESTONS_RANK = """CASE priority
+            WHEN 'High' THEN 1
+            WHEN 'Medium' THEN 2
+            WHEN 'Low' THEN 3
+            ELSE 4
+        END"""
+
+ROSTERS = {
+    "imm_orders": {
+        "hidden_p_statuses": ("done", "complete", "cancelled", "archived", "done done"),
+        "rank": _IMM_RANK,
+        "due": "COALESCE(customer_due_date, in_hand_date, '')",
+        "filters": ("status", "process", "firm_date"),
+        "options": ("status", "process", "p_status"),
+    },
+    "harlestons_orders": {
+        "hidden_p_statuses": (
+            "done", "template", "done done", "complete", "cancelled", "archived", "shipped",
+            "picked up", "harlestons -- invoiced", "harlestons -- no order pending",
+            "harlestons -- picked up", "harlestons-need sewout",
+        ),
+        "rank": _HARLESTONS_RANK,
+        "due": "COALESCE(in_hand_date, '')",
+        "filters": ("status", "process", "location"),
+        "options": ("status", "process", "location"),
+    },
+}
+
+_options_cache = {}
+_sort_indexes_ready = set()    # (database file, table)
+
+
+def ensure_roster_sort_index(conn, table):
+    """
+    Expression index matching the terminal sort order, so each keyset page
+    walks the index instead of sorting the whole roster.
+    """
+    key = (database_file(conn), table)
+    if key in _sort_indexes_ready:
+        return
+    cfg = ROSTERS[table]
+    try:
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_terminal_sort
+            ON {table} ({cfg['rank']}, {cfg['due']}, id)
+        """)
+        conn.commit()
+        _sort_indexes_ready.add(key)
+    except Exception as e:
+        print(f"Could not create sort index for {table}: {e}")
+
+
+def encode_cursor(key):
+    """Opaque, URL-safe token for a (rank, due, id) sort key."""
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(). Returns None for a missing or bad token."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        rank, due, order_id = key
+        return int(rank), str(due), int(order_id)
+    except Exception:
+        return None
+
+
+def clamp_page_size(value, default=PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _visible_orders_query(conn, table, filters, search):
+    """SELECT of the orders a terminal shows for these filters (no ORDER BY / LIMIT)."""
+    cfg = ROSTERS[table]
+    hidden = cfg["hidden_p_statuses"]
+    query = f"""
+        SELECT *, {cfg['rank']} AS sort_rank, {cfg['due']} AS sort_due
+        FROM {table}
+        WHERE
+            status != 'Hidden'
+            AND TRIM(LOWER(p_status)) NOT IN ({','.join('?' for _ in hidden)})
+    """
+    params = list(hidden)
+
+    for column in cfg["filters"]:
+        value = (filters or {}).get(column)
+        if value:
+            query += f" AND {column} = ?"
+            params.append(value)
+
+    if search:
+        search_sql, search_params = order_search_clause(table, search, conn)
+        query += search_sql
+        params.extend(search_params)
+    return query, params
+
+
+def fetch_roster_page(conn, table, filters=None, search=None, after=None, limit=PAGE_SIZE):
+    """
+    Fetch one page of visible orders for a production terminal.
+
+    Args:
+        conn: open connection (row_factory=sqlite3.Row for template access)
+        table: 'imm_orders' or 'harlestons_orders'
+        filters: dict of column -> exact value (only the roster's filter columns are used)
+        search: free-text search (PO, nickname, notes, invoice #)
+        after: cursor token from the previous page, or None for the first page
+        limit: page size
+
+    Returns:
+        (orders, next_cursor) - next_cursor is None on the last page
+    """
+    cfg = ROSTERS[table]
+    ensure_roster_sort_index(conn, table)
+    ensure_roster_versioning(conn, table)
+
+    query, params = _visible_orders_query(conn, table, filters, search)
+
+    key = decode_cursor(after)
+    if key:
+        # The leading rank >= ? lets SQLite seek into the sort index; the
+        # row-value comparison then resumes exactly after the last order seen.
+        query += f" AND {cfg['rank']} >= ? AND ({cfg['rank']}, {cfg['due']}, id) > (?, ?, ?)"
+        params.append(key[0])
+        params.extend(key)
+
+    query += f"""
+        ORDER BY {cfg['rank']}, {cfg['due']}, id
+        LIMIT ?
+    """
+    params.append(limit + 1)
+
+    rows = conn.execute(query, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor((last["sort_rank"], last["sort_due"], last["id"]))
+    return rows, next_cursor
+
+
+def fetch_roster_rows(conn, table, order_ids, filters=None, search=None):
+    """
+    The given orders, restricted to the ones a terminal with these filters
+    and search would show, in terminal order (same columns as fetch_roster_page).
+    """
+    if not order_ids:
+        return []
+    ensure_roster_versioning(conn, table)
+
+    query, params = _visible_orders_query(conn, table, filters, search)
+    rows = []
+    ids = list(order_ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows += conn.execute(
+            f"{query} AND id IN ({','.join('?' for _ in chunk)})",
+            params + chunk,
+        ).fetchall()
+    rows.sort(key=lambda r: (r["sort_rank"], r["sort_due"], r["id"]))
+    return rows
+
+
+def get_filter_options(conn, table, column):
+    """
+    Distinct non-null values of a roster column for the filter dropdowns,
+    cached until invalidate_filter_options(), a logged change to the table,
+    or FILTER_OPTIONS_TTL.
+    Returns a list of {column: value} dicts (same shape the templates used).
+    """
+    if column not in ROSTERS[table]["options"]:
+        raise ValueError(f"{column} is not a filter column for {table}")
+
+    cache_key = (table, column)
+    cached = _options_cache.get(cache_key)
+    now = time.monotonic()
+    seq = latest_seq(conn, [table])
+    if cached and now - cached[0] < FILTER_OPTIONS_TTL and cached[2] == seq:
+        return cached[1]
+
+    values = [
+        {column: r[0]}
+        for r in conn.execute(
+            f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}"
+        ).fetchall()
+    ]
+    _options_cache[cache_key] = (now, values, seq)
+    return values
+
+
+def invalidate_filter_options(table=None):
+    """Drop cached dropdown values for one roster (or all of them) after a write."""
+    for key in list(_options_cache):
+        if table is None or key[0] == table:
+            del _options_cache[key]
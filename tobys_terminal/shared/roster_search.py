@@ -0,0 +1,140 @@
+# tobys_terminal/shared/roster_search.py
+"""
+Full-text search over the IMM and Harlestons production rosters.
+
+Each roster table gets an FTS5 trigram shadow index (rowid = order id) over
+PO, nickname, notes and invoice number, kept in sync by triggers. The web
+terminals use `order_search_clause()` so the search box hits the index
+instead of running LOWER(...) LIKE over every order on every request.
+"""
+
+import sqlite3
+
+from tobys_terminal.shared.db import get_connection
+
+# roster table -> columns mirrored into its FTS index
+ROSTER_SEARCH_COLUMNS = {
+    "imm_orders": ("po_number", "nickname", "notes", "invoice_number"),
+    "harlestons_orders": ("po_number", "club_nickname", "notes", "invoice_number"),
+}
+
+# The trigram tokenizer can only match terms of at least 3 characters
+_MIN_TERM_LENGTH = 3
+
+_ready_tables = set()
+
+
+def _fts_table(table):
+    return f"{table}_fts"
+
+
+def ensure_roster_search_index(table, conn=None):
+    """
+    Create the FTS index and sync triggers for one roster table.
+    Returns True if the index is usable, False if FTS5/trigram is missing.
+    """
+    if table not in ROSTER_SEARCH_COLUMNS:
+        raise ValueError(f"Unknown roster table: {table}")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+
+    fts = _fts_table(table)
+    cols = ROSTER_SEARCH_COLUMNS[table]
+    col_list = ", ".join(cols)
+    new_vals = ", ".join(f"new.{c}" for c in cols)
+
+    try:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        created = cur.fetchone() is None
+        if created:
+            cur.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({col_list}, tokenize = 'trigram')")
+
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                DELETE FROM {fts} WHERE rowid = new.id;
+                INSERT INTO {fts} (rowid, {col_list}) VALUES (new.id, {new_vals});
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM {fts} WHERE rowid = old.id;
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF id, {col_list} ON {table} BEGIN
+                DELETE FROM {fts} WHERE rowid = old.id;
+                INSERT INTO {fts} (rowid, {col_list}) VALUES (new.id, {new_vals});
+            END
+        """)
+
+        if created:
+            cur.execute(f"INSERT INTO {fts} (rowid, {col_list}) SELECT id, {col_list} FROM {table}")
+        conn.commit()
+        _ready_tables.add(table)
+        ready = True
+    except sqlite3.OperationalError as e:
+        print(f"Roster search index for {table} unavailable, using LIKE search: {e}")
+        conn.rollback()
+        _ready_tables.discard(table)
+        ready = False
+    finally:
+        if own_conn:
+            conn.close()
+
+    return ready
+
+
+def ensure_roster_search_indexes(conn=None):
+    """Create the search indexes for every production roster."""
+    return all(ensure_roster_search_index(table, conn) for table in ROSTER_SEARCH_COLUMNS)
+
+
+def rebuild_roster_search_index(table):
+    """Repopulate a roster's FTS index from scratch."""
+    conn = get_connection()
+    if not ensure_roster_search_index(table, conn):
+        conn.close()
+        return 0
+    fts = _fts_table(table)
+    col_list = ", ".join(ROSTER_SEARCH_COLUMNS[table])
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {fts}")
+    cur.execute(f"INSERT INTO {fts} (rowid, {col_list}) SELECT id, {col_list} FROM {table}")
+    count = cur.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+
+def _match_expression(search_term):
+    words = search_term.split()
+    if not words or any(len(w) < _MIN_TERM_LENGTH for w in words):
+        return None
+    return " AND ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def order_search_clause(table, search_term, conn=None, alias=None):
+    """
+    Build a WHERE fragment that limits a roster query to orders matching
+    search_term. Returns (sql, params); sql starts with "AND".
+
+    Uses the FTS index when it can, otherwise falls back to the LIKE filter
+    the terminals used before (short terms, SQLite without FTS5).
+    """
+    search_term = (search_term or "").strip()
+    if not search_term:
+        return "", []
+
+    id_col = f"{alias}.id" if alias else "id"
+    match = _match_expression(search_term)
+    if match and (table in _ready_tables or ensure_roster_search_index(table, conn)):
+        return f" AND {id_col} IN (SELECT rowid FROM {_fts_table(table)} WHERE {_fts_table(table)} MATCH ?)", [match]
+
+    prefix = f"{alias}." if alias else ""
+    cols = ROSTER_SEARCH_COLUMNS[table]
+    like = f"%{search_term.lower()}%"
+    sql = " AND (" + " OR ".join(f"LOWER({prefix}{c}) LIKE ?" for c in cols) + ")"
+    return sql, [like] * len(cols)
@@ -112,8 +112,11 @@ class StatementCalculator:
                     p.amount,
                     p.invoice_number,
                     p.payment_method,
-                    p.reference
+                    p.reference,
+                    t.reconciled,
+                    t.notes
                 FROM payments_clean p
+                LEFT JOIN payment_tracking t ON t.payment_id = p.id
                 WHERE p.invoice_number IN ({placeholders})
             """, tuple(filtered_invoice_numbers))
             payments = cursor.fetchall()
@@ -126,9 +129,12 @@ class StatementCalculator:
                     p.amount,
                     p.invoice_number,
                     p.payment_method,
-                    p.reference
+                    p.reference,
+                    t.reconciled,
+                    t.notes
                 FROM payments_clean p
                 JOIN invoices i ON p.invoice_number = i.invoice_number
+                LEFT JOIN payment_tracking t ON t.payment_id = p.id
                 WHERE
             """
             clauses = []
@@ -157,14 +163,10 @@ class StatementCalculator:
         #print(f"💬 Payment rows returned: {len(payments)}")
 
 
-        for tx_date, amount, inv_num, method, ref in payments:
+        for tx_date, amount, inv_num, method, ref, rec_flag, note in payments:
             # (No unpaid_only filtering here — we want ALL payments for shown invoices.)
             parsed_date = self._parse_date(tx_date)
-
-            cursor.execute("SELECT reconciled, notes FROM payment_tracking WHERE invoice_number = ?", (inv_num,))
-            row = cursor.fetchone()
-            rec_flag = row[0] if row else None
-            note = row[1] if row else ""
+            note = note or ""
 
             if self.unreconciled_only and str(rec_flag).strip().lower() == "yes":
                 continue
@@ -255,23 +257,22 @@ def get_statement_summaries(customer_ids: list[int]) -> list[dict]:
     where_clause = f"(s.customer_id IN ({in_placeholders}) OR {like_clause})"
     params = tuple(customer_ids) + tuple(str(x) for x in customer_ids)
 
+    # Payments are summed per statement invoice through the TRIM index on
+    # payments_clean, rather than grouping every payment ever recorded first
     sql = f"""
-    WITH pay AS (
-      SELECT invoice_number, SUM(amount) AS paid
-      FROM payments_clean
-      GROUP BY invoice_number
-    )
     SELECT
       s.statement_number,
       COALESCE(s.start_date,'') AS s_start,
       COALESCE(s.end_date,'')   AS s_end,
       COUNT(DISTINCT it.invoice_number) AS invoice_count,
       ROUND(SUM(COALESCE(inv.total, 0)), 2) AS billed,
-      ROUND(SUM(COALESCE(pay.paid, 0)), 2)  AS paid
+      ROUND(SUM(COALESCE((
+        SELECT SUM(p.amount) FROM payments_clean p
+        WHERE TRIM(p.invoice_number) = TRIM(it.invoice_number)
+      ), 0)), 2) AS paid
     FROM statement_tracking s
     LEFT JOIN invoice_tracking it ON it.statement_number = s.statement_number
     LEFT JOIN invoices inv ON TRIM(inv.invoice_number) = TRIM(it.invoice_number)
-    LEFT JOIN pay ON TRIM(pay.invoice_number) = TRIM(it.invoice_number)
     WHERE {where_clause}
     GROUP BY s.statement_number, s_start, s_end
     ORDER BY s_start DESC, s_end DESC
@@ -308,6 +309,23 @@ def get_customer_ids_by_company(company_name: str):
     conn.close()
     return ids
 
+def get_statements_by_label(company_label):
+    """
+    (statement_number, start_date, end_date, generated_on) rows for a
+    company label, newest first.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT statement_number, start_date, end_date, generated_on
+        FROM statement_tracking
+        WHERE company_label = ?
+        ORDER BY generated_on DESC
+    """, (company_label,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
 def void_statement(statement_number):
     """
     Mark a statement as void in the database.
@@ -186,6 +186,78 @@ def system_info():
     
     return render_template('admin/system.html', table_stats=table_stats)
 
+@admin_bp.route('/queries', methods=['GET', 'POST'])
+@requires_permission('manage_users')
+def query_profile():
+    """Query profiler: slowest statements, N+1 patterns and the slow-query log"""
+    from tobys_terminal.shared import query_profiler
+
+    if request.method == 'POST':
+        if request.form.get('action') == 'reset':
+            conn = get_db_connection()
+            query_profiler.reset_query_stats(conn)
+            conn.close()
+            flash("Query statistics cleared.", "success")
+        else:
+            query_profiler.flush_query_log()
+        return redirect(url_for('admin.query_profile'))
+
+    # Pending numbers from this process go to the tables first
+    query_profiler.flush_query_log()
+
+    limit = request.args.get('limit', 25, type=int)
+    conn = get_db_connection()
+    by_total = query_profiler.top_queries('total', limit, conn)
+    by_n_plus_one = query_profiler.top_queries('n1', limit, conn)
+    slow_log = query_profiler.recent_query_log(limit=limit, conn=conn)
+    conn.close()
+
+    return render_template(
+        'admin/queries.html',
+        enabled=query_profiler.profiling_enabled(),
+        slow_ms=query_profiler.SLOW_QUERY_MS,
+        by_total=by_total,
+        by_n_plus_one=by_n_plus_one,
+        slow_log=slow_log,
+        live_slow=query_profiler.get_slow_queries(limit),
+    )
+
+@admin_bp.route('/health', methods=['GET', 'POST'])
+@requires_permission('manage_users')
+def db_health():
+    """Database health: latest capture, recommendations and weekly trends"""
+    from tobys_terminal.shared import db_monitor
+    from tobys_terminal.shared.maintenance import recent_maintenance
+
+    conn = get_db_connection()
+    if request.method == 'POST':
+        db_monitor.run_health_check(conn)
+        conn.close()
+        flash("Health check captured.", "success")
+        return redirect(url_for('admin.db_health'))
+
+    # A fresh look without storing it; captures are stored on demand or by the CLI
+    report = db_monitor.run_health_check(conn, record=False)
+    weeks = request.args.get('weeks', 12, type=int)
+    trends = {
+        'Database size (MB)': [(w, v / 1024 / 1024, c / 1024 / 1024 if c is not None else None)
+                               for w, v, c in db_monitor.weekly_trend(conn, 'storage', 'file_bytes', weeks)],
+        'Free pages': db_monitor.weekly_trend(conn, 'storage', 'freelist_count', weeks),
+        'Invoices': db_monitor.weekly_trend(conn, 'rows', 'invoices', weeks),
+        'Payments': db_monitor.weekly_trend(conn, 'rows', 'payments_clean', weeks),
+        'Hot queries scanning': db_monitor.weekly_trend(conn, 'plan_problems', '', weeks),
+    }
+    hot_query_trends = {
+        name: db_monitor.weekly_trend(conn, 'hot_query_ms', name, weeks)
+        for name in report['metrics']['hot_query_ms']
+    }
+    maintenance = recent_maintenance(15, conn)
+    conn.close()
+
+    return render_template('admin/health.html', report=report, trends=trends,
+                           hot_query_trends=hot_query_trends, weeks=weeks,
+                           maintenance=maintenance)
+
 @admin_bp.route('/notes', methods=['GET', 'POST'])
 @requires_permission('manage_users')
 def admin_notes():
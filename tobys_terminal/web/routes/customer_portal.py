@@ -1,16 +1,32 @@
 # 📁 routes/customer_portal.py
-from flask import Blueprint, session, request, render_template, redirect, url_for, flash, Response, send_file
-import io, os, csv
+from flask import Blueprint, session, request, render_template, redirect, url_for, flash, Response, send_file, stream_with_context
+import os
 from datetime import datetime
 from tobys_terminal.shared.db import get_connection
-from tobys_terminal.shared.invoice_logic import fetch_invoice_rows
+from tobys_terminal.shared.invoice_logic import fetch_invoice_rows, iter_invoice_rows
 from tobys_terminal.shared.statement_logic import get_statement_summaries, get_customer_ids_by_company
 from tobys_terminal.shared.reprint import reprint_statement
-from tobys_terminal.shared.export_csv import export_invoice_csv
+from tobys_terminal.shared.export_csv import invoice_csv_rows, iter_csv
+from tobys_terminal.shared.read_replica import use_read_replica
 
 customer_bp = Blueprint("customer", __name__)
 
 
+# Portal pages only read, so they can use the published replica (if enabled)
+# instead of waiting on a sync's write transactions. Every request sets the
+# flag up front (app-wide hooks run first), so it can't leak to another
+# request on the same worker thread, and it is still set while a streamed
+# export is being generated.
+@customer_bp.before_app_request
+def read_from_primary():
+    use_read_replica(False)
+
+
+@customer_bp.before_request
+def read_from_replica():
+    use_read_replica(True)
+
+
 def check_authorized(company: str):
     user_company = session.get("company")
     role = session.get("role")
@@ -65,16 +81,14 @@ def export_csv(company):
             return False
         return True
 
-    filtered = [r for r in rows if keep(r)]
+    def csv_rows():
+        yield ["Statement #", "Period", "Invoices", "Billed", "Paid", "Balance", "Status"]
+        for r in rows:
+            if keep(r):
+                yield [r["stmt"], r["period"], r["count"], f"{r['billed']:.2f}", f"{r['paid']:.2f}", f"{r['balance']:.2f}", r["status"]]
 
-    out = io.StringIO()
-    w = csv.writer(out)
-    w.writerow(["Statement #", "Period", "Invoices", "Billed", "Paid", "Balance", "Status"])
-    for r in filtered:
-        w.writerow([r["stmt"], r["period"], r["count"], f"{r['billed']:.2f}", f"{r['paid']:.2f}", f"{r['balance']:.2f}", r["status"]])
-    out.seek(0)
     filename = f"{company}_statements_{datetime.now():%Y%m%d}.csv"
-    return Response(out.read(), mimetype="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    return Response(iter_csv(csv_rows()), mimetype="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
 
 
 @customer_bp.route("/customer/<company>/statement/<stmt>/pdf")
@@ -99,18 +113,16 @@ def export_invoices_csv(company):
     group_name = session.get("group_name") or session.get("company")
     customer_ids = get_customer_ids_by_company(group_name)
 
-    invoice_rows, totals = fetch_invoice_rows(customer_ids)
-
-    filtered = []
-    for inv in invoice_rows:
+    def keep(inv):
         if q and q not in str(inv["number"]).lower() and q not in str(inv["po"] or "").lower():
-            continue
-        if status_filter != "all" and inv["status"].lower() != status_filter:
-            continue
-        filtered.append(inv)
-
-    temp_path = export_invoice_csv(company, filtered, totals, interactive=False)
-    with open(temp_path, "r", encoding="utf-8") as f:
-        csv_data = f.read()
+            return False
+        if status_filter != "all" and (inv["status"] or "").lower() != status_filter:
+            return False
+        return True
 
-    return Response(csv_data, mimetype="text/csv", headers={"Content-Disposition": f"attachment;filename=invoices_{company}.csv"})
+    # Rows go from the cursor to the response a chunk at a time; the
+    # connection is opened and closed inside the generator. Totals at the
+    # bottom still cover every invoice, as before.
+    body = iter_csv(invoice_csv_rows(iter_invoice_rows(customer_ids), keep))
+    return Response(stream_with_context(body), mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment;filename=invoices_{company}.csv"})
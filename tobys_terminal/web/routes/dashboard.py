@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from collections import defaultdict
 import string
 from tobys_terminal.shared.db import get_connection
+from tobys_terminal.shared.customer_search import search_companies
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
@@ -39,6 +40,17 @@ def index():
 
     customer_type = request.args.get("type")
     filter_letter = request.args.get("letter", "").upper()
+    search_query = (request.args.get("q") or "").strip()
+
+    if search_query:
+        # Ranked matches from the customer search index, best first
+        companies = search_companies(search_query)
+        if customer_type:
+            allowed = {c.strip() for c in fetch_customers(customer_type)}
+            companies = [c for c in companies if c in allowed]
+        return render_template("index.html", grouped={"Search results": companies}, filter_letter="",
+                               filter_type=customer_type, search_query=search_query, letters=string.ascii_uppercase)
+
     companies = fetch_customers(customer_type)
 
     grouped = defaultdict(list)
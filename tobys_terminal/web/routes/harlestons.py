@@ -1,6 +1,12 @@
 # routes/harlestons.py
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, Response, jsonify, render_template, request, redirect, stream_with_context, url_for, session, flash
 from tobys_terminal.shared.auth_utils import get_db_connection, requires_permission
+from tobys_terminal.shared.change_log import latest_seq
+from tobys_terminal.shared.roster_edits import apply_roster_patch, changes_from_form
+from tobys_terminal.shared.roster_feed import (
+    ROSTER_LONG_POLL_SECONDS, feed_payload, parse_seq, stream_roster_changes, wait_for_roster_changes,
+)
+from tobys_terminal.shared.roster_pages import clamp_page_size, fetch_roster_page, get_filter_options, invalidate_filter_options
 harlestons_bp = Blueprint('harlestons', __name__, url_prefix='/harlestons')
 
 try:
@@ -20,66 +26,21 @@ def terminal():
     location_filter = request.args.get('location', '')
     search_query = request.args.get('search', '')
     
-    # Base query
-    query = """
-        SELECT * FROM harlestons_orders
-        WHERE 
-            status != 'Hidden'
-            AND TRIM(LOWER(p_status)) NOT IN ('done', 'template', 'done done', 'complete', 'cancelled', 'archived', 'shipped',
-                'picked up', 'harlestons -- invoiced', 'harlestons -- no order pending',
-                'harlestons -- picked up', 'harlestons-need sewout')
-    """
-    params = []
-    
-    # Apply filters if provided
-    if status_filter:
-        query += " AND status = ?"
-        params.append(status_filter)
-        
-    if process_filter:
-        query += " AND process = ?"
-        params.append(process_filter)
-        
-    if location_filter:
-        query += " AND location = ?"
-        params.append(location_filter)
-        
-    if search_query:
-        query += """ AND (
-            LOWER(po_number) LIKE ? OR 
-            LOWER(club_nickname) LIKE ? OR 
-            LOWER(notes) LIKE ?
-        )"""
-        search_term = f"%{search_query.lower()}%"
-        params.extend([search_term, search_term, search_term])
-    
-    # Add ordering
-    query += """
-        ORDER BY 
-        CASE priority
-            WHEN 'High' THEN 1
-            WHEN 'Medium' THEN 2
-            WHEN 'Low' THEN 3
-            ELSE 4
-        END,
-        in_hand_date ASC
-    """
-    
     conn = get_db_connection()
-    orders = conn.execute(query, params).fetchall()
-    
-    # Get filter options for dropdowns
-    status_options = conn.execute(
-        "SELECT DISTINCT status FROM harlestons_orders WHERE status IS NOT NULL ORDER BY status"
-    ).fetchall()
-    
-    process_options = conn.execute(
-        "SELECT DISTINCT process FROM harlestons_orders WHERE process IS NOT NULL ORDER BY process"
-    ).fetchall()
+    filters = {
+        'status': status_filter,
+        'process': process_filter,
+        'location': location_filter,
+    }
+
+    # First keyset page only; the rest is fetched from orders_page on demand
+    orders, next_cursor = fetch_roster_page(conn, 'harlestons_orders', filters, search_query)
+    live_seq = latest_seq(conn, ['harlestons_orders'])
     
-    location_options = conn.execute(
-        "SELECT DISTINCT location FROM harlestons_orders WHERE location IS NOT NULL ORDER BY location"
-    ).fetchall()
+    # Get filter options for dropdowns (cached until an edit invalidates them)
+    status_options = get_filter_options(conn, 'harlestons_orders', 'status')
+    process_options = get_filter_options(conn, 'harlestons_orders', 'process')
+    location_options = get_filter_options(conn, 'harlestons_orders', 'location')
     
     global_notes = conn.execute("SELECT value FROM notes WHERE key = 'harlestons_global_notes'").fetchone()
     
@@ -91,6 +52,8 @@ def terminal():
     return render_template(
         'harlestons.html', 
         orders=orders, 
+        next_cursor=next_cursor,
+        live_seq=live_seq,
         global_notes=global_notes['value'] if global_notes else '',
         can_edit=can_edit,
         is_admin=is_admin,  # Pass admin status to template
@@ -106,6 +69,41 @@ def terminal():
     )
 
 
+@harlestons_bp.route('/orders.json')
+@requires_permission('view_production')
+def orders_page():
+    """Next page of terminal rows (JSON) for progressive loading"""
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+    can_edit = 'manage_production' in session.get('permissions', [])
+    filters = {
+        'status': request.args.get('status', ''),
+        'process': request.args.get('process', ''),
+        'location': request.args.get('location', ''),
+    }
+
+    conn = get_db_connection()
+    orders, next_cursor = fetch_roster_page(
+        conn, 'harlestons_orders', filters,
+        search=request.args.get('search', ''),
+        after=request.args.get('after'),
+        limit=clamp_page_size(request.args.get('limit')),
+    )
+    conn.close()
+
+    html = render_template(
+        '_harlestons_rows.html',
+        orders=orders,
+        can_edit=can_edit,
+        is_admin=is_admin,
+        row_offset=request.args.get('offset', 0, type=int),
+    )
+    return jsonify({
+        'orders': [dict(order) for order in orders],
+        'next_cursor': next_cursor,
+        'html': html,
+    })
+
+
 @harlestons_bp.route('/harlestons')
 @requires_permission('view_production')
 def view_orders():
@@ -131,76 +129,109 @@ def save_notes():
     conn.close()
     return redirect(url_for('harlestons.terminal'))
 
+
+def _live_filters():
+    return {
+        'status': request.args.get('status', ''),
+        'process': request.args.get('process', ''),
+        'location': request.args.get('location', ''),
+    }
+
+def _row_renderer():
+    """Render one order as the terminal's <tr> for the live feed"""
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+    can_edit = 'manage_production' in session.get('permissions', [])
+    return lambda order: render_template(
+        '_harlestons_rows.html', orders=[order], can_edit=can_edit, is_admin=is_admin,
+    ).strip()
+
+@harlestons_bp.route('/changes')
+@requires_permission('view_production')
+def changes_stream():
+    """Server-sent events with the orders changed since ?since= (or Last-Event-ID)"""
+    since = parse_seq(request.headers.get('Last-Event-ID'))
+    if since is None:
+        since = parse_seq(request.args.get('since'))
+
+    events = stream_roster_changes(
+        get_db_connection, 'harlestons_orders', since,
+        _live_filters(), request.args.get('search', ''), _row_renderer(),
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@harlestons_bp.route('/changes.json')
+@requires_permission('view_production')
+def changes_poll():
+    """Long-poll fallback: waits up to ?wait= seconds for orders changed since ?since="""
+    since = parse_seq(request.args.get('since'))
+    if since is None:
+        return {"error": "since is required"}, 400
+    wait = max(0, min(request.args.get('wait', ROSTER_LONG_POLL_SECONDS, type=int), ROSTER_LONG_POLL_SECONDS))
+
+    conn = get_db_connection()
+    try:
+        feed = wait_for_roster_changes(
+            conn, 'harlestons_orders', since, _live_filters(), request.args.get('search', ''), timeout=wait,
+        )
+        if feed is None:
+            return {"error": "Live updates are not available"}, 404
+        return jsonify(feed_payload(feed, _row_renderer()))
+    finally:
+        conn.close()
+
 @harlestons_bp.route('/update_orders', methods=['POST'])
 @requires_permission('manage_production')
 def update_orders():
-    conn = get_db_connection()
-    updated_ids = set()
-    
     # Check if user has admin permissions
     is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
 
-    for key in request.form:
-        if "_" in key:
-            prefix, id_str = key.split("_", 1)
-            order_id = id_str
-
-            # Skip if we've already updated this order_id
-            if order_id in updated_ids:
-                continue
-
-            # Grab all fields for this order
-            po_number      = request.form.get(f'po_number_{order_id}')
-            invoice_number = request.form.get(f'invoice_number_{order_id}')
-            club_nickname  = request.form.get(f'club_nickname_{order_id}')
-            location       = request.form.get(f'location_{order_id}')
-            process        = request.form.get(f'process_{order_id}')
-            pcs            = request.form.get(f'pcs_{order_id}')
-            status         = request.form.get(f'status_{order_id}')
-            notes          = request.form.get(f'notes_{order_id}')
-            in_hands       = request.form.get(f'in_hands_{order_id}')
-            priority       = request.form.get(f'priority_{order_id}')
-            uploaded       = request.form.get(f'uploaded_{order_id}')
-            inside_location = request.form.get(f'inside_{order_id}', 'No')
-            
-            # Only get p_status if user is admin
-            if is_admin:
-                p_status = request.form.get(f'p_status_{order_id}')
-                
-                # Update with p_status for admin users
-                conn.execute('''
-                    UPDATE harlestons_orders
-                    SET po_number = ?, invoice_number = ?, club_nickname = ?, location = ?, 
-                        process = ?, pcs = ?, status = ?, p_status = ?, notes = ?, 
-                        in_hand_date = ?, priority = ?, uploaded = ?, inside_location = ?
-                    WHERE id = ?
-                ''', (
-                    po_number, invoice_number, club_nickname, location,
-                    process, pcs, status, p_status, notes,
-                    in_hands, priority, uploaded, inside_location,
-                    order_id
-                ))
-            else:
-                # Update without p_status for non-admin users
-                conn.execute('''
-                    UPDATE harlestons_orders
-                    SET po_number = ?, invoice_number = ?, club_nickname = ?, location = ?, 
-                        process = ?, pcs = ?, status = ?, notes = ?, 
-                        in_hand_date = ?, priority = ?, uploaded = ?, inside_location = ?
-                    WHERE id = ?
-                ''', (
-                    po_number, invoice_number, club_nickname, location,
-                    process, pcs, status, notes,
-                    in_hands, priority, uploaded, inside_location,
-                    order_id
-                ))
-
-            updated_ids.add(order_id)
-
-    conn.commit()
+    # Only the cells that actually changed are written (see roster_edits)
+    conn = get_db_connection()
+    result = apply_roster_patch(
+        conn, 'harlestons_orders',
+        changes_from_form(request.form, 'harlestons_orders', is_admin), is_admin
+    )
     conn.close()
+    invalidate_filter_options('harlestons_orders')
+
+    if result['conflicts']:
+        conflicted = sorted({c['order_id'] for c in result['conflicts']})
+        flash(f"⚠️ {len(conflicted)} order(s) were changed by someone else and were not saved. Please review and try again.", "warning")
     return redirect(url_for('harlestons.terminal'))
 
+@harlestons_bp.route('/patch', methods=['POST'])
+@requires_permission('manage_production')
+def patch_orders():
+    """
+    Apply a batch of inline edits in one transaction.
+    Body: {"changes": [{"order_id", "field", "value", "version"}, ...]}
+    Returns the applied orders with their new versions, plus any conflicts.
+    """
+    if not request.is_json:
+        return {"error": "Request must be JSON"}, 400
+
+    changes = (request.get_json() or {}).get('changes')
+    if not isinstance(changes, list):
+        return {"error": "changes must be a list"}, 400
+
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+
+    conn = get_db_connection()
+    try:
+        result = apply_roster_patch(conn, 'harlestons_orders', changes, is_admin)
+    except Exception as e:
+        conn.close()
+        return {"error": str(e)}, 500
+    conn.close()
+
+    if result['applied']:
+        invalidate_filter_options('harlestons_orders')
+    return jsonify(result), 200
+
 @harlestons_bp.route('/home')
 def landing_page():
     # Check if user has Harlestons access
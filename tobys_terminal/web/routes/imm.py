@@ -1,6 +1,12 @@
 # routes/imm.py
-from flask import Blueprint, flash, render_template, request, redirect, url_for, session
+from flask import Blueprint, Response, flash, jsonify, render_template, request, redirect, stream_with_context, url_for, session
 from tobys_terminal.shared.auth_utils import get_db_connection, requires_permission
+from tobys_terminal.shared.change_log import latest_seq
+from tobys_terminal.shared.roster_edits import apply_roster_patch, changes_from_form
+from tobys_terminal.shared.roster_feed import (
+    ROSTER_LONG_POLL_SECONDS, feed_payload, parse_seq, stream_roster_changes, wait_for_roster_changes,
+)
+from tobys_terminal.shared.roster_pages import clamp_page_size, fetch_roster_page, get_filter_options, invalidate_filter_options
 
 imm_bp = Blueprint('imm', __name__, url_prefix='/imm')
 try:
@@ -20,73 +26,25 @@ def terminal():
     # Check if user has admin permissions
     is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
     
-    # Base query
-    query = """
-        SELECT * FROM imm_orders
-        WHERE 
-            status != 'Hidden'
-            AND TRIM(LOWER(p_status)) NOT IN ('done', 'complete', 'cancelled', 'archived', 'done done')
-    """
-    params = []
-    
-    # Apply filters if provided
-    if status_filter:
-        query += " AND status = ?"
-        params.append(status_filter)
-        
-    if process_filter:
-        query += " AND process = ?"
-        params.append(process_filter)
-        
-    if firm_date_filter:
-        query += " AND firm_date = ?"
-        params.append(firm_date_filter)
-        
-    if search_query:
-        query += """ AND (
-            LOWER(po_number) LIKE ? OR 
-            LOWER(nickname) LIKE ? OR 
-            LOWER(notes) LIKE ? OR
-            LOWER(invoice_number) LIKE ?
-        )"""
-        search_term = f"%{search_query.lower()}%"
-        params.extend([search_term, search_term, search_term, search_term])
-    
-    # Add ordering by customer_due_date if available
-    query += """
-        ORDER BY
-        CASE status
-            WHEN 'Complete and Ready for Pickup' THEN 1
-            WHEN 'Inline-EMB' THEN 2
-            WHEN 'Inline-DTF' THEN 3
-            WHEN 'Inline-PAT' THEN 4
-            WHEN 'Waiting Product' THEN 5
-            WHEN 'Need Sewout' THEN 6
-            WHEN 'Need File' THEN 7
-            WHEN 'Need Order' THEN 8
-            ELSE 9
-        END,
-        COALESCE(customer_due_date, in_hand_date) ASC
-    """
-    
     conn = get_db_connection()
-    orders = conn.execute(query, params).fetchall()
-    
-    # Get filter options for dropdowns
-    status_options = conn.execute(
-        "SELECT DISTINCT status FROM imm_orders WHERE status IS NOT NULL ORDER BY status"
-    ).fetchall()
+    filters = {
+        'status': status_filter,
+        'process': process_filter,
+        'firm_date': firm_date_filter,
+    }
+
+    # First keyset page only; the rest is fetched from orders_page on demand
+    orders, next_cursor = fetch_roster_page(conn, 'imm_orders', filters, search_query)
+    live_seq = latest_seq(conn, ['imm_orders'])
     
-    process_options = conn.execute(
-        "SELECT DISTINCT process FROM imm_orders WHERE process IS NOT NULL ORDER BY process"
-    ).fetchall()
+    # Get filter options for dropdowns (cached until an edit invalidates them)
+    status_options = get_filter_options(conn, 'imm_orders', 'status')
+    process_options = get_filter_options(conn, 'imm_orders', 'process')
     
     # If admin, get p_status options
     p_status_options = []
     if is_admin:
-        p_status_options = conn.execute(
-            "SELECT DISTINCT p_status FROM imm_orders WHERE p_status IS NOT NULL ORDER BY p_status"
-        ).fetchall()
+        p_status_options = get_filter_options(conn, 'imm_orders', 'p_status')
     
     # Check if user has edit permissions
     can_edit = 'manage_production' in session.get('permissions', [])
@@ -96,6 +54,8 @@ def terminal():
     return render_template(
         'imm.html', 
         orders=orders, 
+        next_cursor=next_cursor,
+        live_seq=live_seq,
         can_edit=can_edit,
         is_admin=is_admin,  # Pass admin status to template
         status_options=status_options,
@@ -109,66 +69,143 @@ def terminal():
         }
     )
 
+@imm_bp.route('/orders.json')
+@requires_permission('view_production')
+def orders_page():
+    """Next page of terminal rows (JSON) for progressive loading"""
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+    can_edit = 'manage_production' in session.get('permissions', [])
+    filters = {
+        'status': request.args.get('status', ''),
+        'process': request.args.get('process', ''),
+        'firm_date': request.args.get('firm_date', ''),
+    }
+
+    conn = get_db_connection()
+    orders, next_cursor = fetch_roster_page(
+        conn, 'imm_orders', filters,
+        search=request.args.get('search', ''),
+        after=request.args.get('after'),
+        limit=clamp_page_size(request.args.get('limit')),
+    )
+    conn.close()
+
+    html = render_template(
+        '_imm_rows.html',
+        orders=orders,
+        can_edit=can_edit,
+        is_admin=is_admin,
+        row_offset=request.args.get('offset', 0, type=int),
+    )
+    return jsonify({
+        'orders': [dict(order) for order in orders],
+        'next_cursor': next_cursor,
+        'html': html,
+    })
+
+
+def _live_filters():
+    return {
+        'status': request.args.get('status', ''),
+        'process': request.args.get('process', ''),
+        'firm_date': request.args.get('firm_date', ''),
+    }
+
+def _row_renderer():
+    """Render one order as the terminal's <tr> for the live feed"""
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+    can_edit = 'manage_production' in session.get('permissions', [])
+    return lambda order: render_template(
+        '_imm_rows.html', orders=[order], can_edit=can_edit, is_admin=is_admin,
+    ).strip()
+
+@imm_bp.route('/changes')
+@requires_permission('view_production')
+def changes_stream():
+    """Server-sent events with the orders changed since ?since= (or Last-Event-ID)"""
+    since = parse_seq(request.headers.get('Last-Event-ID'))
+    if since is None:
+        since = parse_seq(request.args.get('since'))
+
+    events = stream_roster_changes(
+        get_db_connection, 'imm_orders', since,
+        _live_filters(), request.args.get('search', ''), _row_renderer(),
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@imm_bp.route('/changes.json')
+@requires_permission('view_production')
+def changes_poll():
+    """Long-poll fallback: waits up to ?wait= seconds for orders changed since ?since="""
+    since = parse_seq(request.args.get('since'))
+    if since is None:
+        return {"error": "since is required"}, 400
+    wait = max(0, min(request.args.get('wait', ROSTER_LONG_POLL_SECONDS, type=int), ROSTER_LONG_POLL_SECONDS))
+
+    conn = get_db_connection()
+    try:
+        feed = wait_for_roster_changes(
+            conn, 'imm_orders', since, _live_filters(), request.args.get('search', ''), timeout=wait,
+        )
+        if feed is None:
+            return {"error": "Live updates are not available"}, 404
+        return jsonify(feed_payload(feed, _row_renderer()))
+    finally:
+        conn.close()
+
 @imm_bp.route('/update_orders', methods=['POST'])
 @requires_permission('manage_production')
 def update_orders():
     """Update IMM orders (requires manage_production permission)"""
-    conn = get_db_connection()
-    updated_ids = set()
-    
     # Check if user has admin permissions
     is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
 
-    for key in request.form:
-        if "_" in key:
-            prefix, id_str = key.split("_", 1)
-            order_id = id_str
-            if order_id in updated_ids:
-                continue
-
-            # Get common fields for all users
-            po_number      = request.form.get(f'po_number_{order_id}')
-            project_name   = request.form.get(f'project_name_{order_id}')
-            in_hands       = request.form.get(f'in_hands_{order_id}')
-            firm_date      = request.form.get(f'firm_date_{order_id}', 'No')
-            invoice_number = request.form.get(f'invoice_number_{order_id}')
-            process        = request.form.get(f'process_{order_id}')
-            status         = request.form.get(f'status_{order_id}')
-            notes          = request.form.get(f'notes_{order_id}')
-            
-            # Only admin users can update p_status
-            if is_admin:
-                p_status = request.form.get(f'p_status_{order_id}')
-                
-                # Update with p_status for admin users
-                conn.execute('''
-                    UPDATE imm_orders
-                    SET po_number = ?, nickname = ?, in_hand_date = ?, firm_date = ?, 
-                        invoice_number = ?, process = ?, status = ?, p_status = ?, notes = ?
-                    WHERE id = ?
-                ''', (
-                    po_number, project_name, in_hands, firm_date, 
-                    invoice_number, process, status, p_status, notes, order_id
-                ))
-            else:
-                # Update without changing p_status for non-admin users
-                conn.execute('''
-                    UPDATE imm_orders
-                    SET po_number = ?, nickname = ?, in_hand_date = ?, firm_date = ?, 
-                        invoice_number = ?, process = ?, status = ?, notes = ?
-                    WHERE id = ?
-                ''', (
-                    po_number, project_name, in_hands, firm_date, 
-                    invoice_number, process, status, notes, order_id
-                ))
-
-            updated_ids.add(order_id)
-
-    conn.commit()
+    # Only the cells that actually changed are written (see roster_edits)
+    conn = get_db_connection()
+    result = apply_roster_patch(conn, 'imm_orders', changes_from_form(request.form, 'imm_orders', is_admin), is_admin)
     conn.close()
-    flash("✅ Orders updated successfully!", "success")
+    invalidate_filter_options('imm_orders')
+
+    if result['conflicts']:
+        conflicted = sorted({c['order_id'] for c in result['conflicts']})
+        flash(f"⚠️ {len(conflicted)} order(s) were changed by someone else and were not saved. Please review and try again.", "warning")
+    else:
+        flash("✅ Orders updated successfully!", "success")
     return redirect(url_for('imm.terminal'))
 
+@imm_bp.route('/patch', methods=['POST'])
+@requires_permission('manage_production')
+def patch_orders():
+    """
+    Apply a batch of inline edits in one transaction.
+    Body: {"changes": [{"order_id", "field", "value", "version"}, ...]}
+    Returns the applied orders with their new versions, plus any conflicts.
+    """
+    if not request.is_json:
+        return {"error": "Request must be JSON"}, 400
+
+    changes = (request.get_json() or {}).get('changes')
+    if not isinstance(changes, list):
+        return {"error": "changes must be a list"}, 400
+
+    is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
+
+    conn = get_db_connection()
+    try:
+        result = apply_roster_patch(conn, 'imm_orders', changes, is_admin)
+    except Exception as e:
+        conn.close()
+        return {"error": str(e)}, 500
+    conn.close()
+
+    if result['applied']:
+        invalidate_filter_options('imm_orders')
+    return jsonify(result), 200
+
 @imm_bp.route('/update_field', methods=['POST'])
 @requires_permission('manage_production')
 def update_field():
@@ -177,45 +214,31 @@ def update_field():
         return {"error": "Request must be JSON"}, 400
     
     data = request.get_json()
-    order_id = data.get('order_id')
-    field_name = data.get('field_name')
-    value = data.get('value')
-    
-    # Validate field name to prevent SQL injection
-    valid_fields = {
-        'po_number': 'po_number',
-        'project_name': 'nickname',
-        'in_hands': 'in_hand_date',
-        'firm_date': 'firm_date',
-        'invoice_number': 'invoice_number',
-        'process': 'process',
-        'status': 'status',
-        'notes': 'notes'
+    change = {
+        'order_id': data.get('order_id'),
+        'field': data.get('field_name'),
+        'value': data.get('value'),
+        'version': data.get('version'),
     }
     
-    # Add p_status only if user is admin
+    # p_status is only accepted for admins (checked in apply_roster_patch)
     is_admin = 'admin' in session.get('role', '') or session.get('role') == 'admin'
-    if is_admin:
-        valid_fields['p_status'] = 'p_status'
-    
-    # Check if field is valid
-    if field_name not in valid_fields:
-        return {"error": "Invalid field name"}, 400
-    
-    # Map the form field name to database column name
-    db_field = valid_fields[field_name]
     
     conn = get_db_connection()
     try:
-        conn.execute(f"UPDATE imm_orders SET {db_field} = ? WHERE id = ?", 
-                    (value, order_id))
-        conn.commit()
+        result = apply_roster_patch(conn, 'imm_orders', [change], is_admin)
         conn.close()
-        return {"success": True}, 200
     except Exception as e:
         conn.close()
         return {"error": str(e)}, 500
 
+    if result['errors']:
+        return {"error": result['errors'][0]['error']}, 400
+    if result['conflicts']:
+        return {"error": "Order was changed by someone else", "conflicts": result['conflicts']}, 409
+    invalidate_filter_options('imm_orders')
+    return {"success": True, "applied": result['applied']}, 200
+
 
 @imm_bp.route('/new', methods=['GET', 'POST'])
 @requires_permission('manage_production')
@@ -255,6 +278,7 @@ def new_order():
               invoice_number, process, status, notes))
         conn.commit()
         conn.close()
+        invalidate_filter_options('imm_orders')
 
         flash("✅ New IMM order added!", "success")
         return redirect(url_for('imm.terminal'))
@@ -277,6 +301,7 @@ def import_from_printavo():
     try:
         from tobys_terminal.shared.printavo_sync import sync_imm_orders
         result = sync_imm_orders()
+        invalidate_filter_options('imm_orders')
         if result:
             flash("✅ Successfully imported orders from Printavo!", "success")
         else: